@@ -0,0 +1,58 @@
+import argparse
+import json
+import logging
+import platform
+import sys
+from datetime import datetime, timezone
+
+import structlog
+
+from .models import MODELS
+from .suite import run_benchmarks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="pydantic_bigquery benchmarks, results are written as JSON")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.005, help="Fake client latency per API call [s]")
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument("--model", action="append", choices=list(MODELS), help="Default: all models")
+    parser.add_argument("--benchmark", action="append", choices=["schema", "serialize", "batching", "insert"])
+    parser.add_argument("--output", help="JSON file, default: stdout")
+    args = parser.parse_args()
+
+    # Repository info logs would dominate the output (and the timings)
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    results = run_benchmarks(
+        rows=args.rows,
+        repeat=args.repeat,
+        latency=args.latency,
+        max_workers=args.max_workers,
+        models=args.model,
+        names=args.benchmark,
+    )
+    for result in results:
+        print(
+            f"{result.model:>10} {result.name:>10}: {result.items_per_second:>12,.0f} items/s"
+            f" {result.peak_bytes_per_item:>10,.0f} B/item",
+            file=sys.stderr,
+        )
+
+    document = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": vars(args),
+        "results": [result.dict() for result in results],
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(document, file, indent=2)
+    else:
+        json.dump(document, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
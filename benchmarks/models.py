@@ -0,0 +1,109 @@
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from pydantic_bigquery import BigQueryModel, BigQueryModelBase
+from tests.test_model import ExampleEnum, ExampleModel  # Scalar, nullable and repeated columns of every type
+
+WIDE_COLUMNS = 250
+
+
+class NestedInner3(BaseModel):
+    my_integer: int
+    my_string: str
+
+
+class NestedInner2(BaseModel):
+    inner: NestedInner3
+    repeatable_inner: List[NestedInner3]
+
+
+class NestedInner1(BaseModel):
+    inner: NestedInner2
+    nullable_inner: Optional[NestedInner2]
+    repeatable_inner: List[NestedInner2]
+
+
+class NestedModel(BigQueryModel):
+    __TABLE_NAME__: str = "benchmark_nested"
+
+    struct: NestedInner1
+
+
+class RepeatedModel(BigQueryModel):
+    __TABLE_NAME__: str = "benchmark_repeated"
+
+    my_repeatable_string: List[str]
+    my_repeatable_integer: List[int]
+    my_repeatable_float: List[float]
+    my_repeatable_datetime: List[datetime]
+    my_repeatable_struct: List[NestedInner3]
+
+
+WideModel: Type[BigQueryModel] = type(
+    "WideModel",
+    (BigQueryModel,),
+    {
+        "__module__": __name__,  # Picklable (worker processes)
+        "__TABLE_NAME__": "benchmark_wide",
+        "__annotations__": {f"column_{i}": [int, float, str, Optional[str]][i % 4] for i in range(WIDE_COLUMNS)},
+    },
+)
+
+
+def create_flat(i: int) -> BigQueryModelBase:
+    day, moment = date(2024, 1, 1), datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return ExampleModel(
+        my_string=f"string {i}",
+        my_integer=i,
+        my_float=i / 3,
+        my_bool=i % 2 == 0,
+        my_date=day,
+        my_datetime=moment,
+        my_enum=ExampleEnum.FOO,
+        my_nullable_string=None,
+        my_nullable_integer=i,
+        my_nullable_float=None,
+        my_nullable_bool=None,
+        my_nullable_date=None,
+        my_nullable_datetime=None,
+        my_repeatable_string=["a", "b"],
+        my_repeatable_integer=[i],
+        my_repeatable_float=[],
+        my_repeatable_bool=[],
+        my_repeatable_date=[day],
+        my_repeatable_datetime=[moment],
+    )
+
+
+def create_wide(i: int) -> BigQueryModelBase:
+    values: Dict[str, Any] = {}
+    for column in range(WIDE_COLUMNS):
+        values[f"column_{column}"] = [i, i / 3, f"string {i}", None][column % 4]
+    return WideModel(**values)
+
+
+def create_nested(i: int) -> BigQueryModelBase:
+    inner3 = NestedInner3(my_integer=i, my_string=f"string {i}")
+    inner2 = NestedInner2(inner=inner3, repeatable_inner=[inner3] * 3)
+    return NestedModel(struct=NestedInner1(inner=inner2, nullable_inner=None, repeatable_inner=[inner2] * 3))
+
+
+def create_repeated(i: int) -> BigQueryModelBase:
+    return RepeatedModel(
+        my_repeatable_string=[f"string {i}"] * 20,
+        my_repeatable_integer=list(range(20)),
+        my_repeatable_float=[i / 3] * 20,
+        my_repeatable_datetime=[datetime(2024, 1, 1, tzinfo=timezone.utc)] * 20,
+        my_repeatable_struct=[NestedInner3(my_integer=i, my_string=f"string {i}")] * 20,
+    )
+
+
+# Name -> (model, factory)
+MODELS: Dict[str, Tuple[Type[BigQueryModelBase], Callable[[int], BigQueryModelBase]]] = {
+    "flat": (ExampleModel, create_flat),
+    "wide": (WideModel, create_wide),
+    "nested": (NestedModel, create_nested),
+    "repeated": (RepeatedModel, create_repeated),
+}
@@ -0,0 +1,109 @@
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
+
+from pydantic import BaseModel
+
+from pydantic_bigquery import BigQueryModelBase, BigQueryRepository
+from pydantic_bigquery.batching import create_batches, encode_insert_row, encoded_row_size, max_insert_rows_bytes
+from pydantic_bigquery.testing import FakeBigQueryClient
+
+from .models import MODELS
+
+PROJECT_ID = "benchmark-project"
+DATASET_ID = "benchmark_dataset"
+SCHEMA_ITERATIONS = 100  # Schema generation is per model, not per row
+
+
+class BenchmarkResult(BaseModel):
+    name: str
+    model: str
+    items: int  # Rows, or schema generations for the schema benchmark
+    repeat: int
+    best_seconds: float
+    mean_seconds: float
+    items_per_second: float
+    peak_bytes_per_item: float  # tracemalloc peak of a separate (untimed) run
+
+
+def run_benchmarks(
+    *,
+    rows: int = 10_000,
+    repeat: int = 3,
+    latency: float = 0.005,
+    max_workers: int = 8,
+    models: Optional[Sequence[str]] = None,
+    names: Optional[Sequence[str]] = None,
+) -> List[BenchmarkResult]:
+    results = []
+    for model_name in models or MODELS:
+        model, factory = MODELS[model_name]
+        instances = [factory(i) for i in range(rows)]
+
+        for name, function in get_benchmarks(model, instances, latency, max_workers).items():
+            if names and name not in names:
+                continue
+            items = SCHEMA_ITERATIONS if name == "schema" else rows
+            results.append(measure(name, model_name, items, repeat, function))
+
+    return results
+
+
+def get_benchmarks(
+    model: Type[BigQueryModelBase], instances: List[BigQueryModelBase], latency: float, max_workers: int
+) -> Dict[str, Callable[[], Any]]:
+    def schema() -> None:
+        for _ in range(SCHEMA_ITERATIONS):
+            model.invalidate_bigquery_cache()
+            model.get_bigquery_schema()
+
+    def serialize() -> List[Dict[str, Any]]:
+        # Rows are kept, as when they are batched for a request
+        return [instance.bq_dict() for instance in instances]
+
+    def batching() -> None:
+        # Same encoding and limits as BigQueryRepository.insert()
+        insert_rows = (encode_insert_row(instance) for instance in instances)
+        max_bytes = max_insert_rows_bytes(BigQueryRepository.MAX_INSERT_BATCH_BYTES)
+        for _ in create_batches(
+            insert_rows, BigQueryRepository.MAX_INSERT_BATCH_SIZE, max_bytes, size=encoded_row_size
+        ):
+            pass
+
+    def insert() -> None:
+        client = FakeBigQueryClient(project=PROJECT_ID, latency=latency)
+        repository = BigQueryRepository(PROJECT_ID, DATASET_ID, client=client)
+        repository.create_dataset()
+        repository.create_table(model)
+        repository.insert(instances, max_workers=max_workers)
+
+    return {"schema": schema, "serialize": serialize, "batching": batching, "insert": insert}
+
+
+def measure(name: str, model: str, items: int, repeat: int, function: Callable[[], Any]) -> BenchmarkResult:
+    function()  # Warm up caches
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = min(timings)
+    return BenchmarkResult(
+        name=name,
+        model=model,
+        items=items,
+        repeat=repeat,
+        best_seconds=best,
+        mean_seconds=sum(timings) / len(timings),
+        items_per_second=items / best if best else 0.0,
+        peak_bytes_per_item=peak / items,
+    )
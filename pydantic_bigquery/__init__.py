@@ -1,4 +1,31 @@
-from .constants import BigQueryLocation
-from .exceptions import BigQueryFetchError, BigQueryInsertError
+from typing import TYPE_CHECKING, Any
+
+from .buffered import BufferedInserter
+from .cache import BigQueryMetadataCache
+from .constants import BigQueryCompression, BigQueryLocation, BigQuerySourceFormat, BigQueryWriteMode
+from .exceptions import BigQueryBufferFullError, BigQueryFetchError, BigQueryInsertError, BigQuerySchemaMismatchError
+from .instrumentation import (
+    BigQueryInstrumentation,
+    BigQueryOpenTelemetryInstrumentation,
+    BigQueryPrometheusInstrumentation,
+)
 from .model import BigQueryModel, BigQueryModelBase
 from .repository import BigQueryRepository
+from .results import (
+    BigQueryCreateTableResult,
+    BigQueryCreateTablesResult,
+    BigQueryInsertBatchResult,
+    BigQueryInsertResult,
+)
+
+if TYPE_CHECKING:
+    from .async_repository import AsyncBigQueryRepository
+
+
+def __getattr__(name: str) -> Any:
+    # Imported on first use: aiohttp (pip install pydantic_bigquery[async]) is slow to import
+    if name == "AsyncBigQueryRepository":
+        from .async_repository import AsyncBigQueryRepository  # pylint: disable=import-outside-toplevel
+
+        return AsyncBigQueryRepository
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,82 @@
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Type
+from weakref import WeakKeyDictionary
+
+from google.cloud import bigquery
+from pydantic import BaseModel
+
+from .constants import BigQueryMode
+from .optional import optional_import
+from .serialization import Converter, get_native_converters
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+    from .model import BigQueryModelBase
+else:
+    pa = optional_import("pyarrow")
+
+_ARROW_SCHEMAS: "WeakKeyDictionary[Type[BaseModel], pa.Schema]" = WeakKeyDictionary()
+_COLUMN_CONVERTERS: "WeakKeyDictionary[Type[BaseModel], List[Tuple[str, Optional[Converter]]]]" = WeakKeyDictionary()
+
+
+def get_arrow_schema(model: Type["BigQueryModelBase"]) -> "pa.Schema":
+    _check_pyarrow()
+
+    schema = _ARROW_SCHEMAS.get(model)
+    if schema is None:
+        schema = _ARROW_SCHEMAS[model] = pa.schema([_get_arrow_field(field) for field in model.get_bigquery_schema()])
+    return schema
+
+
+def to_record_batch(model: Type["BigQueryModelBase"], instances: Sequence["BigQueryModelBase"]) -> "pa.RecordBatch":
+    schema = get_arrow_schema(model)
+
+    converters = _COLUMN_CONVERTERS.get(model)
+    if converters is None:
+        converters = _COLUMN_CONVERTERS[model] = get_native_converters(model)
+
+    arrays = []
+    for (name, converter), arrow_field in zip(converters, schema):
+        values = [instance.__dict__[name] for instance in instances]
+        if converter is not None:
+            values = [None if value is None else converter(value) for value in values]
+        arrays.append(pa.array(values, type=arrow_field.type))
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def clear_arrow_cache(model: Type[BaseModel]) -> None:
+    _ARROW_SCHEMAS.pop(model, None)
+    _COLUMN_CONVERTERS.pop(model, None)
+
+
+def _check_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Arrow conversion requires pyarrow: pip install pydantic_bigquery[arrow]")
+
+
+def _get_arrow_field(field: bigquery.SchemaField) -> "pa.Field":
+    arrow_type = _get_arrow_type(field)
+    if field.mode == BigQueryMode.REPEATED.value:
+        return pa.field(field.name, pa.list_(pa.field("item", arrow_type, nullable=False)), nullable=False)
+    return pa.field(field.name, arrow_type, nullable=field.mode != BigQueryMode.REQUIRED.value)
+
+
+def _get_arrow_type(field: bigquery.SchemaField) -> "pa.DataType":
+    sql_types = bigquery.enums.SqlTypeNames
+    if field.field_type == sql_types.INTEGER.value:
+        return pa.int64()
+    if field.field_type == sql_types.FLOAT.value:
+        return pa.float64()
+    if field.field_type == sql_types.STRING.value:
+        return pa.string()
+    if field.field_type == sql_types.BOOLEAN.value:
+        return pa.bool_()
+    if field.field_type == sql_types.DATE.value:
+        return pa.date32()
+    if field.field_type == sql_types.TIMESTAMP.value:
+        return pa.timestamp("us", tz="UTC")
+    if field.field_type == sql_types.RECORD.value:
+        return pa.struct([_get_arrow_field(inner_field) for inner_field in field.fields])
+
+    raise NotImplementedError(f"Unknown type: {field.field_type}")
@@ -0,0 +1,386 @@
+# Async twin of BigQueryRepository, the public surface intentionally mirrors it
+# pylint: disable=duplicate-code
+import asyncio
+import time
+from http import HTTPStatus
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Sized, Type, Union
+
+import backoff
+import google.auth
+import structlog
+from google.api_core import exceptions
+from google.auth.credentials import Credentials
+from google.auth.transport.requests import Request
+from google.cloud import bigquery
+
+from .batching import (
+    create_batches,
+    create_insert_body,
+    encode_insert_row,
+    encoded_row_size,
+    max_insert_rows_bytes,
+    peek,
+)
+from .constants import BigQueryCompression, BigQueryLocation
+from .encoding import compress_body
+from .exceptions import BigQueryInsertError
+from .model import BigQueryModelBase
+from .repository import (
+    BigQueryRepository,
+    DeadLetterCallback,
+    InsertState,
+    build_dataset,
+    build_table,
+    is_too_large_error,
+    raise_batch_errors,
+)
+from .results import BigQueryInsertBatchResult, BigQueryInsertResult
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None  # type: ignore[assignment]
+
+log = structlog.get_logger(__name__)
+
+# Transient request errors, retried like the sync client does (google.cloud.bigquery.retry.DEFAULT_RETRY)
+RETRYABLE_ERRORS = (
+    exceptions.TooManyRequests,
+    exceptions.InternalServerError,
+    exceptions.BadGateway,
+    exceptions.ServiceUnavailable,
+    exceptions.GatewayTimeout,
+    asyncio.TimeoutError,
+) + ((aiohttp.ClientError,) if aiohttp is not None else ())
+
+
+class AsyncBigQueryRepository:
+    DEFAULT_TIMEOUT = BigQueryRepository.DEFAULT_TIMEOUT
+    MAX_INSERT_BATCH_SIZE = BigQueryRepository.MAX_INSERT_BATCH_SIZE
+    MAX_INSERT_BATCH_BYTES = BigQueryRepository.MAX_INSERT_BATCH_BYTES
+    COMPRESSION_LEVEL = BigQueryRepository.COMPRESSION_LEVEL
+    COMPRESSION_THRESHOLD_BYTES = BigQueryRepository.COMPRESSION_THRESHOLD_BYTES
+
+    API_BASE_URL = "https://bigquery.googleapis.com/bigquery/v2"
+    SCOPES = ["https://www.googleapis.com/auth/bigquery"]
+
+    def __init__(
+        self,
+        project_id: str,
+        dataset_id: str,
+        credentials: Optional[Credentials] = None,
+        session: Optional["aiohttp.ClientSession"] = None,
+        api_base_url: Optional[str] = None,
+        dead_letter_callback: Optional[DeadLetterCallback] = None,
+        compression: Optional[BigQueryCompression] = None,
+    ):
+        if aiohttp is None:
+            raise ImportError("AsyncBigQueryRepository requires aiohttp: pip install pydantic_bigquery[async]")
+
+        self._project_id = project_id
+        self._dataset_id = dataset_id
+        self._credentials = credentials
+        self._session = session
+        self._owns_session = session is None
+        self._api_base_url = api_base_url or self.API_BASE_URL
+        self._dead_letter_callback = dead_letter_callback
+        self._credentials_lock: Optional[asyncio.Lock] = None
+        self._compression = compression
+
+    async def __aenter__(self) -> "AsyncBigQueryRepository":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+            self._session = None
+
+    async def create_dataset(
+        self,
+        location: BigQueryLocation = BigQueryLocation.EU,
+        exists_ok: bool = True,
+        description: Optional[str] = None,
+        labels: Optional[Dict[str, Any]] = None,
+        default_table_expiration_ms: Optional[int] = None,
+    ) -> bigquery.Dataset:
+        log.info(
+            "async_repository.create_dataset.start",
+            project_id=self._project_id,
+            dataset_id=self._dataset_id,
+            location=location,
+            description=description,
+            labels=labels,
+            default_table_expiration_ms=default_table_expiration_ms,
+        )
+
+        dataset = build_dataset(
+            f"{self._project_id}.{self._dataset_id}",
+            location=location,
+            description=description,
+            labels=labels,
+            default_table_expiration_ms=default_table_expiration_ms,
+        )
+        try:
+            response = await self._request("POST", f"/projects/{self._project_id}/datasets", dataset.to_api_repr())
+        except exceptions.Conflict:
+            if not exists_ok:
+                raise
+            response = await self._request("GET", f"/projects/{self._project_id}/datasets/{self._dataset_id}")
+
+        return bigquery.Dataset.from_api_repr(response)
+
+    async def get_dataset(self) -> Optional[bigquery.Dataset]:
+        log.info("async_repository.get_dataset.start", project_id=self._project_id, dataset_id=self._dataset_id)
+
+        try:
+            response = await self._request("GET", f"/projects/{self._project_id}/datasets/{self._dataset_id}")
+        except exceptions.NotFound:
+            return None
+        return bigquery.Dataset.from_api_repr(response)
+
+    async def create_table(
+        self,
+        model: Type[BigQueryModelBase],
+        exists_ok: bool = True,
+        description: Optional[str] = None,
+        labels: Optional[Dict[str, Any]] = None,
+    ) -> bigquery.Table:
+        log.info(
+            "async_repository.create_table.start",
+            project_id=self._project_id,
+            dataset_id=self._dataset_id,
+            table_id=model.__TABLE_NAME__,
+            description=description,
+            labels=labels,
+        )
+
+        table = build_table(
+            f"{self._project_id}.{self._dataset_id}.{model.__TABLE_NAME__}",
+            model,
+            description=description,
+            labels=labels,
+        )
+        try:
+            response = await self._request("POST", f"{self._dataset_path}/tables", table.to_api_repr())
+        except exceptions.Conflict:
+            if not exists_ok:
+                raise
+            response = await self._request("GET", f"{self._dataset_path}/tables/{model.__TABLE_NAME__}")
+
+        return bigquery.Table.from_api_repr(response)
+
+    async def get_table(self, model: Type[BigQueryModelBase]) -> Optional[bigquery.Table]:
+        log.info(
+            "async_repository.get_table.start",
+            project_id=self._project_id,
+            dataset_id=self._dataset_id,
+            table_id=model.__TABLE_NAME__,
+        )
+
+        try:
+            response = await self._request("GET", f"{self._dataset_path}/tables/{model.__TABLE_NAME__}")
+        except exceptions.NotFound:
+            return None
+        return bigquery.Table.from_api_repr(response)
+
+    async def insert(
+        self,
+        data: Union[BigQueryModelBase, Iterable[BigQueryModelBase]],
+        max_concurrency: int = 1,
+    ) -> BigQueryInsertResult:
+        # Single item
+        if isinstance(data, BigQueryModelBase):
+            data = [data]
+
+        # Peek the table name, any iterable is then consumed lazily (batch by batch)
+        first, models = peek(data)
+
+        # Empty
+        result = BigQueryInsertResult()
+        if first is None:
+            return result
+
+        log.info(
+            "async_repository.insert.start",
+            project_id=self._project_id,
+            dataset_id=self._dataset_id,
+            table_id=first.__TABLE_NAME__,
+            count=len(data) if isinstance(data, Sized) else None,
+        )
+
+        rows = (encode_insert_row(x) for x in models)
+        max_bytes = max_insert_rows_bytes(self.MAX_INSERT_BATCH_BYTES)
+        rows_batches = create_batches(rows, self.MAX_INSERT_BATCH_SIZE, max_bytes, size=encoded_row_size)
+
+        start = time.monotonic()
+        try:
+            if max_concurrency > 1:
+                await self._insert_batches_concurrently(first.__TABLE_NAME__, rows_batches, max_concurrency, result)
+            else:
+                for batch_index, rows_batch in enumerate(rows_batches):
+                    await self._insert_batch(first.__TABLE_NAME__, batch_index, rows_batch, result)
+        except BigQueryInsertError as e:
+            e.result = result
+            raise
+        finally:
+            result.elapsed = time.monotonic() - start
+            result.batches.sort(key=lambda batch: batch.index)
+
+        log.info(
+            "async_repository.insert.finish",
+            table_id=first.__TABLE_NAME__,
+            rows=result.rows,
+            batches=len(result.batches),
+            retries=result.retries,
+            elapsed=result.elapsed,
+        )
+        return result
+
+    async def _insert_batches_concurrently(
+        self,
+        table_name: str,
+        rows_batches: Iterator[List[bytes]],
+        max_concurrency: int,
+        result: BigQueryInsertResult,
+    ) -> None:
+        errors: Dict[int, BaseException] = {}
+        tasks: "Dict[asyncio.Task[None], int]" = {}
+
+        def collect(done: "Set[asyncio.Task[None]]") -> None:
+            for task in done:
+                batch_index = tasks.pop(task)
+                error = task.exception()
+                if error is not None:
+                    errors[batch_index] = error
+
+        for batch_index, rows_batch in enumerate(rows_batches):
+            # Bound in-flight requests (and batches held in memory) to max_concurrency
+            if len(tasks) >= max_concurrency:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+            tasks[asyncio.ensure_future(self._insert_batch(table_name, batch_index, rows_batch, result))] = batch_index
+
+        if tasks:
+            done, _ = await asyncio.wait(tasks)
+            collect(done)
+
+        raise_batch_errors(errors)
+
+    async def _insert_batch(
+        self,
+        table_name: str,
+        batch_index: int,
+        rows: List[bytes],
+        result: BigQueryInsertResult,
+    ) -> None:
+        batch = BigQueryInsertBatchResult(index=batch_index, rows=len(rows))
+        result.batches.append(batch)
+
+        start = time.monotonic()
+        try:
+            await self._insert_rows(table_name, rows, batch)
+            batch.succeeded = True
+        except Exception as e:
+            batch.error = repr(e)
+            raise
+        finally:
+            batch.elapsed = time.monotonic() - start
+
+    async def _insert_rows(self, table_name: str, rows: List[bytes], batch: BigQueryInsertBatchResult) -> None:
+        state = InsertState(rows, batch)
+        try:
+            await self._send_rows(table_name, state)
+        except exceptions.GoogleAPICallError as e:
+            if not (e.code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE or is_too_large_error(str(e))):
+                raise
+
+            log.warning("async_repository.insert.too_large_body", response=str(e))
+
+            # Use bisect to reduce payload size
+            rows = state.pending_rows
+            half_size = len(rows) // 2
+
+            # Recursive end condition
+            if half_size == 0:
+                log.exception("async_repository.insert.too_large_body_exception")
+                raise BigQueryInsertError("Row is too large") from e
+
+            # Recursive call
+            await self._insert_rows(table_name, rows[:half_size], batch)
+            await self._insert_rows(table_name, rows[half_size:], batch)
+            return
+
+        state.finish(f"{self._project_id}.{self._dataset_id}.{table_name}", self._dead_letter_callback)
+
+    @backoff.on_predicate(backoff.expo, predicate=bool, max_tries=10, jitter=None)
+    async def _send_rows(self, table_name: str, state: InsertState) -> List[bytes]:
+        # Backoff retries while some rows failed transiently, only those rows are sent again
+        data, headers = compress_body(
+            create_insert_body(state.pending_rows),
+            self._compression,
+            self.COMPRESSION_LEVEL,
+            self.COMPRESSION_THRESHOLD_BYTES,
+        )
+        response = await self._request(
+            "POST", f"{self._dataset_path}/tables/{table_name}/insertAll", data=data, headers=headers
+        )
+        state.update(response.get("insertErrors", []))
+        return state.pending_rows
+
+    @property
+    def _dataset_path(self) -> str:
+        return f"/projects/{self._project_id}/datasets/{self._dataset_id}"
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_ERRORS, max_tries=6)
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        # body = encoded by aiohttp, data = already encoded JSON
+        headers = {**await self._get_auth_headers(), **(headers or {})}
+        if data is not None:
+            headers["Content-Type"] = "application/json"
+        async with self._get_session().request(
+            method,
+            f"{self._api_base_url}{path}",
+            json=body,
+            data=data,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=self.DEFAULT_TIMEOUT),
+        ) as response:
+            if response.status >= 400:
+                raise exceptions.from_http_status(response.status, await response.text())  # type: ignore[no-untyped-call]
+            return await response.json()  # type: ignore[no-any-return]
+
+    def _default_credentials(self) -> Any:
+        return google.auth.default(scopes=self.SCOPES)
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # One shared session (connection pool) for every request of this repository
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def _get_auth_headers(self) -> Dict[str, str]:
+        # Created lazily, the lock must belong to the running event loop
+        if self._credentials_lock is None:
+            self._credentials_lock = asyncio.Lock()
+
+        # Credentials lookup and token refresh are blocking HTTP calls, keep them off the event loop
+        async with self._credentials_lock:
+            loop = asyncio.get_running_loop()
+            if self._credentials is None:
+                self._credentials, _ = await loop.run_in_executor(None, self._default_credentials)
+            if not self._credentials.valid:
+                await loop.run_in_executor(None, self._credentials.refresh, Request())
+
+        headers: Dict[str, str] = {}
+        self._credentials.apply(headers)
+        return headers
@@ -0,0 +1,119 @@
+import threading
+from itertools import chain
+from queue import Full, Queue
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from uuid import uuid4
+
+from .encoding import dumps
+from .model import BigQueryModelBase
+
+T = TypeVar("T")
+
+INSERT_BODY_PREFIX = b'{"rows":['
+INSERT_BODY_SUFFIX = b"]}"
+
+
+def create_insert_row(model: BigQueryModelBase) -> Dict[str, Any]:
+    # insertAll row, the insertId is fixed here so every resend of the row is deduplicated by BigQuery
+    return {"insertId": model.bq_insert_id() or str(uuid4()), "json": model.bq_dict()}
+
+
+def encode_insert_row(model: BigQueryModelBase) -> bytes:
+    # Encoded once, insertAll bodies are concatenated from these bytes
+    return dumps(create_insert_row(model))
+
+
+def encode_insert_rows(models: List[BigQueryModelBase]) -> List[bytes]:
+    # Serialization task of a worker process
+    return [encode_insert_row(model) for model in models]
+
+
+def encoded_row_size(row: bytes) -> int:
+    # Exact size in the insertAll body (+ "," between rows)
+    return len(row) + 1
+
+
+def create_insert_body(rows: Sequence[bytes]) -> bytes:
+    return INSERT_BODY_PREFIX + b",".join(rows) + INSERT_BODY_SUFFIX
+
+
+def max_insert_rows_bytes(max_body_bytes: int) -> int:
+    # Rows budget of an insertAll body, for create_batches(..., size=encoded_row_size) (no "," after the last row)
+    return max_body_bytes - len(INSERT_BODY_PREFIX) - len(INSERT_BODY_SUFFIX) + 1
+
+
+def create_batches(rows: Iterable[T], max_rows: int, max_bytes: int, size: Callable[[T], int]) -> Iterator[List[T]]:
+    batch: List[T] = []
+    batch_bytes = 0
+
+    for row in rows:
+        row_bytes = size(row)
+
+        # Close the batch before it crosses either limit (a single oversized row still gets its own batch)
+        if batch and (len(batch) >= max_rows or batch_bytes + row_bytes > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+
+        batch.append(row)
+        batch_bytes += row_bytes
+
+    if batch:
+        yield batch
+
+
+def peek(items: Iterable[T]) -> Tuple[Optional[T], Iterator[T]]:
+    iterator = iter(items)
+    first = next(iterator, None)
+    if first is None:
+        return None, iterator
+    return first, chain([first], iterator)
+
+
+def prefetch(items: Iterable[T], size: int) -> Generator[T, None, None]:
+    # Items are produced by a background thread, at most `size` items ahead of the consumer
+    return prefetch_parallel([items], size)
+
+
+def prefetch_parallel(iterables: Sequence[Iterable[T]], size: int) -> Generator[T, None, None]:
+    # One background thread per iterable, items are yielded as they come (order is kept only within an iterable)
+    queue: "Queue[Tuple[bool, Any]]" = Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def put(is_item: bool, value: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                queue.put((is_item, value), timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce(items: Iterable[T]) -> None:
+        try:
+            for item in items:
+                if not put(True, item):
+                    return
+            put(False, None)
+        except Exception as e:  # pylint: disable=broad-except
+            put(False, e)
+
+    def consume() -> Generator[T, None, None]:
+        for index, items in enumerate(iterables):
+            threading.Thread(target=produce, args=(items,), name=f"prefetch-{index}", daemon=True).start()
+
+        remaining = len(iterables)
+        try:
+            while remaining:
+                is_item, value = queue.get()
+                if not is_item:
+                    # Producer finished or failed
+                    if value is not None:
+                        raise value
+                    remaining -= 1
+                    continue
+                yield value
+        finally:
+            # Consumer stopped early (break, close, error) -> stop the producers too
+            stopped.set()
+
+    return consume()
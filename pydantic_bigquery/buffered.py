@@ -0,0 +1,186 @@
+import atexit
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import structlog
+
+from .batching import encode_insert_row, encoded_row_size
+from .exceptions import BigQueryBufferFullError
+from .model import BigQueryModelBase
+from .repository import BigQueryRepository
+
+log = structlog.get_logger(__name__)
+
+ErrorCallback = Callable[[List[BigQueryModelBase], Exception], None]
+Batch = Tuple[List[BigQueryModelBase], List[bytes]]
+
+
+class _TableBuffer:
+    def __init__(self) -> None:
+        self.models: List[BigQueryModelBase] = []  # For on_error
+        self.rows: List[bytes] = []  # Encoded once: sized here, sent as is by the repository
+        self.bytes = 0
+        self.added_at: List[float] = []  # Per row: rows left by a partial take keep their own deadline
+
+    @property
+    def first_at(self) -> float:
+        return self.added_at[0]
+
+    def take(self, count: int) -> Batch:
+        models, rows = self.models[:count], self.rows[:count]
+        self.models, self.rows = self.models[count:], self.rows[count:]
+        self.added_at = self.added_at[count:]
+        self.bytes = sum(encoded_row_size(row) for row in self.rows)
+        return models, rows
+
+
+class BufferedInserter:
+    def __init__(
+        self,
+        repository: BigQueryRepository,
+        max_rows: int = 500,
+        max_bytes: int = 1024 * 1024,
+        max_delay_ms: int = 1000,
+        max_queue_rows: int = 100_000,
+        block: bool = True,
+        block_timeout: Optional[float] = None,
+        on_error: Optional[ErrorCallback] = None,
+    ):
+        self._repository = repository
+        self._max_rows = max_rows
+        self._max_bytes = max_bytes
+        self._max_delay = max_delay_ms / 1000
+        self._max_queue_rows = max_queue_rows
+        self._block = block
+        self._block_timeout = block_timeout
+        self._on_error = on_error
+
+        self._buffers: Dict[str, _TableBuffer] = {}
+        self._pending_rows = 0  # Buffered + being flushed, used for backpressure
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name="BufferedInserter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self) -> "BufferedInserter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def insert(self, data: Union[BigQueryModelBase, List[BigQueryModelBase]]) -> None:
+        # Single item
+        if not isinstance(data, list):
+            data = [data]
+
+        for model in data:
+            row = encode_insert_row(model)
+
+            with self._condition:
+                if self._closed:
+                    raise BigQueryBufferFullError("BufferedInserter is closed")
+
+                self._wait_for_space()
+
+                buffer = self._buffers.get(model.__TABLE_NAME__)
+                if buffer is None:
+                    buffer = self._buffers[model.__TABLE_NAME__] = _TableBuffer()
+                is_first = not buffer.models
+
+                buffer.models.append(model)
+                buffer.rows.append(row)
+                buffer.added_at.append(time.monotonic())
+                buffer.bytes += encoded_row_size(row)
+                self._pending_rows += 1
+
+                # Wake up the flusher: new deadline or a size limit was reached
+                if is_first or len(buffer.models) >= self._max_rows or buffer.bytes >= self._max_bytes:
+                    self._condition.notify_all()
+
+    def flush(self) -> None:
+        with self._condition:
+            batches = self._take_buffers(force=True)
+        self._insert_batches(batches)
+
+    def close(self) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+
+        self._thread.join()
+        self.flush()
+        atexit.unregister(self.close)
+
+    def _wait_for_space(self) -> None:
+        if self._pending_rows < self._max_queue_rows:
+            return
+
+        if not self._block:
+            raise BigQueryBufferFullError(f"Buffer is full ({self._pending_rows} rows)")
+
+        log.warning("buffered_inserter.backpressure", pending_rows=self._pending_rows)
+        if not self._condition.wait_for(
+            lambda: self._closed or self._pending_rows < self._max_queue_rows, self._block_timeout
+        ):
+            raise BigQueryBufferFullError(f"Buffer is full ({self._pending_rows} rows)")
+        # Closed while waiting: the final flush of close() may be done already, the rows would be lost
+        if self._closed:
+            raise BigQueryBufferFullError("BufferedInserter is closed")
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                batches = self._take_buffers(force=False)
+                while not batches and not self._closed:
+                    self._condition.wait(self._next_deadline())
+                    batches = self._take_buffers(force=False)
+
+                if not batches and self._closed:
+                    return
+
+            self._insert_batches(batches)
+
+    def _next_deadline(self) -> Optional[float]:
+        first_at = [buffer.first_at for buffer in self._buffers.values() if buffer.models]
+        if not first_at:
+            return None
+        return max(0.0, min(first_at) + self._max_delay - time.monotonic())
+
+    def _take_buffers(self, force: bool) -> List[Batch]:
+        now = time.monotonic()
+        batches: List[Batch] = []
+        for buffer in self._buffers.values():
+            if not buffer.models:
+                continue
+
+            # Everything is due, or only the full max_rows batches (the rest keeps waiting for more rows)
+            if force or buffer.bytes >= self._max_bytes or now - buffer.first_at >= self._max_delay:
+                count = len(buffer.models)
+            else:
+                count = len(buffer.models) // self._max_rows * self._max_rows
+
+            models, rows = buffer.take(count)
+            batches.extend(
+                (models[i : i + self._max_rows], rows[i : i + self._max_rows])
+                for i in range(0, len(models), self._max_rows)
+            )
+
+        return batches
+
+    def _insert_batches(self, batches: List[Batch]) -> None:
+        for models, rows in batches:
+            try:
+                self._repository.insert_encoded(models[0].__TABLE_NAME__, rows)
+            except Exception as e:
+                log.exception("buffered_inserter.flush_error", table_id=models[0].__TABLE_NAME__, count=len(models))
+                if self._on_error is not None:
+                    self._on_error(models, e)
+            finally:
+                with self._condition:
+                    self._pending_rows -= len(models)
+                    self._condition.notify_all()
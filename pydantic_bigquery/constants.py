@@ -10,3 +10,20 @@ class BigQueryMode(str, Enum):
     NULLABLE = "NULLABLE"  # Optional
     REQUIRED = "REQUIRED"
     REPEATED = "REPEATED"  # List
+
+
+class BigQuerySourceFormat(str, Enum):
+    NEWLINE_DELIMITED_JSON = "NEWLINE_DELIMITED_JSON"
+    PARQUET = "PARQUET"  # pip install pydantic_bigquery[arrow]
+    AVRO = "AVRO"  # pip install pydantic_bigquery[avro]
+
+
+class BigQueryWriteMode(str, Enum):
+    DEFAULT = "DEFAULT"  # _default stream, at-least-once
+    COMMITTED = "COMMITTED"  # Own stream with offsets, exactly-once
+
+
+class BigQueryCompression(str, Enum):
+    # Content-Encoding of insertAll request bodies
+    GZIP = "gzip"
+    DEFLATE = "deflate"  # zlib stream, cheaper headers than gzip
@@ -0,0 +1,104 @@
+import gzip
+import json
+import math
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from .constants import BigQueryCompression
+
+# Fastest installed JSON encoder (pip install pydantic_bigquery[orjson]), insertAll bodies are built from its bytes
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+# Same output from every backend: non-finite floats as the strings BigQuery reads (like google.cloud.bigquery does),
+# ints beyond 64 bits rejected (orjson cannot encode them, INTEGER columns cannot hold them)
+NON_FINITE_FLOATS = {math.inf: "Infinity", -math.inf: "-Infinity"}
+MIN_INT = -(2**63)
+MAX_INT = 2**64 - 1
+
+
+def normalize(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {key: normalize(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [normalize(value) for value in obj]
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return NON_FINITE_FLOATS.get(obj, "NaN")
+    if isinstance(obj, int) and not MIN_INT <= obj <= MAX_INT:
+        raise ValueError(f"Integer exceeds 64-bit range: {obj}")
+    return obj
+
+
+def has_non_finite_float(obj: Any) -> bool:
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, float) and not math.isfinite(value):
+            return True
+    return False
+
+
+def _dumps_orjson(obj: Any) -> bytes:
+    try:
+        data = orjson.dumps(obj)
+    except orjson.JSONEncodeError:
+        # Out of range int -> ValueError, other errors are raised again
+        return orjson.dumps(normalize(obj))
+    # orjson writes NaN and Infinity as null, only rows with a null are checked
+    if b"null" in data and has_non_finite_float(obj):
+        return orjson.dumps(normalize(obj))
+    return data
+
+
+def _dumps_ujson(obj: Any) -> bytes:
+    return ujson.dumps(normalize(obj), ensure_ascii=False).encode()  # type: ignore[no-any-return]
+
+
+def _dumps_json(obj: Any) -> bytes:
+    return json.dumps(normalize(obj), separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode()
+
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+    dumps = _dumps_orjson
+elif ujson is not None:  # pragma: no cover
+    JSON_BACKEND = "ujson"
+    dumps = _dumps_ujson
+else:  # pragma: no cover
+    JSON_BACKEND = "json"
+    dumps = _dumps_json
+
+
+def loads(data: bytes) -> Any:
+    return json.loads(data)
+
+
+def compress_body(
+    data: bytes, compression: Optional[BigQueryCompression], level: int, threshold: int
+) -> Tuple[bytes, Dict[str, str]]:
+    # -> (body, headers). Small bodies are sent as is, compressing them costs more CPU than the bandwidth it saves
+    if compression is None or len(data) < threshold:
+        return data, {}
+    if compression == BigQueryCompression.GZIP:
+        return gzip.compress(data, compresslevel=level), {"Content-Encoding": compression.value}
+    return zlib.compress(data, level), {"Content-Encoding": compression.value}
+
+
+def decompress_body(data: bytes, content_encoding: Optional[str]) -> bytes:
+    if content_encoding == BigQueryCompression.GZIP.value:
+        return gzip.decompress(data)
+    if content_encoding == BigQueryCompression.DEFLATE.value:
+        return zlib.decompress(data)
+    return data
@@ -1,5 +1,12 @@
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .results import BigQueryInsertResult
+
+
 class BigQueryInsertError(Exception):
-    pass
+    # Progress of the failed insert (which batches made it), set by the repository
+    result: Optional["BigQueryInsertResult"] = None
 
 
 class BigQueryBackendInsertError(BigQueryInsertError):
@@ -8,3 +15,11 @@ class BigQueryBackendInsertError(BigQueryInsertError):
 
 class BigQueryFetchError(Exception):
     pass
+
+
+class BigQueryBufferFullError(BigQueryInsertError):
+    pass
+
+
+class BigQuerySchemaMismatchError(Exception):
+    pass
@@ -0,0 +1,182 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING, Any, ContextManager, Dict, Iterator, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+import structlog
+
+from .optional import optional_import
+
+if TYPE_CHECKING:
+    import prometheus_client
+    from opentelemetry import metrics as otel_metrics
+    from opentelemetry import trace as otel_trace
+else:
+    prometheus_client = optional_import("prometheus_client")
+    otel_metrics = optional_import("opentelemetry.metrics", "opentelemetry")
+    otel_trace = optional_import("opentelemetry.trace", "opentelemetry")
+
+log = structlog.get_logger(__name__)
+
+# Spans (timed phases)
+INSERT = "bigquery.insert"
+INSERT_SERIALIZE = "bigquery.insert.serialize"  # Serialization + batching of one batch
+INSERT_BATCH = "bigquery.insert.batch"
+INSERT_REQUEST = "bigquery.insert.request"  # One insertAll call (a retry or a bisected half is another request)
+
+# Counters
+INSERT_ROWS = "bigquery.insert.rows"
+INSERT_REJECTED_ROWS = "bigquery.insert.rejected_rows"
+INSERT_RETRIES = "bigquery.insert.retries"
+INSERT_BISECTIONS = "bigquery.insert.bisections"
+
+# Histograms
+INSERT_REQUEST_BYTES = "bigquery.insert.request.bytes"
+
+BYTES_BUCKETS = tuple(float(1024 * 2**i) for i in range(15))  # 1 KiB .. 16 MiB (+Inf is added by prometheus)
+
+# Registry -> (namespace, name) -> metric. A metric can be registered only once, it is shared by all adapters
+_PROMETHEUS_METRICS: "WeakKeyDictionary[Any, Dict[Tuple[str, str], Any]]" = WeakKeyDictionary()
+_PROMETHEUS_LOCK = threading.Lock()
+
+
+class BigQueryInstrumentation:
+    # No-op, subclass to export spans/metrics. Attributes may have high cardinality (batch_index), aggregate wisely
+    def span(self, name: str, attributes: Dict[str, Any]) -> ContextManager[None]:  # pylint: disable=unused-argument
+        return nullcontext()
+
+    def increment(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def observe(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        pass
+
+
+class BigQueryPrometheusInstrumentation(BigQueryInstrumentation):
+    # Span durations -> <name>_seconds histograms, counters -> <name>_total, only labeled by table_id
+    def __init__(self, registry: Optional["prometheus_client.CollectorRegistry"] = None, namespace: str = ""):
+        if prometheus_client is None:
+            raise ImportError(
+                "Prometheus instrumentation requires prometheus-client: pip install pydantic_bigquery[prometheus]"
+            )
+
+        self._registry = registry or prometheus_client.REGISTRY
+        self._namespace = namespace
+
+    @contextmanager
+    def span(self, name: str, attributes: Dict[str, Any]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram = self._get_metric(prometheus_client.Histogram, f"{name}.seconds")
+            histogram.labels(table_id=attributes.get("table_id", "")).observe(time.perf_counter() - start)
+
+    def increment(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        counter = self._get_metric(prometheus_client.Counter, name)
+        counter.labels(table_id=attributes.get("table_id", "")).inc(value)
+
+    def observe(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        # Only byte histograms for now, span durations keep the default (seconds) buckets
+        histogram = self._get_metric(prometheus_client.Histogram, name, buckets=BYTES_BUCKETS)
+        histogram.labels(table_id=attributes.get("table_id", "")).observe(value)
+
+    def _get_metric(self, metric_type: Any, name: str, **kwargs: Any) -> Any:
+        # kwargs = metric options (buckets)
+        key = (self._namespace, name)
+        metric = _PROMETHEUS_METRICS.get(self._registry, {}).get(key)
+        if metric is None:
+            with _PROMETHEUS_LOCK:
+                metrics = _PROMETHEUS_METRICS.setdefault(self._registry, {})
+                metric = metrics.get(key)
+                if metric is None:
+                    metric = metrics[key] = metric_type(
+                        name.replace(".", "_"),
+                        name,
+                        ["table_id"],
+                        namespace=self._namespace,
+                        registry=self._registry,
+                        **kwargs,
+                    )
+        return metric
+
+
+class BigQueryOpenTelemetryInstrumentation(BigQueryInstrumentation):
+    # Spans with all attributes, counters and histograms from the (global by default) meter
+    def __init__(self, tracer: Optional["otel_trace.Tracer"] = None, meter: Optional["otel_metrics.Meter"] = None):
+        if otel_trace is None:
+            raise ImportError(
+                "OpenTelemetry instrumentation requires opentelemetry-api: pip install pydantic_bigquery[opentelemetry]"
+            )
+
+        self._tracer = tracer or otel_trace.get_tracer("pydantic_bigquery")
+        self._meter = meter or otel_metrics.get_meter("pydantic_bigquery")
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, attributes: Dict[str, Any]) -> Iterator[None]:
+        with self._tracer.start_as_current_span(name, attributes=attributes):
+            yield
+
+    def increment(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        self._get_metric("counter", name).add(value, attributes={"table_id": attributes.get("table_id", "")})
+
+    def observe(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        self._get_metric("histogram", name).record(value, attributes={"table_id": attributes.get("table_id", "")})
+
+    def _get_metric(self, kind: str, name: str) -> Any:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    if kind == "counter":
+                        metric = self._metrics[name] = self._meter.create_counter(name)
+                    else:
+                        metric = self._metrics[name] = self._meter.create_histogram(name)
+        return metric
+
+
+class GuardedInstrumentation(BigQueryInstrumentation):
+    # Used by the repository: errors of the hooks are logged, they never fail (or replace an error of) an insert
+    def __init__(self, instrumentation: BigQueryInstrumentation):
+        self._instrumentation = instrumentation
+
+    @contextmanager
+    def span(self, name: str, attributes: Dict[str, Any]) -> Iterator[None]:
+        try:
+            context = self._instrumentation.span(name, attributes)
+            context.__enter__()  # pylint: disable=unnecessary-dunder-call
+        except Exception:  # pylint: disable=broad-except
+            log.exception("instrumentation.span.error", name=name)
+            yield
+            return
+
+        try:
+            yield
+        except BaseException:
+            self._exit_span(name, context, sys.exc_info())
+            raise
+        self._exit_span(name, context, (None, None, None))
+
+    def increment(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        try:
+            self._instrumentation.increment(name, value, attributes)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("instrumentation.increment.error", name=name)
+
+    def observe(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        try:
+            self._instrumentation.observe(name, value, attributes)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("instrumentation.observe.error", name=name)
+
+    @staticmethod
+    def _exit_span(name: str, context: ContextManager[None], exc_info: Any) -> None:
+        try:
+            context.__exit__(*exc_info)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("instrumentation.span.error", name=name)
@@ -0,0 +1,187 @@
+import json
+from typing import IO, TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Type
+
+from google.cloud import bigquery
+
+from .constants import BigQueryMode, BigQuerySourceFormat
+from .optional import optional_import
+from .parallel import SERIALIZATION_CHUNK_SIZE, map_chunks
+from .serialization import get_native_converters
+
+if TYPE_CHECKING:
+    import fastavro
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from .model import BigQueryModelBase
+else:
+    pa = optional_import("pyarrow")
+    pq = optional_import("pyarrow.parquet", "pyarrow")
+    fastavro = optional_import("fastavro")
+
+PARQUET_ROW_GROUP_SIZE = 100_000
+
+
+def write_load_file(
+    model: Type["BigQueryModelBase"],
+    models: Iterable["BigQueryModelBase"],
+    source_format: BigQuerySourceFormat,
+    file_obj: IO[bytes],
+    processes: int = 0,
+) -> int:
+    # Rows are encoded chunk by chunk (in worker processes if processes > 0) and written as they come
+    if source_format == BigQuerySourceFormat.PARQUET:
+        _check_pyarrow()
+    if source_format == BigQuerySourceFormat.AVRO:
+        _check_fastavro()
+    if source_format not in ENCODERS:
+        raise NotImplementedError(f"Unknown source format: {source_format}")
+
+    # Without processes a whole Parquet row group is encoded at once
+    chunk_size = PARQUET_ROW_GROUP_SIZE if source_format == BigQuerySourceFormat.PARQUET and not processes else None
+    chunks = map_chunks(ENCODERS[source_format], models, chunk_size or SERIALIZATION_CHUNK_SIZE, processes)
+
+    if source_format == BigQuerySourceFormat.NEWLINE_DELIMITED_JSON:
+        return _write_ndjson(chunks, file_obj)
+    if source_format == BigQuerySourceFormat.PARQUET:
+        return _write_parquet(model, chunks, file_obj)
+    return _write_avro(model, chunks, file_obj)
+
+
+def encode_ndjson(models: List["BigQueryModelBase"]) -> bytes:
+    return b"".join(json.dumps(model.bq_dict()).encode() + b"\n" for model in models)
+
+
+def encode_record_batch(models: List["BigQueryModelBase"]) -> "pa.RecordBatch":
+    return type(models[0]).to_record_batch(models)
+
+
+def encode_avro_records(models: List["BigQueryModelBase"]) -> List[Dict[str, Any]]:
+    converters = get_native_converters(type(models[0]))
+    records = []
+    for instance in models:
+        values = instance.__dict__
+        records.append(
+            {
+                name: values[name] if converter is None or values[name] is None else converter(values[name])
+                for name, converter in converters
+            }
+        )
+    return records
+
+
+# Chunk encoders, module level -> usable by worker processes
+ENCODERS: Dict[BigQuerySourceFormat, Callable[[List["BigQueryModelBase"]], Any]] = {
+    BigQuerySourceFormat.NEWLINE_DELIMITED_JSON: encode_ndjson,
+    BigQuerySourceFormat.PARQUET: encode_record_batch,
+    BigQuerySourceFormat.AVRO: encode_avro_records,
+}
+
+
+def build_load_job_config(
+    model: Type["BigQueryModelBase"], source_format: BigQuerySourceFormat
+) -> bigquery.LoadJobConfig:
+    job_config = bigquery.LoadJobConfig(
+        source_format=source_format.value,
+        schema=model.get_bigquery_schema(),
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+    )
+    if source_format == BigQuerySourceFormat.PARQUET:
+        # REPEATED columns are written as Parquet lists, without inference BigQuery expects a nested "list" record
+        job_config._set_sub_prop("parquetOptions", {"enableListInference": True})  # pylint: disable=protected-access
+    if source_format == BigQuerySourceFormat.AVRO:
+        job_config.use_avro_logical_types = True
+    return job_config
+
+
+def get_avro_schema(model: Type["BigQueryModelBase"]) -> Dict[str, Any]:
+    return _get_avro_record("root", model.get_bigquery_schema())
+
+
+def _check_pyarrow() -> None:
+    if pq is None:
+        raise ImportError("Parquet load requires pyarrow: pip install pydantic_bigquery[arrow]")
+
+
+def _check_fastavro() -> None:
+    if fastavro is None:
+        raise ImportError("Avro load requires fastavro: pip install pydantic_bigquery[avro]")
+
+
+def _write_ndjson(chunks: Iterable[bytes], file_obj: IO[bytes]) -> int:
+    count = 0
+    for chunk in chunks:
+        file_obj.write(chunk)
+        count += chunk.count(b"\n")  # Escaped in JSON strings -> one per row
+    return count
+
+
+def _write_parquet(model: Type["BigQueryModelBase"], chunks: Iterable["pa.RecordBatch"], file_obj: IO[bytes]) -> int:
+    count = 0
+    batches: List["pa.RecordBatch"] = []
+    batches_rows = 0
+    with pq.ParquetWriter(file_obj, model.to_arrow_schema()) as writer:
+        # Small chunks from worker processes are merged into row groups of PARQUET_ROW_GROUP_SIZE
+        for batch in chunks:
+            batches.append(batch)
+            batches_rows += batch.num_rows
+            count += batch.num_rows
+            if batches_rows >= PARQUET_ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_batches(batches), row_group_size=PARQUET_ROW_GROUP_SIZE)
+                batches, batches_rows = [], 0
+        if batches:
+            writer.write_table(pa.Table.from_batches(batches), row_group_size=PARQUET_ROW_GROUP_SIZE)
+    return count
+
+
+def _write_avro(model: Type["BigQueryModelBase"], chunks: Iterable[List[Dict[str, Any]]], file_obj: IO[bytes]) -> int:
+    count = 0
+
+    def records() -> Iterator[Dict[str, Any]]:
+        nonlocal count
+        for chunk in chunks:
+            yield from chunk
+            count += len(chunk)
+
+    fastavro.writer(file_obj, fastavro.parse_schema(get_avro_schema(model)), records())
+    return count
+
+
+def _get_avro_record(name: str, fields: List[bigquery.SchemaField]) -> Dict[str, Any]:
+    # Record names must be unique within the schema -> path of the field
+    return {
+        "type": "record",
+        "name": name,
+        "fields": [
+            {"name": field.name, "type": _get_avro_field_type(f"{name}_{field.name}", field)} for field in fields
+        ],
+    }
+
+
+def _get_avro_field_type(name: str, field: bigquery.SchemaField) -> Any:
+    avro_type = _get_avro_type(name, field)
+    if field.mode == BigQueryMode.REPEATED.value:
+        return {"type": "array", "items": avro_type}
+    if field.mode == BigQueryMode.REQUIRED.value:
+        return avro_type
+    return ["null", avro_type]
+
+
+def _get_avro_type(name: str, field: bigquery.SchemaField) -> Any:
+    sql_types = bigquery.enums.SqlTypeNames
+    if field.field_type == sql_types.INTEGER.value:
+        return "long"
+    if field.field_type == sql_types.FLOAT.value:
+        return "double"
+    if field.field_type == sql_types.STRING.value:
+        return "string"
+    if field.field_type == sql_types.BOOLEAN.value:
+        return "boolean"
+    if field.field_type == sql_types.DATE.value:
+        return {"type": "int", "logicalType": "date"}
+    if field.field_type == sql_types.TIMESTAMP.value:
+        return {"type": "long", "logicalType": "timestamp-micros"}
+    if field.field_type == sql_types.RECORD.value:
+        return _get_avro_record(name, field.fields)
+
+    raise NotImplementedError(f"Unknown type: {field.field_type}")
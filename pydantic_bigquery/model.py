@@ -1,20 +1,37 @@
+import hashlib
 import json
 from datetime import date, datetime, timezone
 from enum import Enum
-from typing import Any, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type, TypeVar
 from uuid import UUID, uuid4
+from weakref import WeakKeyDictionary
 
 from google.cloud import bigquery
+from google.protobuf import descriptor_pb2
 from pydantic import BaseModel, Extra, Field
 from pydantic.fields import SHAPE_LIST, SHAPE_SET, SHAPE_SINGLETON, SHAPE_TUPLE, ModelField
 
+from .arrow import clear_arrow_cache, get_arrow_schema, to_record_batch
 from .constants import BigQueryMode
+from .proto import clear_proto_cache, get_proto_descriptor
+from .serialization import clear_row_serializer, get_row_parser, get_row_serializer
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Model class -> (schema, fingerprint), weak keys so dynamically created models can be garbage collected
+_SCHEMAS: "WeakKeyDictionary[Type[BaseModel], Tuple[Tuple[bigquery.SchemaField, ...], str]]" = WeakKeyDictionary()
+
+ModelT = TypeVar("ModelT", bound="BigQueryModelBase")
+
+_SCHEMA_TYPE_ALIASES = {"INT64": "INTEGER", "FLOAT64": "FLOAT", "BOOL": "BOOLEAN", "STRUCT": "RECORD"}
 
 
 class BigQueryModelBase(BaseModel):
     __TABLE_NAME__: str
     __PARTITION_FIELD__: Optional[str] = None
     __CLUSTERING_FIELDS__: List[str] = []
+    __INSERT_ID_FIELD__: Optional[str] = None  # Sent as insertId -> best-effort deduplication of retried rows
 
     class Config:
         extra = Extra.forbid
@@ -23,7 +40,39 @@ class BigQueryModelBase(BaseModel):
 
     @classmethod
     def get_bigquery_schema(cls) -> List[bigquery.SchemaField]:
-        return [cls._get_schema_field(field) for field in cls.__fields__.values()]
+        return list(cls._get_cached_schema()[0])
+
+    @classmethod
+    def get_bigquery_schema_fingerprint(cls) -> str:
+        return cls._get_cached_schema()[1]
+
+    @classmethod
+    def to_arrow_schema(cls) -> "pa.Schema":
+        return get_arrow_schema(cls)
+
+    @classmethod
+    def to_record_batch(cls, instances: Sequence["BigQueryModelBase"]) -> "pa.RecordBatch":
+        return to_record_batch(cls, instances)
+
+    @classmethod
+    def to_proto_descriptor(cls) -> descriptor_pb2.DescriptorProto:
+        return get_proto_descriptor(cls)
+
+    @classmethod
+    def invalidate_bigquery_cache(cls) -> None:
+        # Needed only when fields change after class creation (e.g. update_forward_refs)
+        _SCHEMAS.pop(cls, None)
+        clear_row_serializer(cls)
+        clear_arrow_cache(cls)
+        clear_proto_cache(cls)
+
+    @classmethod
+    def _get_cached_schema(cls) -> Tuple[Tuple[bigquery.SchemaField, ...], str]:
+        cached = _SCHEMAS.get(cls)
+        if cached is None:
+            schema = tuple(cls._get_schema_field(field) for field in cls.__fields__.values())
+            cached = _SCHEMAS[cls] = (schema, get_schema_fingerprint(schema))
+        return cached
 
     @classmethod
     def _get_schema_field(cls, field: ModelField) -> bigquery.SchemaField:
@@ -82,11 +131,51 @@ class BigQueryModelBase(BaseModel):
 
         raise NotImplementedError(f"Unknown combination: shape={field.shape}, required={field.required}")
 
-    def bq_dict(self) -> Any:
-        # Conversion hack = Use pydantic encoders (datetime, enum -> str)
-        return json.loads(self.json())
+    @classmethod
+    def from_bq_row(cls: Type[ModelT], row: Any, strict: bool = False) -> ModelT:
+        # row = bigquery.Row or dict. Trusted (not validated) unless strict
+        if strict:
+            return cls(**dict(row.items()))
+        return get_row_parser(cls)(row)  # type: ignore[return-value]
+
+    @classmethod
+    def from_bq_rows(cls: Type[ModelT], rows: Iterable[Any], strict: bool = False) -> List[ModelT]:
+        if strict:
+            return [cls(**dict(row.items())) for row in rows]
+        parse = get_row_parser(cls)
+        return [parse(row) for row in rows]  # type: ignore[misc]
+
+    def bq_dict(self) -> Dict[str, Any]:
+        # Same output as json.loads(self.json()), without the string round trip
+        return get_row_serializer(type(self))(self)
+
+    def bq_insert_id(self) -> Optional[str]:
+        # Override for a custom key (e.g. hash of a natural key)
+        if self.__INSERT_ID_FIELD__ is None:
+            return None
+        value = getattr(self, self.__INSERT_ID_FIELD__)
+        # Not "None": every such row would be deduplicated against the others
+        return None if value is None else str(value)
+
+
+def get_schema_fingerprint(schema: Sequence[bigquery.SchemaField]) -> str:
+    # Stable across the client (SchemaField) and API (get_table) representations
+    def canonical(fields: Sequence[bigquery.SchemaField]) -> List[Any]:
+        return [
+            [
+                field.name,
+                _SCHEMA_TYPE_ALIASES.get(field.field_type.upper(), field.field_type.upper()),
+                (field.mode or BigQueryMode.NULLABLE.value).upper(),
+                canonical(field.fields),
+            ]
+            for field in fields
+        ]
+
+    return hashlib.sha256(json.dumps(canonical(schema)).encode()).hexdigest()
 
 
 class BigQueryModel(BigQueryModelBase):
+    __INSERT_ID_FIELD__: Optional[str] = "insert_id"
+
     insert_id: UUID = Field(default_factory=uuid4)
     inserted_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,24 @@
+import importlib
+import importlib.util
+from types import ModuleType
+from typing import Any, Optional
+
+
+class _LazyModule:
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def __getattr__(self, attr: str) -> Any:
+        # Only for attributes of the module (_name and _module are set in __init__)
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def optional_import(name: str, package: Optional[str] = None) -> Any:
+    # `try: import name except ImportError: name = None`, but imported on first attribute access: importing
+    # pydantic_bigquery does not pay for the unused extras. Installed = `package` (default: name) can be found
+    if importlib.util.find_spec(package or name) is None:
+        return None
+    return _LazyModule(name)
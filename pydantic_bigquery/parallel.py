@@ -0,0 +1,78 @@
+import multiprocessing
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import count, islice
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+SERIALIZATION_CHUNK_SIZE = 1000  # Models per task of a worker process
+
+# Sequences shared with forked workers (inherited memory, nothing is pickled to them), by map_chunks call
+_SHARED_ITEMS: Dict[int, Sequence[Any]] = {}
+_SHARED_IDS = count()
+_SHARED_LOCK = threading.Lock()
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_chunks(function: Callable[[List[T]], R], items: Iterable[T], chunk_size: int, processes: int) -> Iterator[R]:
+    # processes=0 -> in this process. Otherwise function runs in a process pool (it must be importable, i.e. module
+    # level), results come back pickled and in order, at most 2 chunks per process ahead
+    if processes <= 0:
+        yield from map(function, chunked(items, chunk_size))
+        return
+
+    fork_context = _get_fork_context()
+    if fork_context is not None and isinstance(items, Sequence):
+        # Workers read their slice from the forked memory, only (start, stop) is sent
+        with _SHARED_LOCK:
+            shared_id = next(_SHARED_IDS)
+            _SHARED_ITEMS[shared_id] = items
+        try:
+            with ProcessPoolExecutor(max_workers=processes, mp_context=fork_context) as executor:
+                tasks = (
+                    (_apply_shared, function, shared_id, start, start + chunk_size)
+                    for start in range(0, len(items), chunk_size)
+                )
+                yield from _run_ordered(executor, tasks, processes)
+        finally:
+            with _SHARED_LOCK:
+                del _SHARED_ITEMS[shared_id]
+        return
+
+    # Any iterable: chunks of items are pickled to the workers (items must be picklable)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from _run_ordered(executor, ((function, chunk) for chunk in chunked(items, chunk_size)), processes)
+
+
+def _run_ordered(executor: ProcessPoolExecutor, tasks: Iterator[Any], processes: int) -> Iterator[Any]:
+    futures: "Deque[Future[Any]]" = deque()
+    for task in tasks:
+        if len(futures) >= 2 * processes:
+            yield futures.popleft().result()
+        futures.append(executor.submit(*task))
+
+    while futures:
+        yield futures.popleft().result()
+
+
+def _apply_shared(function: Callable[[List[Any]], Any], shared_id: int, start: int, stop: int) -> Any:
+    return function(list(_SHARED_ITEMS[shared_id][start:stop]))
+
+
+def _get_fork_context() -> Optional[Any]:
+    # Fork is the default (and safe) only on Linux
+    if sys.platform != "linux" or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
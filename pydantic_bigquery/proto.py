@@ -0,0 +1,161 @@
+from datetime import date, datetime, timedelta, timezone
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+from uuid import UUID
+from weakref import WeakKeyDictionary
+
+from google.cloud import bigquery
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON, ModelField
+
+from .constants import BigQueryMode
+from .serialization import Converter
+
+if TYPE_CHECKING:
+    from .model import BigQueryModelBase
+
+ProtoRowConverter = Callable[[BaseModel], Dict[str, Any]]
+
+# Model class -> (descriptor, message class, row converter)
+_PROTOS: "WeakKeyDictionary[Type[BaseModel], Tuple[descriptor_pb2.DescriptorProto, Any, ProtoRowConverter]]" = (
+    WeakKeyDictionary()
+)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_DATE = date(1970, 1, 1)
+
+# Storage Write API encoding: DATE = days since epoch, TIMESTAMP = microseconds since epoch
+_PROTO_TYPES = {
+    bigquery.enums.SqlTypeNames.INTEGER.value: descriptor_pb2.FieldDescriptorProto.TYPE_INT64,
+    bigquery.enums.SqlTypeNames.FLOAT.value: descriptor_pb2.FieldDescriptorProto.TYPE_DOUBLE,
+    bigquery.enums.SqlTypeNames.STRING.value: descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+    bigquery.enums.SqlTypeNames.BOOLEAN.value: descriptor_pb2.FieldDescriptorProto.TYPE_BOOL,
+    bigquery.enums.SqlTypeNames.DATE.value: descriptor_pb2.FieldDescriptorProto.TYPE_INT32,
+    bigquery.enums.SqlTypeNames.TIMESTAMP.value: descriptor_pb2.FieldDescriptorProto.TYPE_INT64,
+}
+
+
+def get_proto_descriptor(model: Type["BigQueryModelBase"]) -> descriptor_pb2.DescriptorProto:
+    return _get_proto(model)[0]
+
+
+def encode_proto_rows(model: Type["BigQueryModelBase"], instances: Iterable["BigQueryModelBase"]) -> Iterator[bytes]:
+    _, message_class, converter = _get_proto(model)
+    for instance in instances:
+        yield message_class(**converter(instance)).SerializeToString()
+
+
+def clear_proto_cache(model: Type[BaseModel]) -> None:
+    _PROTOS.pop(model, None)
+
+
+def _get_proto(
+    model: Type["BigQueryModelBase"],
+) -> Tuple[descriptor_pb2.DescriptorProto, Any, ProtoRowConverter]:
+    cached = _PROTOS.get(model)
+    if cached is None:
+        descriptor = _build_descriptor(model.__name__, model.get_bigquery_schema())
+        cached = _PROTOS[model] = (descriptor, _build_message_class(descriptor), _get_row_converter(model))
+    return cached
+
+
+def _build_descriptor(name: str, fields: List[bigquery.SchemaField]) -> descriptor_pb2.DescriptorProto:
+    # Self-contained (proto2, records as nested types), as the Storage Write API expects it
+    descriptor = descriptor_pb2.DescriptorProto(name=name)
+    for number, field in enumerate(fields, start=1):
+        field_descriptor = descriptor.field.add(name=field.name, number=number)
+        field_descriptor.label = (
+            descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED
+            if field.mode == BigQueryMode.REPEATED.value
+            else descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+        )
+
+        if field.field_type == bigquery.enums.SqlTypeNames.RECORD.value:
+            nested = descriptor.nested_type.add()
+            nested.CopyFrom(_build_descriptor(f"{field.name}_record", field.fields))
+            field_descriptor.type = descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE
+            field_descriptor.type_name = nested.name
+        elif field.field_type in _PROTO_TYPES:
+            field_descriptor.type = _PROTO_TYPES[field.field_type]
+        else:
+            raise NotImplementedError(f"Unknown type: {field.field_type}")
+
+    return descriptor
+
+
+def _build_message_class(descriptor: descriptor_pb2.DescriptorProto) -> Any:
+    file_descriptor = descriptor_pb2.FileDescriptorProto(name=f"{descriptor.name}.proto", syntax="proto2")
+    file_descriptor.message_type.add().CopyFrom(descriptor)
+
+    # Own pool, models of the same name must not clash
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_descriptor)
+    message_descriptor = pool.FindMessageTypeByName(descriptor.name)
+
+    if hasattr(message_factory, "GetMessageClass"):  # protobuf >= 4.21
+        return message_factory.GetMessageClass(message_descriptor)
+    return message_factory.MessageFactory(pool).GetPrototype(message_descriptor)
+
+
+def _get_row_converter(model: Type[BaseModel]) -> ProtoRowConverter:
+    converters = [(name, _get_field_converter(field)) for name, field in model.__fields__.items()]
+
+    def convert(instance: BaseModel) -> Dict[str, Any]:
+        values = instance.__dict__
+        row = {}
+        for name, converter in converters:
+            value = values[name]
+            # Unset field = NULL
+            if value is not None:
+                row[name] = value if converter is None else converter(value)
+        return row
+
+    return convert
+
+
+def _get_field_converter(field: ModelField) -> Optional[Converter]:
+    converter = _get_type_converter(field.type_)
+    if field.shape == SHAPE_SINGLETON:
+        return converter
+    if converter is None:
+        return list
+
+    def convert_list(values: Any) -> Any:
+        return [converter(value) for value in values]
+
+    return convert_list
+
+
+def _get_type_converter(type_: Any) -> Optional[Converter]:
+    # datetime is a subclass of date
+    if issubclass(type_, datetime):
+        return _timestamp_micros
+    if issubclass(type_, date):
+        return _date_days
+    if issubclass(type_, Enum):
+        return _enum_value
+    if issubclass(type_, UUID):
+        return str
+    if issubclass(type_, BaseModel):
+        return _get_row_converter(type_)
+    if issubclass(type_, (bool, int, float, str)):
+        return None
+
+    raise NotImplementedError(f"Unknown type: {type_}")
+
+
+def _enum_value(value: Any) -> Any:
+    # Config.use_enum_values stores the raw value already
+    return value.value if isinstance(value, Enum) else value
+
+
+def _timestamp_micros(value: datetime) -> int:
+    # Naive datetime = UTC, same as BigQuery does for JSON
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _date_days(value: date) -> int:
+    return (value - _EPOCH_DATE).days
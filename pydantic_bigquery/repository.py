@@ -1,30 +1,126 @@
-from typing import Any, Dict, List, Optional, Type, Union
+import contextvars
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import chain
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Sized,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import backoff
 import structlog
 from google.cloud import bigquery
+from google.cloud.bigquery.retry import DEFAULT_RETRY
 from google.cloud.exceptions import BadRequest, GoogleCloudError, NotFound
 
-from .constants import BigQueryLocation
-from .exceptions import BigQueryBackendInsertError, BigQueryInsertError
-from .model import BigQueryModelBase
+from .batching import (
+    create_batches,
+    create_insert_body,
+    encode_insert_row,
+    encode_insert_rows,
+    encoded_row_size,
+    max_insert_rows_bytes,
+    peek,
+    prefetch,
+)
+from .cache import BigQueryMetadataCache
+from .constants import BigQueryCompression, BigQueryLocation, BigQuerySourceFormat, BigQueryWriteMode
+from .encoding import compress_body, loads
+from .exceptions import BigQueryBackendInsertError, BigQueryFetchError, BigQueryInsertError, BigQuerySchemaMismatchError
+from .instrumentation import (
+    INSERT,
+    INSERT_BATCH,
+    INSERT_BISECTIONS,
+    INSERT_REJECTED_ROWS,
+    INSERT_REQUEST,
+    INSERT_REQUEST_BYTES,
+    INSERT_RETRIES,
+    INSERT_ROWS,
+    INSERT_SERIALIZE,
+    BigQueryInstrumentation,
+    GuardedInstrumentation,
+)
+from .load import build_load_job_config, write_load_file
+from .model import BigQueryModelBase, get_schema_fingerprint
+from .parallel import SERIALIZATION_CHUNK_SIZE, map_chunks
+from .results import (
+    BigQueryCreateTableResult,
+    BigQueryCreateTablesResult,
+    BigQueryInsertBatchResult,
+    BigQueryInsertResult,
+)
+from .storage_read import create_read_client, read_record_batches
+from .storage_write import create_write_client, write_rows
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+    from google.cloud import bigquery_storage_v1
 
 log = structlog.get_logger(__name__)
 
+RETRYABLE_INSERT_ERROR_REASONS = ("backendError", "internalError", "timeout", "stopped")
+
+RejectedRow = Tuple[Dict[str, Any], List[Dict[str, Any]]]
+DeadLetterCallback = Callable[[str, List[RejectedRow]], None]
+
+ModelT = TypeVar("ModelT", bound=BigQueryModelBase)
+QueryParameter = Union[bigquery.ScalarQueryParameter, bigquery.ArrayQueryParameter, bigquery.StructQueryParameter]
+
 
 class BigQueryRepository:
     DEFAULT_TIMEOUT = 300
     MAX_INSERT_BATCH_SIZE = 10000
+    # Exact body size (built from encoded rows), below the 10 MB request limit: room for extra request keys and for
+    # the limit being counted differently by the service
+    MAX_INSERT_BATCH_BYTES = int(9.5 * 1024 * 1024)
+    # insertAll bodies of at least COMPRESSION_THRESHOLD_BYTES are compressed when compression is set
+    COMPRESSION_LEVEL = 6
+    COMPRESSION_THRESHOLD_BYTES = 16 * 1024
+    LOAD_TIMEOUT = 3600
+    LOAD_SPOOL_MAX_BYTES = 64 * 1024 * 1024  # Load file is kept in memory up to this size, then spooled to disk
+    # write() switches from streaming insert to a load job when either threshold is reached
+    LOAD_THRESHOLD_ROWS = 100_000
+    LOAD_THRESHOLD_BYTES = 100 * 1024 * 1024
 
     def __init__(
         self,
         project_id: str,
         dataset_id: str,
         client: Optional[bigquery.Client] = None,
+        dead_letter_callback: Optional[DeadLetterCallback] = None,
+        write_client: Optional["bigquery_storage_v1.BigQueryWriteClient"] = None,
+        read_client: Optional["bigquery_storage_v1.BigQueryReadClient"] = None,
+        metadata_cache: Optional[BigQueryMetadataCache] = None,
+        instrumentation: Optional[BigQueryInstrumentation] = None,
+        compression: Optional[BigQueryCompression] = None,
     ):
         self._project_id = project_id
         self._dataset_id = dataset_id
         self._client = client or bigquery.Client(project_id)
+        self._dead_letter_callback = dead_letter_callback
+        self._write_client = write_client  # Storage Write API, created on first use
+        self._read_client = read_client  # Storage Read API, created on first use
+        self._metadata_cache = metadata_cache  # get_dataset/get_table results, can be shared by repositories
+        # Confirmed by ensure_dataset/ensure_table: "project.dataset" -> "", "project.dataset.table" -> fingerprint
+        self._ensured: Dict[str, str] = {}
+        # Insert spans and metrics, no-op default
+        self._instrumentation = GuardedInstrumentation(instrumentation or BigQueryInstrumentation())
+        self._compression = compression  # Less egress for CPU, the limits apply to the uncompressed body
 
     def create_dataset(
         self,
@@ -44,22 +140,35 @@ class BigQueryRepository:
             default_table_expiration_ms=default_table_expiration_ms,
         )
 
-        dataset = bigquery.Dataset(f"{self._project_id}.{self._dataset_id}")
-        dataset.location = location.value
-        dataset.description = description
-        dataset.labels = labels or {}
-        dataset.default_table_expiration_ms = default_table_expiration_ms
-
-        return self._client.create_dataset(dataset, exists_ok=exists_ok, timeout=self.DEFAULT_TIMEOUT)
+        dataset_ref = f"{self._project_id}.{self._dataset_id}"
+        dataset = build_dataset(
+            dataset_ref,
+            location=location,
+            description=description,
+            labels=labels,
+            default_table_expiration_ms=default_table_expiration_ms,
+        )
+        result = self._client.create_dataset(dataset, exists_ok=exists_ok, timeout=self.DEFAULT_TIMEOUT)
+        self.invalidate_metadata_cache(dataset_ref)
+        return result
 
     def get_dataset(self) -> Optional[bigquery.Dataset]:
+        dataset_ref = f"{self._project_id}.{self._dataset_id}"
+        if self._metadata_cache is not None:
+            hit, cached = self._metadata_cache.get(dataset_ref)
+            if hit:
+                return cast(Optional[bigquery.Dataset], cached)
+
         log.info("repository.get_dataset.start", project_id=self._project_id, dataset_id=self._dataset_id)
 
         try:
-            dataset = bigquery.Dataset(f"{self._project_id}.{self._dataset_id}")
-            return self._client.get_dataset(dataset, timeout=self.DEFAULT_TIMEOUT)
+            result = self._client.get_dataset(bigquery.Dataset(dataset_ref), timeout=self.DEFAULT_TIMEOUT)
         except NotFound:
-            return None
+            result = None
+
+        if self._metadata_cache is not None:
+            self._metadata_cache.set(dataset_ref, result)
+        return result
 
     def create_table(
         self,
@@ -77,23 +186,57 @@ class BigQueryRepository:
             labels=labels,
         )
 
-        schema = model.get_bigquery_schema()
-        table = bigquery.Table(
-            f"{self._project_id}.{self._dataset_id}.{model.__TABLE_NAME__}",
-            schema,
+        table_ref = f"{self._project_id}.{self._dataset_id}.{model.__TABLE_NAME__}"
+        table = build_table(table_ref, model, description=description, labels=labels)
+        result = self._client.create_table(table, exists_ok=exists_ok, timeout=self.DEFAULT_TIMEOUT)
+        self.invalidate_metadata_cache(table_ref)
+        return result
+
+    def create_tables(
+        self,
+        models: Iterable[Type[BigQueryModelBase]],
+        max_workers: int = 8,
+        exists_ok: bool = True,
+        labels: Optional[Dict[str, Any]] = None,
+    ) -> BigQueryCreateTablesResult:
+        # Errors are collected per model, check result.failed_tables
+        models = list(models)
+        result = BigQueryCreateTablesResult(
+            tables=[BigQueryCreateTableResult(table_id=model.__TABLE_NAME__) for model in models]
         )
-        table.description = description
-        table.labels = labels or {}
 
-        if model.__PARTITION_FIELD__:
-            table.time_partitioning = bigquery.TimePartitioning(field=model.__PARTITION_FIELD__)
-            table.require_partition_filter = True
-        if model.__CLUSTERING_FIELDS__:
-            table.clustering_fields = model.__CLUSTERING_FIELDS__
+        def create(model: Type[BigQueryModelBase], table_result: BigQueryCreateTableResult) -> None:
+            start = time.monotonic()
+            try:
+                self.create_table(model, exists_ok=exists_ok, labels=labels)
+                table_result.succeeded = True
+            except Exception as e:  # pylint: disable=broad-except
+                log.error("repository.create_tables.error", table_id=model.__TABLE_NAME__, error=repr(e))
+                table_result.error = repr(e)
+            finally:
+                table_result.elapsed = time.monotonic() - start
 
-        return self._client.create_table(table, exists_ok=exists_ok, timeout=self.DEFAULT_TIMEOUT)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Schemas are built in the workers too (cached per model class)
+            list(executor.map(create, models, result.tables))
+        result.elapsed = time.monotonic() - start
+
+        log.info(
+            "repository.create_tables.finish",
+            tables=len(result.tables),
+            failed=len(result.failed_tables),
+            elapsed=result.elapsed,
+        )
+        return result
 
     def get_table(self, model: Type[BigQueryModelBase]) -> Optional[bigquery.Table]:
+        table_ref = f"{self._project_id}.{self._dataset_id}.{model.__TABLE_NAME__}"
+        if self._metadata_cache is not None:
+            hit, cached = self._metadata_cache.get(table_ref)
+            if hit:
+                return cast(Optional[bigquery.Table], cached)
+
         log.info(
             "repository.get_table.start",
             project_id=self._project_id,
@@ -102,71 +245,644 @@ class BigQueryRepository:
         )
 
         try:
-            table = bigquery.Table(f"{self._project_id}.{self._dataset_id}.{model.__TABLE_NAME__}")
-            return self._client.get_table(table)
+            result = self._client.get_table(bigquery.Table(table_ref))
         except NotFound:
-            return None
+            result = None
 
-    @backoff.on_exception(backoff.expo, exception=BigQueryBackendInsertError, max_tries=10, jitter=None)
-    def insert(self, data: Union[BigQueryModelBase, List[BigQueryModelBase]]) -> None:
-        # Empty list
-        if not data:
+        if self._metadata_cache is not None:
+            self._metadata_cache.set(table_ref, result)
+        return result
+
+    def ensure_dataset(
+        self,
+        location: BigQueryLocation = BigQueryLocation.EU,
+        description: Optional[str] = None,
+        labels: Optional[Dict[str, Any]] = None,
+        default_table_expiration_ms: Optional[int] = None,
+    ) -> None:
+        # Idempotent, only the first call per repository checks (and creates) the dataset
+        dataset_ref = f"{self._project_id}.{self._dataset_id}"
+        if dataset_ref in self._ensured:
+            return
+
+        if self.get_dataset() is None:
+            self.create_dataset(
+                location=location,
+                description=description,
+                labels=labels,
+                default_table_expiration_ms=default_table_expiration_ms,
+            )
+        self._ensured[dataset_ref] = ""
+
+    def ensure_table(
+        self,
+        model: Type[BigQueryModelBase],
+        description: Optional[str] = None,
+        labels: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        # Idempotent, only the first call per repository and model schema checks (and creates) the table
+        table_ref = f"{self._project_id}.{self._dataset_id}.{model.__TABLE_NAME__}"
+        fingerprint = model.get_bigquery_schema_fingerprint()
+        if self._ensured.get(table_ref) == fingerprint:
             return
 
+        table = self.get_table(model)
+        if table is None:
+            self.create_table(model, description=description, labels=labels)
+        elif get_schema_fingerprint(table.schema) != fingerprint:
+            log.error("repository.ensure_table.schema_mismatch", table_id=model.__TABLE_NAME__)
+            raise BigQuerySchemaMismatchError(f"Table {table_ref} schema doesn't match {model.__name__}")
+        self._ensured[table_ref] = fingerprint
+
+    def invalidate_metadata_cache(self, ref: Optional[str] = None) -> None:
+        # ref = "project.dataset" or "project.dataset.table", everything when omitted
+        if self._metadata_cache is not None:
+            self._metadata_cache.invalidate(ref)
+        if ref is None:
+            self._ensured.clear()
+        else:
+            self._ensured.pop(ref, None)
+
+    def query(
+        self,
+        model: Type[ModelT],
+        sql: str,
+        params: Optional[Sequence[QueryParameter]] = None,
+        page_size: int = 10_000,
+        prefetch_pages: int = 2,
+        strict: bool = False,
+    ) -> Iterator[ModelT]:
+        # Pages are fetched in the background while the current one is parsed, at most prefetch_pages ahead
+        log.info(
+            "repository.query.start",
+            project_id=self._project_id,
+            dataset_id=self._dataset_id,
+            table_id=model.__TABLE_NAME__,
+            page_size=page_size,
+        )
+
+        job_config = bigquery.QueryJobConfig(query_parameters=list(params or []))
+        query_job = self._client.query(sql, job_config=job_config, timeout=self.DEFAULT_TIMEOUT)
+        try:
+            rows = query_job.result(page_size=page_size, timeout=self.DEFAULT_TIMEOUT)
+        except GoogleCloudError as e:
+            log.error("repository.query.error", job_id=query_job.job_id, error=str(e))
+            raise BigQueryFetchError("Query error!") from e
+
+        pages = self._fetch_pages(query_job.job_id, rows)
+        if prefetch_pages > 0:
+            pages = prefetch(pages, prefetch_pages)
+        return self._parse_pages(model, pages, strict)
+
+    def read_table(
+        self,
+        model: Type[ModelT],
+        selected_fields: Optional[List[str]] = None,
+        row_restriction: Optional[str] = None,
+        max_streams: int = 4,
+        strict: bool = False,
+    ) -> Iterator[ModelT]:
+        for record_batch in self.read_table_arrow(model, selected_fields, row_restriction, max_streams):
+            yield from model.from_bq_rows(record_batch.to_pylist(), strict=strict)
+
+    def read_table_arrow(
+        self,
+        model: Type[BigQueryModelBase],
+        selected_fields: Optional[List[str]] = None,
+        row_restriction: Optional[str] = None,
+        max_streams: int = 4,
+    ) -> Iterator["pa.RecordBatch"]:
+        # Storage Read API: only the model's columns are scanned, streams are read in parallel (no order)
+        if selected_fields is None:
+            selected_fields = list(model.__fields__)
+
+        log.info(
+            "repository.read_table.start",
+            project_id=self._project_id,
+            dataset_id=self._dataset_id,
+            table_id=model.__TABLE_NAME__,
+            selected_fields=selected_fields,
+            row_restriction=row_restriction,
+            max_streams=max_streams,
+        )
+
+        if self._read_client is None:
+            self._read_client = create_read_client()
+
+        return read_record_batches(
+            self._read_client,
+            self._project_id,
+            self._get_table_path(model.__TABLE_NAME__),
+            selected_fields,
+            row_restriction,
+            max_streams,
+        )
+
+    def insert(
+        self,
+        data: Union[BigQueryModelBase, Iterable[BigQueryModelBase]],
+        max_workers: int = 1,
+        processes: int = 0,
+    ) -> BigQueryInsertResult:
         # Single item
-        if not isinstance(data, list):
+        if isinstance(data, BigQueryModelBase):
             data = [data]
 
+        # Peek the table name, any iterable is then consumed lazily (batch by batch)
+        first, models = peek(data)
+        # Sequences as is: forked worker processes read them from inherited memory instead of pickled chunks
+        items = data if isinstance(data, Sequence) else models
+
+        # Empty
+        if first is None:
+            return BigQueryInsertResult()
+
         log.info(
             "repository.insert.start",
             project_id=self._project_id,
             dataset_id=self._dataset_id,
-            table_id=data[0].__TABLE_NAME__,
-            count=len(data),
+            table_id=first.__TABLE_NAME__,
+            count=len(data) if isinstance(data, Sized) else None,
         )
 
-        # Create batches of maximum MAX_INSERT_BATCH_SIZE length
-        data_batches = [
-            data[i : i + self.MAX_INSERT_BATCH_SIZE] for i in range(0, len(data), self.MAX_INSERT_BATCH_SIZE)
-        ]
-        for data_batch in data_batches:
-            rows_to_insert = [x.bq_dict() for x in data_batch]
+        if processes > 0:
+            # CPU bound serialization in worker processes, requests are still sent from here (max_workers threads)
+            rows: Iterable[bytes] = chain.from_iterable(
+                map_chunks(encode_insert_rows, items, SERIALIZATION_CHUNK_SIZE, processes)
+            )
+        else:
+            rows = (encode_insert_row(x) for x in items)
+        return self._insert(first.__TABLE_NAME__, rows, max_workers)
 
-            try:
-                errors = self._client.insert_rows_json(
-                    f"{self._project_id}.{self._dataset_id}.{data[0].__TABLE_NAME__}",
-                    rows_to_insert,
-                    timeout=self.DEFAULT_TIMEOUT,
+    def insert_encoded(self, table_name: str, rows: Iterable[bytes], max_workers: int = 1) -> BigQueryInsertResult:
+        # Rows of encode_insert_row(), sent as is (e.g. already encoded to size a buffer)
+        log.info(
+            "repository.insert.start",
+            project_id=self._project_id,
+            dataset_id=self._dataset_id,
+            table_id=table_name,
+            count=len(rows) if isinstance(rows, Sized) else None,
+        )
+        return self._insert(table_name, rows, max_workers)
+
+    def load(
+        self,
+        data: Union[BigQueryModelBase, Iterable[BigQueryModelBase]],
+        source_format: BigQuerySourceFormat = BigQuerySourceFormat.NEWLINE_DELIMITED_JSON,
+        processes: int = 0,
+    ) -> Optional[bigquery.LoadJob]:
+        # Single item
+        if isinstance(data, BigQueryModelBase):
+            data = [data]
+
+        first, models = peek(data)
+        items = data if isinstance(data, Sequence) else models  # Shared with forked workers, see insert()
+
+        # Empty
+        if first is None:
+            return None
+
+        log.info(
+            "repository.load.start",
+            project_id=self._project_id,
+            dataset_id=self._dataset_id,
+            table_id=first.__TABLE_NAME__,
+            source_format=source_format,
+            count=len(data) if isinstance(data, Sized) else None,
+        )
+
+        return self._load(first, items, source_format, processes)
+
+    def write(
+        self,
+        data: Union[BigQueryModelBase, Iterable[BigQueryModelBase]],
+        max_workers: int = 1,
+        source_format: BigQuerySourceFormat = BigQuerySourceFormat.NEWLINE_DELIMITED_JSON,
+    ) -> Union[BigQueryInsertResult, bigquery.LoadJob]:
+        # Streaming insert for small writes, one load job (no 10 MB request limit, not billed) for bulk writes
+        if isinstance(data, BigQueryModelBase):
+            data = [data]
+
+        iterator = iter(data)
+        models: List[BigQueryModelBase] = []
+        rows: List[bytes] = []
+        rows_bytes = 0
+
+        for model in iterator:
+            row = encode_insert_row(model)
+            models.append(model)
+            rows.append(row)
+            rows_bytes += len(row)
+
+            if len(rows) >= self.LOAD_THRESHOLD_ROWS or rows_bytes >= self.LOAD_THRESHOLD_BYTES:
+                log.info("repository.write.load", table_id=model.__TABLE_NAME__, source_format=source_format)
+                return self._load(models[0], chain(models, iterator), source_format)
+
+        # Empty
+        if not models:
+            return BigQueryInsertResult()
+
+        log.info("repository.write.insert", table_id=models[0].__TABLE_NAME__, count=len(rows), bytes=rows_bytes)
+        return self._insert(models[0].__TABLE_NAME__, rows, max_workers)
+
+    def storage_write(
+        self,
+        data: Union[BigQueryModelBase, Iterable[BigQueryModelBase]],
+        mode: BigQueryWriteMode = BigQueryWriteMode.COMMITTED,
+        max_in_flight: int = 4,
+    ) -> BigQueryInsertResult:
+        # Storage Write API (protobuf rows, pipelined appends): cheaper and faster than insertAll
+        if isinstance(data, BigQueryModelBase):
+            data = [data]
+
+        first, models = peek(data)
+
+        # Empty
+        if first is None:
+            return BigQueryInsertResult()
+
+        log.info(
+            "repository.storage_write.start",
+            project_id=self._project_id,
+            dataset_id=self._dataset_id,
+            table_id=first.__TABLE_NAME__,
+            mode=mode,
+            count=len(data) if isinstance(data, Sized) else None,
+        )
+
+        if self._write_client is None:
+            self._write_client = create_write_client()
+
+        result = BigQueryInsertResult()
+        start = time.monotonic()
+        try:
+            write_rows(
+                self._write_client,
+                self._get_table_path(first.__TABLE_NAME__),
+                type(first),
+                models,
+                mode,
+                max_in_flight,
+                result,
+            )
+        except BigQueryInsertError as e:
+            e.result = result
+            raise
+        finally:
+            result.elapsed = time.monotonic() - start
+
+        log.info(
+            "repository.storage_write.finish",
+            table_id=first.__TABLE_NAME__,
+            rows=result.rows,
+            batches=len(result.batches),
+            retries=result.retries,
+            elapsed=result.elapsed,
+        )
+        return result
+
+    def _get_table_path(self, table_name: str) -> str:
+        # Storage API resource name
+        return f"projects/{self._project_id}/datasets/{self._dataset_id}/tables/{table_name}"
+
+    @staticmethod
+    def _fetch_pages(job_id: str, rows: Any) -> Iterator[List[bigquery.Row]]:
+        # Also run by the prefetch thread, its errors are re-raised to the consumer: wrapped here like result() errors
+        try:
+            for page in rows.pages:
+                yield list(page)
+        except GoogleCloudError as e:
+            log.error("repository.query.error", job_id=job_id, error=str(e))
+            raise BigQueryFetchError("Query error!") from e
+
+    @staticmethod
+    def _parse_pages(model: Type[ModelT], pages: Iterator[List[bigquery.Row]], strict: bool) -> Iterator[ModelT]:
+        count = 0
+        for page in pages:
+            yield from model.from_bq_rows(page, strict=strict)
+            count += len(page)
+
+        log.info("repository.query.finish", table_id=model.__TABLE_NAME__, rows=count)
+
+    def _insert(self, table_name: str, rows: Iterable[bytes], max_workers: int) -> BigQueryInsertResult:
+        table_id = f"{self._project_id}.{self._dataset_id}.{table_name}"
+        rows_batches = self._serialize_batches(table_id, rows)
+
+        result = BigQueryInsertResult()
+        start = time.monotonic()
+        try:
+            with self._instrumentation.span(INSERT, {"table_id": table_id}):
+                self._insert_batches(table_id, rows_batches, max_workers, result)
+        except BigQueryInsertError as e:
+            e.result = result
+            raise
+        finally:
+            result.elapsed = time.monotonic() - start
+            result.batches.sort(key=lambda batch: batch.index)
+
+        log.info(
+            "repository.insert.finish",
+            table_id=table_name,
+            rows=result.rows,
+            batches=len(result.batches),
+            retries=result.retries,
+            elapsed=result.elapsed,
+        )
+        return result
+
+    def _serialize_batches(self, table_id: str, rows: Iterable[bytes]) -> Iterator[List[bytes]]:
+        # Rows are serialized lazily while batches are built -> the span covers both. The last batch is built once the
+        # rows are exhausted, no span is opened for the (empty) end of the iteration
+        exhausted = False
+
+        def read_rows() -> Iterator[bytes]:
+            nonlocal exhausted
+            yield from rows
+            exhausted = True
+
+        max_bytes = max_insert_rows_bytes(self.MAX_INSERT_BATCH_BYTES)
+        rows_batches = create_batches(read_rows(), self.MAX_INSERT_BATCH_SIZE, max_bytes, size=encoded_row_size)
+        batch_index = 0
+        while not exhausted:
+            with self._instrumentation.span(INSERT_SERIALIZE, {"table_id": table_id, "batch_index": batch_index}):
+                rows_batch = next(rows_batches, None)
+            if rows_batch is None:
+                return
+            yield rows_batch
+            batch_index += 1
+
+    def _insert_batches(
+        self,
+        table_id: str,
+        rows_batches: Iterator[List[bytes]],
+        max_workers: int,
+        result: BigQueryInsertResult,
+    ) -> None:
+        if max_workers > 1:
+            self._insert_batches_concurrently(table_id, rows_batches, max_workers, result)
+        else:
+            for batch_index, rows_batch in enumerate(rows_batches):
+                self._insert_batch(table_id, batch_index, rows_batch, result)
+
+    def _load(
+        self,
+        first: BigQueryModelBase,
+        models: Iterable[BigQueryModelBase],
+        source_format: BigQuerySourceFormat,
+        processes: int = 0,
+    ) -> bigquery.LoadJob:
+        model = type(first)
+        table_id = f"{self._project_id}.{self._dataset_id}.{model.__TABLE_NAME__}"
+
+        start = time.monotonic()
+        with tempfile.SpooledTemporaryFile(max_size=self.LOAD_SPOOL_MAX_BYTES) as file_obj:
+            count = write_load_file(model, models, source_format, file_obj, processes)
+            size = file_obj.tell()
+            load_job = self._client.load_table_from_file(
+                file_obj,
+                table_id,
+                rewind=True,
+                job_config=build_load_job_config(model, source_format),
+                timeout=self.DEFAULT_TIMEOUT,
+            )
+
+        try:
+            load_job.result(timeout=self.LOAD_TIMEOUT)
+        except GoogleCloudError as e:
+            log.error("repository.load.error", job_id=load_job.job_id, first_error=str((load_job.errors or [None])[0]))
+            raise BigQueryInsertError("Load job error!") from e
+
+        log.info(
+            "repository.load.finish",
+            table_id=model.__TABLE_NAME__,
+            job_id=load_job.job_id,
+            rows=count,
+            bytes=size,
+            elapsed=time.monotonic() - start,
+        )
+        return load_job
+
+    def _insert_batches_concurrently(
+        self,
+        table_id: str,
+        rows_batches: Iterator[List[bytes]],
+        max_workers: int,
+        result: BigQueryInsertResult,
+    ) -> None:
+        errors: Dict[int, BaseException] = {}
+
+        def collect(futures: "Dict[Future[None], int]", done: "Set[Future[None]]") -> None:
+            for future in done:
+                batch_index = futures.pop(future)
+                error = future.exception()
+                if error is not None:
+                    errors[batch_index] = error
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures: "Dict[Future[None], int]" = {}
+            for batch_index, rows_batch in enumerate(rows_batches):
+                # Bound in-flight requests (and batches held in memory) to max_workers
+                if len(futures) >= max_workers:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    collect(futures, done)
+                # Copied context -> batch spans are children of the insert span
+                future = executor.submit(
+                    contextvars.copy_context().run, self._insert_batch, table_id, batch_index, rows_batch, result
+                )
+                futures[future] = batch_index
+
+            done, _ = wait(futures)
+            collect(futures, done)
+
+        raise_batch_errors(errors)
+
+    def _insert_batch(
+        self,
+        table_id: str,
+        batch_index: int,
+        rows: List[bytes],
+        result: BigQueryInsertResult,
+    ) -> None:
+        batch = BigQueryInsertBatchResult(index=batch_index, rows=len(rows))
+        result.batches.append(batch)
+
+        attributes = {"table_id": table_id, "batch_index": batch_index, "rows": len(rows)}
+        start = time.monotonic()
+        try:
+            with self._instrumentation.span(INSERT_BATCH, attributes):
+                self._insert_rows(table_id, rows, batch)
+            batch.succeeded = True
+            self._instrumentation.increment(INSERT_ROWS, batch.rows - batch.rejected_rows, attributes)
+        except Exception as e:
+            batch.error = repr(e)
+            raise
+        finally:
+            batch.elapsed = time.monotonic() - start
+            if batch.rejected_rows:
+                self._instrumentation.increment(INSERT_REJECTED_ROWS, batch.rejected_rows, attributes)
+
+    def _insert_rows(self, table_id: str, rows: List[bytes], batch: BigQueryInsertBatchResult) -> None:
+        state = InsertState(rows, batch)
+        try:
+            self._send_rows(table_id, state)
+        except (BadRequest, GoogleCloudError) as e:
+            if is_too_large_error(e.response.text):
+                log.warning("repository.insert.too_large_body", response=e.response.text)
+
+                # Use bisect to reduce payload size
+                rows = state.pending_rows
+                half_size = len(rows) // 2
+
+                # Recursive end condition
+                if half_size == 0:
+                    log.exception("repository.insert.too_large_body_exception")
+                    raise BigQueryInsertError("Row is too large") from e
+
+                # Recursive call
+                self._instrumentation.increment(
+                    INSERT_BISECTIONS, 1, {"table_id": table_id, "batch_index": batch.index}
                 )
-                if errors:
-                    first_error = str(errors[0])
-                    if "backendError" in first_error:
-                        log.warning("repository.insert.backend_error", first_error=first_error)
-                        raise BigQueryBackendInsertError("Streaming insert error [temporary]")
-
-                    log.error("repository.insert.error", first_error=first_error)
-                    raise BigQueryInsertError("Streaming insert error!")
-            except (BadRequest, GoogleCloudError) as e:
-                # This happens when payload is significantly over the limit and the server side of BQ trims it.
-                # https://github.com/googleapis/google-cloud-go/issues/2855#issuecomment-702993221
-                if (
-                    "Your client has issued a malformed or illegal request." in e.response.text
-                    or "Request payload size exceeds the limit: 10485760 bytes." in e.response.text
-                    or "Your client issued a request that was too large" in e.response.text
-                ):
-                    log.warning("repository.insert.too_large_body", response=e.response.text)
-
-                    # Use bisect to reduce payload size
-                    half_size = len(data_batch) // 2
-
-                    # Recursive end condition
-                    if half_size == 0:
-                        log.exception("repository.insert.too_large_body_exception")
-                        raise BigQueryInsertError("Row is too large") from e
-
-                    # Recursive call
-                    data_batch_1, data_batch_2 = data_batch[:half_size], data_batch[half_size:]
-                    self.insert(data_batch_1)
-                    self.insert(data_batch_2)
-                else:
-                    raise
+                self._insert_rows(table_id, rows[:half_size], batch)
+                self._insert_rows(table_id, rows[half_size:], batch)
+                return
+            raise
+
+        state.finish(table_id, self._dead_letter_callback)
+
+    @backoff.on_predicate(backoff.expo, predicate=bool, max_tries=10, jitter=None)
+    def _send_rows(self, table_id: str, state: "InsertState") -> List[bytes]:
+        # Backoff retries while some rows failed transiently, only those rows are sent again
+        attributes = {"table_id": table_id, "batch_index": state.batch.index, "rows": len(state.pending_rows)}
+        if state.sent:
+            self._instrumentation.increment(INSERT_RETRIES, 1, attributes)
+
+        body, headers = compress_body(
+            create_insert_body(state.pending_rows),
+            self._compression,
+            self.COMPRESSION_LEVEL,
+            self.COMPRESSION_THRESHOLD_BYTES,
+        )
+        self._instrumentation.observe(INSERT_REQUEST_BYTES, len(body), attributes)  # Sent, compressed bytes
+        with self._instrumentation.span(INSERT_REQUEST, attributes):
+            errors = self._post_insert_all(table_id, body, headers)
+        state.update(errors)
+        return state.pending_rows
+
+    def _post_insert_all(self, table_id: str, body: bytes, headers: Dict[str, str]) -> List[Dict[str, Any]]:
+        # Same request as Client.insert_rows_json, but the body is posted as is (it would encode the rows again)
+        path = f"{bigquery.TableReference.from_string(table_id).path}/insertAll"
+        response = self._client._call_api(  # pylint: disable=protected-access
+            DEFAULT_RETRY,
+            span_name="BigQuery.insertRowsJson",
+            span_attributes={"path": path},
+            method="POST",
+            path=path,
+            data=body,
+            content_type="application/json",
+            headers=headers,
+            timeout=self.DEFAULT_TIMEOUT,
+        )
+        return [{"index": int(error["index"]), "errors": error["errors"]} for error in response.get("insertErrors", ())]
+
+
+def build_dataset(
+    dataset_ref: str,
+    location: BigQueryLocation,
+    description: Optional[str],
+    labels: Optional[Dict[str, Any]],
+    default_table_expiration_ms: Optional[int],
+) -> bigquery.Dataset:
+    dataset = bigquery.Dataset(dataset_ref)
+    dataset.location = location.value
+    dataset.description = description
+    dataset.labels = labels or {}
+    dataset.default_table_expiration_ms = default_table_expiration_ms
+    return dataset
+
+
+def build_table(
+    table_ref: str,
+    model: Type[BigQueryModelBase],
+    description: Optional[str],
+    labels: Optional[Dict[str, Any]],
+) -> bigquery.Table:
+    table = bigquery.Table(table_ref, model.get_bigquery_schema())
+    table.description = description
+    table.labels = labels or {}
+
+    if model.__PARTITION_FIELD__:
+        table.time_partitioning = bigquery.TimePartitioning(field=model.__PARTITION_FIELD__)
+        table.require_partition_filter = True
+    if model.__CLUSTERING_FIELDS__:
+        table.clustering_fields = model.__CLUSTERING_FIELDS__
+
+    return table
+
+
+class InsertState:
+    # insertAll rows of one batch that still need to be sent, and rows BigQuery rejected for good
+    def __init__(self, rows: List[bytes], batch: BigQueryInsertBatchResult):
+        self.pending_rows = rows
+        self.rejected_rows: List[RejectedRow] = []
+        self.batch = batch
+        self.sent = False
+
+    def update(self, errors: Sequence[Dict[str, Any]]) -> None:
+        if self.sent:
+            self.batch.retries += 1
+        self.sent = True
+
+        if not errors:
+            self.pending_rows = []
+            return
+
+        retry_rows, rejected_rows = [], []
+        for error in errors:
+            row = self.pending_rows[int(error["index"])]
+            # "stopped" = valid row not inserted because of other invalid rows in the request
+            if all(e.get("reason") in RETRYABLE_INSERT_ERROR_REASONS for e in error["errors"]):
+                retry_rows.append(row)
+            else:
+                rejected_rows.append((loads(row)["json"], error["errors"]))
+
+        if retry_rows:
+            log.warning("repository.insert.backend_error", count=len(retry_rows), first_error=str(errors[0]))
+        if rejected_rows:
+            log.error("repository.insert.error", count=len(rejected_rows), first_error=str(rejected_rows[0][1]))
+
+        self.pending_rows = retry_rows
+        self.rejected_rows.extend(rejected_rows)
+
+    def finish(self, table_id: str, dead_letter_callback: Optional[DeadLetterCallback]) -> None:
+        self.batch.rejected_rows += len(self.rejected_rows)
+
+        if self.rejected_rows:
+            if dead_letter_callback is None:
+                raise BigQueryInsertError("Streaming insert error!")
+            dead_letter_callback(table_id, self.rejected_rows)
+
+        # Retries exhausted
+        if self.pending_rows:
+            raise BigQueryBackendInsertError("Streaming insert error [temporary]")
+
+
+def is_too_large_error(message: str) -> bool:
+    # This happens when payload is significantly over the limit and the server side of BQ trims it.
+    # https://github.com/googleapis/google-cloud-go/issues/2855#issuecomment-702993221
+    return (
+        "Your client has issued a malformed or illegal request." in message
+        or "Request payload size exceeds the limit: 10485760 bytes." in message
+        or "Your client issued a request that was too large" in message
+    )
+
+
+def raise_batch_errors(errors: Dict[int, BaseException]) -> None:
+    if not errors:
+        return
+
+    for batch_index, error in sorted(errors.items()):
+        log.error("repository.insert.batch_error", batch_index=batch_index, error=repr(error))
+
+    # Permanent errors are more important than exhausted retries, raise them first
+    permanent_errors = [e for e in errors.values() if not isinstance(e, BigQueryBackendInsertError)]
+    raise (permanent_errors or list(errors.values()))[0]
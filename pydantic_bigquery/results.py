@@ -0,0 +1,54 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class BigQueryInsertBatchResult(BaseModel):
+    index: int
+    rows: int
+    succeeded: bool = False
+    retries: int = 0
+    rejected_rows: int = 0
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+class BigQueryInsertResult(BaseModel):
+    batches: List[BigQueryInsertBatchResult] = []
+    elapsed: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return sum(batch.rows for batch in self.batches)
+
+    @property
+    def retries(self) -> int:
+        return sum(batch.retries for batch in self.batches)
+
+    @property
+    def succeeded(self) -> bool:
+        return all(batch.succeeded for batch in self.batches)
+
+    @property
+    def failed_batches(self) -> List[BigQueryInsertBatchResult]:
+        return [batch for batch in self.batches if not batch.succeeded]
+
+
+class BigQueryCreateTableResult(BaseModel):
+    table_id: str
+    succeeded: bool = False
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+class BigQueryCreateTablesResult(BaseModel):
+    tables: List[BigQueryCreateTableResult] = []
+    elapsed: float = 0.0
+
+    @property
+    def succeeded(self) -> bool:
+        return all(table.succeeded for table in self.tables)
+
+    @property
+    def failed_tables(self) -> List[BigQueryCreateTableResult]:
+        return [table for table in self.tables if not table.succeeded]
@@ -0,0 +1,246 @@
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from uuid import UUID
+from weakref import WeakKeyDictionary
+
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SET, SHAPE_SINGLETON, SHAPE_TUPLE, ModelField
+
+Converter = Callable[[Any], Any]
+RowSerializer = Callable[[BaseModel], Dict[str, Any]]
+RowParser = Callable[[Any], BaseModel]  # bigquery.Row or a dict -> model
+
+_ROW_SERIALIZERS: "WeakKeyDictionary[Type[BaseModel], RowSerializer]" = WeakKeyDictionary()
+_ROW_PARSERS: "WeakKeyDictionary[Type[BaseModel], RowParser]" = WeakKeyDictionary()
+
+_MISSING = object()
+
+
+def get_row_serializer(model: Type[BaseModel]) -> RowSerializer:
+    serializer = _ROW_SERIALIZERS.get(model)
+    if serializer is None:
+        serializer = _ROW_SERIALIZERS[model] = _compile_row_serializer(model)
+    return serializer
+
+
+def clear_row_serializer(model: Type[BaseModel]) -> None:
+    _ROW_SERIALIZERS.pop(model, None)
+    _ROW_PARSERS.pop(model, None)
+
+
+def get_row_parser(model: Type[BaseModel]) -> RowParser:
+    parser = _ROW_PARSERS.get(model)
+    if parser is None:
+        parser = _ROW_PARSERS[model] = _compile_row_parser(model)
+    return parser
+
+
+def _compile_row_serializer(model: Type[BaseModel]) -> RowSerializer:
+    # Custom encoders can't be reproduced field by field -> keep the pydantic round trip
+    if model.__config__.json_encoders:
+        return _serialize_via_json
+
+    try:
+        return _compile_fields_serializer(model)
+    except NotImplementedError:
+        return _serialize_via_json
+
+
+def _serialize_via_json(instance: BaseModel) -> Dict[str, Any]:
+    return json.loads(instance.json())  # type: ignore[no-any-return]
+
+
+def _compile_fields_serializer(model: Type[BaseModel]) -> RowSerializer:
+    converters: List[Tuple[str, Optional[Converter]]] = [
+        (name, _get_field_converter(field)) for name, field in model.__fields__.items()
+    ]
+
+    def serialize(instance: BaseModel) -> Dict[str, Any]:
+        values = instance.__dict__
+        return {name: values[name] if converter is None else converter(values[name]) for name, converter in converters}
+
+    return serialize
+
+
+def _get_field_converter(field: ModelField) -> Optional[Converter]:
+    if field.field_info.include is not None or field.field_info.exclude is not None:
+        raise NotImplementedError(f"Field include/exclude is not supported: {field.name}")
+
+    converter = _get_type_converter(field.type_)
+
+    if field.shape == SHAPE_SINGLETON:
+        item_converter = converter
+    elif field.shape in (SHAPE_LIST, SHAPE_SET, SHAPE_TUPLE):
+        item_converter = _list_converter(converter)
+    else:
+        raise NotImplementedError(f"Unknown shape: {field.shape}")
+
+    if item_converter is not None and field.allow_none:
+        return _nullable_converter(item_converter)
+    return item_converter
+
+
+def _get_type_converter(type_: Any) -> Optional[Converter]:
+    if not isinstance(type_, type):
+        raise NotImplementedError(f"Unknown type: {type_}")
+
+    # Order matters: bool < int, datetime < date, Enum may subclass str
+    if issubclass(type_, Enum):
+        return _enum_value
+    if issubclass(type_, (bool, int, float, str)):
+        return None
+    if issubclass(type_, UUID):
+        return str
+    if issubclass(type_, (datetime, date)):
+        return _isoformat
+    if issubclass(type_, BaseModel):
+        return _compile_fields_serializer(type_)
+
+    raise NotImplementedError(f"Unknown type: {type_}")
+
+
+def _enum_value(value: Any) -> Any:
+    # Config.use_enum_values stores the raw value already
+    return value.value if isinstance(value, Enum) else value
+
+
+def _isoformat(value: Any) -> Any:
+    return value.isoformat()
+
+
+def _list_converter(converter: Optional[Converter]) -> Converter:
+    if converter is None:
+        return list
+
+    def convert(values: Any) -> Any:
+        return [converter(value) for value in values]
+
+    return convert
+
+
+def _nullable_converter(converter: Converter) -> Converter:
+    def convert(value: Any) -> Any:
+        return None if value is None else converter(value)
+
+    return convert
+
+
+def get_native_converters(model: Type[BaseModel]) -> List[Tuple[str, Optional[Converter]]]:
+    return [(name, _get_native_field_converter(field)) for name, field in model.__fields__.items()]
+
+
+def _get_native_field_converter(field: ModelField) -> Optional[Converter]:
+    # Plain Python values (Arrow, Avro): date/datetime/int/... as is, UUID/Enum converted, records to dicts
+    converter = _get_native_type_converter(field.type_)
+    if field.shape == SHAPE_SINGLETON:
+        return converter
+    if converter is None:
+        return list if field.shape == SHAPE_SET else None
+
+    def convert_list(values: Any) -> Any:
+        return [converter(value) for value in values]
+
+    return convert_list
+
+
+def _get_native_type_converter(type_: Any) -> Optional[Converter]:
+    if issubclass(type_, Enum):
+        return _enum_value
+    if issubclass(type_, (bool, int, float, str, date, datetime)):
+        return None
+    if issubclass(type_, UUID):
+        return str
+    if issubclass(type_, BaseModel):
+        converters = get_native_converters(type_)
+
+        def convert_record(value: Any) -> Any:
+            values = value.__dict__
+            return {
+                name: values[name] if converter is None or values[name] is None else converter(values[name])
+                for name, converter in converters
+            }
+
+        return convert_record
+
+    raise NotImplementedError(f"Unknown type: {type_}")
+
+
+def _compile_row_parser(model: Type[BaseModel]) -> RowParser:
+    # Rows from BigQuery match the table schema -> skip validation, convert only what BigQuery can't return
+    try:
+        return _compile_fields_parser(model)
+    except NotImplementedError:
+        return _parse_via_validation(model)
+
+
+def _parse_via_validation(model: Type[BaseModel]) -> RowParser:
+    def parse(row: Any) -> BaseModel:
+        return model(**dict(row.items()))
+
+    return parse
+
+
+def _compile_fields_parser(model: Type[BaseModel]) -> RowParser:
+    fields = [(name, field, _get_parse_field_converter(field, model)) for name, field in model.__fields__.items()]
+
+    def parse(row: Any) -> BaseModel:
+        values = {}
+        fields_set = set()
+        for name, field, converter in fields:
+            value = row.get(name, _MISSING)
+            if value is _MISSING:
+                # Column not selected
+                values[name] = field.get_default()
+            else:
+                values[name] = value if converter is None or value is None else converter(value)
+                fields_set.add(name)
+
+        # Same as BaseModel.construct()
+        instance = model.__new__(model)
+        object.__setattr__(instance, "__dict__", values)
+        object.__setattr__(instance, "__fields_set__", fields_set)
+        instance._init_private_attributes()  # pylint: disable=protected-access
+        return instance
+
+    return parse
+
+
+def _get_parse_field_converter(field: ModelField, model: Type[BaseModel]) -> Optional[Converter]:
+    converter = _get_parse_type_converter(field.type_, model)
+
+    if field.shape == SHAPE_SINGLETON:
+        return converter
+    if field.shape == SHAPE_LIST:
+        return None if converter is None else _list_converter(converter)
+    if field.shape == SHAPE_SET:
+        return set if converter is None else _collection_converter(set, converter)
+    if field.shape == SHAPE_TUPLE:
+        return tuple if converter is None else _collection_converter(tuple, converter)
+
+    raise NotImplementedError(f"Unknown shape: {field.shape}")
+
+
+def _get_parse_type_converter(type_: Any, model: Type[BaseModel]) -> Optional[Converter]:
+    if not isinstance(type_, type):
+        raise NotImplementedError(f"Unknown type: {type_}")
+
+    # BigQuery returns int, float, str, bool, date, datetime (UTC), dict (RECORD) and list (REPEATED)
+    if issubclass(type_, Enum):
+        return None if model.__config__.use_enum_values else type_
+    if issubclass(type_, (bool, int, float, str, datetime, date)):
+        return None
+    if issubclass(type_, UUID):
+        return type_
+    if issubclass(type_, BaseModel):
+        return get_row_parser(type_)
+
+    raise NotImplementedError(f"Unknown type: {type_}")
+
+
+def _collection_converter(collection: Callable[[Any], Any], converter: Converter) -> Converter:
+    def convert(values: Any) -> Any:
+        return collection(converter(value) for value in values)
+
+    return convert
@@ -0,0 +1,67 @@
+from typing import TYPE_CHECKING, Iterator, List, Optional
+
+from .batching import prefetch_parallel
+from .optional import optional_import
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+    from google.cloud import bigquery_storage_v1
+    from google.cloud.bigquery_storage_v1 import types
+    from google.cloud.bigquery_storage_v1.reader import ReadRowsStream
+else:
+    bigquery_storage_v1 = optional_import("google.cloud.bigquery_storage_v1")
+    types = optional_import("google.cloud.bigquery_storage_v1.types", "google.cloud.bigquery_storage_v1")
+    pa = optional_import("pyarrow")
+
+STREAM_PREFETCH_BATCHES = 2  # Per stream, bounds memory of the parallel read
+
+
+def create_read_client() -> "bigquery_storage_v1.BigQueryReadClient":
+    if bigquery_storage_v1 is None:
+        raise ImportError(
+            "Storage Read API requires google-cloud-bigquery-storage: pip install pydantic_bigquery[storage]"
+        )
+    return bigquery_storage_v1.BigQueryReadClient()
+
+
+def read_record_batches(
+    read_client: "bigquery_storage_v1.BigQueryReadClient",
+    project_id: str,
+    table_path: str,
+    selected_fields: List[str],
+    row_restriction: Optional[str],
+    max_streams: int,
+) -> Iterator["pa.RecordBatch"]:
+    if pa is None:
+        raise ImportError(
+            "Storage Read API returns Arrow batches, it requires pyarrow: pip install pydantic_bigquery[arrow]"
+        )
+
+    read_session = types.ReadSession(
+        table=table_path,
+        data_format=types.DataFormat.ARROW,
+        read_options=types.ReadSession.TableReadOptions(
+            selected_fields=selected_fields,
+            row_restriction=row_restriction or "",
+        ),
+    )
+    session = read_client.create_read_session(
+        parent=f"projects/{project_id}", read_session=read_session, max_stream_count=max_streams
+    )
+
+    # No streams = no rows
+    if not session.streams:
+        return iter([])
+
+    schema = pa.ipc.read_schema(pa.py_buffer(session.arrow_schema.serialized_schema))
+    streams = [
+        _read_stream(read_client.read_rows(stream.name), schema)  # type: ignore[no-untyped-call]
+        for stream in session.streams
+    ]
+    return prefetch_parallel(streams, STREAM_PREFETCH_BATCHES * len(streams))
+
+
+def _read_stream(reader: "ReadRowsStream", schema: "pa.Schema") -> Iterator["pa.RecordBatch"]:
+    # ReadRowsStream resumes from the last offset on transient errors
+    for response in reader:
+        yield pa.ipc.read_record_batch(pa.py_buffer(response.arrow_record_batch.serialized_record_batch), schema)
@@ -0,0 +1,177 @@
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Iterable, List, Optional, Tuple, Type
+
+import structlog
+from google.api_core import exceptions
+
+from .batching import create_batches
+from .constants import BigQueryWriteMode
+from .exceptions import BigQueryBackendInsertError, BigQueryInsertError
+from .optional import optional_import
+from .proto import encode_proto_rows, get_proto_descriptor
+from .results import BigQueryInsertBatchResult, BigQueryInsertResult
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery_storage_v1
+    from google.cloud.bigquery_storage_v1 import exceptions as storage_exceptions
+    from google.cloud.bigquery_storage_v1 import types, writer
+
+    from .model import BigQueryModelBase
+else:
+    bigquery_storage_v1 = optional_import("google.cloud.bigquery_storage_v1")
+    types = optional_import("google.cloud.bigquery_storage_v1.types", "google.cloud.bigquery_storage_v1")
+    writer = optional_import("google.cloud.bigquery_storage_v1.writer", "google.cloud.bigquery_storage_v1")
+    storage_exceptions = optional_import(
+        "google.cloud.bigquery_storage_v1.exceptions", "google.cloud.bigquery_storage_v1"
+    )
+
+log = structlog.get_logger(__name__)
+
+MAX_APPEND_ROWS = 50_000
+MAX_APPEND_BYTES = 9 * 1024 * 1024  # AppendRows request limit is 10 MB
+MAX_APPEND_RETRIES = 5
+APPEND_RETRY_DELAY = 0.5  # Doubled on every retry
+
+RETRYABLE_APPEND_ERRORS: Tuple[Type[Exception], ...] = (
+    exceptions.ServiceUnavailable,
+    exceptions.InternalServerError,
+    exceptions.DeadlineExceeded,
+    exceptions.Aborted,
+    exceptions.Unknown,
+)
+
+
+def create_write_client() -> "bigquery_storage_v1.BigQueryWriteClient":
+    if bigquery_storage_v1 is None:
+        raise ImportError(
+            "Storage Write API requires google-cloud-bigquery-storage: pip install pydantic_bigquery[storage]"
+        )
+    return bigquery_storage_v1.BigQueryWriteClient()
+
+
+def write_rows(
+    write_client: "bigquery_storage_v1.BigQueryWriteClient",
+    table_path: str,
+    model: Type["BigQueryModelBase"],
+    models: Iterable["BigQueryModelBase"],
+    mode: BigQueryWriteMode,
+    max_in_flight: int,
+    result: BigQueryInsertResult,
+) -> None:
+    committed = mode == BigQueryWriteMode.COMMITTED
+    stream_name = open_write_stream(write_client, table_path, mode)
+
+    # The template (stream and schema) is merged into the first request of every connection
+    template = types.AppendRowsRequest(
+        write_stream=stream_name,
+        proto_rows=types.AppendRowsRequest.ProtoData(
+            writer_schema=types.ProtoSchema(proto_descriptor=get_proto_descriptor(model))
+        ),
+    )
+    pipeline = AppendRowsPipeline(write_client, template, max_in_flight)
+
+    try:
+        offset = 0
+        for batch_index, rows in enumerate(
+            create_batches(encode_proto_rows(model, models), MAX_APPEND_ROWS, MAX_APPEND_BYTES, size=len)
+        ):
+            batch = BigQueryInsertBatchResult(index=batch_index, rows=len(rows))
+            result.batches.append(batch)
+
+            # Offsets make a resend of an already written request fail with ALREADY_EXISTS -> exactly-once
+            pipeline.send(batch, create_append_request(rows, offset if committed else None))
+            offset += len(rows)
+
+        pipeline.flush()
+    finally:
+        pipeline.close()
+
+    if committed:
+        write_client.finalize_write_stream(name=stream_name)
+
+
+def open_write_stream(
+    write_client: "bigquery_storage_v1.BigQueryWriteClient", table_path: str, mode: BigQueryWriteMode
+) -> str:
+    if mode == BigQueryWriteMode.COMMITTED:
+        write_stream = types.WriteStream(type_=types.WriteStream.Type.COMMITTED)
+        return str(write_client.create_write_stream(parent=table_path, write_stream=write_stream).name)
+    return f"{table_path}/streams/_default"
+
+
+def create_append_request(rows: List[bytes], offset: Optional[int]) -> "types.AppendRowsRequest":
+    request = types.AppendRowsRequest(
+        proto_rows=types.AppendRowsRequest.ProtoData(rows=types.ProtoRows(serialized_rows=rows))
+    )
+    if offset is not None:
+        request.offset = offset
+    return request
+
+
+class PendingAppend:
+    def __init__(self, batch: BigQueryInsertBatchResult, request: "types.AppendRowsRequest", future: Any):
+        self.batch = batch
+        self.request = request
+        self.future = future
+        self.sent_at = time.monotonic()
+
+
+class AppendRowsPipeline:
+    # Up to max_in_flight AppendRows requests on one connection, responses are checked in the order of requests
+    def __init__(
+        self,
+        write_client: "bigquery_storage_v1.BigQueryWriteClient",
+        template: "types.AppendRowsRequest",
+        max_in_flight: int,
+    ):
+        self._write_client = write_client
+        self._template = template
+        self._max_in_flight = max_in_flight
+        self._stream = writer.AppendRowsStream(write_client, template)
+        self._pending: Deque[PendingAppend] = deque()
+
+    def send(self, batch: BigQueryInsertBatchResult, request: "types.AppendRowsRequest") -> None:
+        while len(self._pending) >= self._max_in_flight:
+            self._wait_oldest()
+        self._pending.append(PendingAppend(batch, request, self._stream.send(request)))
+
+    def flush(self) -> None:
+        while self._pending:
+            self._wait_oldest()
+
+    def close(self) -> None:
+        self._stream.close()
+
+    def _wait_oldest(self) -> None:
+        append = self._pending[0]
+        try:
+            append.future.result()
+        except exceptions.AlreadyExists:
+            # Written before the connection broke, the resend was deduplicated by its offset
+            pass
+        except RETRYABLE_APPEND_ERRORS + (storage_exceptions.StreamClosedError,) as e:
+            if append.batch.retries >= MAX_APPEND_RETRIES:
+                append.batch.error = repr(e)
+                raise BigQueryBackendInsertError("Storage write error [temporary]") from e
+
+            append.batch.retries += 1
+            log.warning("repository.storage_write.retry", batch_index=append.batch.index, error=repr(e))
+            time.sleep(APPEND_RETRY_DELAY * 2 ** (append.batch.retries - 1))
+            self._reconnect()
+            return
+        except exceptions.GoogleAPICallError as e:
+            append.batch.error = repr(e)
+            raise BigQueryInsertError("Storage write error!") from e
+
+        append.batch.succeeded = True
+        append.batch.elapsed = time.monotonic() - append.sent_at
+        self._pending.popleft()
+
+    def _reconnect(self) -> None:
+        # A failed connection fails every request in flight, resend the unconfirmed ones in order
+        self._stream.close()
+        self._stream = writer.AppendRowsStream(self._write_client, self._template)
+        for append in self._pending:
+            if not append.future.done() or append.future.exception() is not None:
+                append.future = self._stream.send(append.request)
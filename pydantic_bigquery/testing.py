@@ -0,0 +1,272 @@
+import json
+import random
+import re
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Union
+from uuid import uuid4
+
+import requests
+from google.cloud import bigquery
+from google.cloud.exceptions import BadRequest, Conflict, NotFound
+
+from .encoding import decompress_body
+
+MAX_REQUEST_BYTES = 10 * 1024 * 1024
+MAX_REQUEST_ROWS = 10000
+
+_INSERT_ALL_PATH = re.compile(r"^/projects/([^/]+)/datasets/([^/]+)/tables/([^/]+)/insertAll$")
+_QUERY_PATTERN = re.compile(r"^\s*SELECT\s+\*\s+FROM\s+`?([\w.-]+)`?(?:\s+LIMIT\s+(\d+))?\s*;?\s*$", re.IGNORECASE)
+
+
+class FakeBigQueryClient:
+    # In-memory stand-in for bigquery.Client, only the methods BigQueryRepository uses.
+    # insert_rows_json enforces the insertAll limits and deduplicates by insertId like the real service.
+    def __init__(
+        self,
+        project: str = "fake-project",
+        latency: float = 0.0,
+        backend_error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        max_request_bytes: int = MAX_REQUEST_BYTES,
+        max_request_rows: int = MAX_REQUEST_ROWS,
+    ):
+        self.project = project
+        self.latency = latency  # Seconds per API call
+        self.backend_error_rate = backend_error_rate  # Probability of a transient backendError per row
+        self.max_request_bytes = max_request_bytes
+        self.max_request_rows = max_request_rows
+
+        self.datasets: Dict[str, bigquery.Dataset] = {}
+        self.tables: Dict[str, bigquery.Table] = {}
+        self.table_rows: Dict[str, List[Dict[str, Any]]] = {}
+        self.insert_requests = 0
+        self.content_encodings: List[Optional[str]] = []  # Of raw insertAll requests
+
+        self._insert_ids: Dict[str, Set[str]] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def create_dataset(self, dataset: Union[bigquery.Dataset, str], exists_ok: bool = False, **_: Any) -> Any:
+        self._wait()
+        dataset_id = _get_dataset_id(dataset)
+        with self._lock:
+            if dataset_id in self.datasets:
+                if not exists_ok:
+                    raise Conflict(f"Already Exists: Dataset {dataset_id}")
+                return self.datasets[dataset_id]
+
+            self.datasets[dataset_id] = dataset if isinstance(dataset, bigquery.Dataset) else bigquery.Dataset(dataset)
+            return self.datasets[dataset_id]
+
+    def get_dataset(self, dataset: Union[bigquery.Dataset, str], **_: Any) -> Any:
+        self._wait()
+        dataset_id = _get_dataset_id(dataset)
+        with self._lock:
+            if dataset_id not in self.datasets:
+                raise NotFound(f"Not found: Dataset {dataset_id}")
+            return self.datasets[dataset_id]
+
+    def create_table(self, table: Union[bigquery.Table, str], exists_ok: bool = False, **_: Any) -> Any:
+        self._wait()
+        table_id = _get_table_id(table)
+        with self._lock:
+            if table_id.rsplit(".", 1)[0] not in self.datasets:
+                raise NotFound(f"Not found: Dataset {table_id.rsplit('.', 1)[0]}")
+            if table_id in self.tables:
+                if not exists_ok:
+                    raise Conflict(f"Already Exists: Table {table_id}")
+                return self.tables[table_id]
+
+            self.tables[table_id] = table if isinstance(table, bigquery.Table) else bigquery.Table(table)
+            self.table_rows[table_id] = []
+            self._insert_ids[table_id] = set()
+            return self.tables[table_id]
+
+    def get_table(self, table: Union[bigquery.Table, str], **_: Any) -> Any:
+        self._wait()
+        return self._get_table(_get_table_id(table))
+
+    def insert_rows_json(
+        self,
+        table: Union[bigquery.Table, str],
+        json_rows: Sequence[Dict[str, Any]],
+        row_ids: Optional[Sequence[Optional[str]]] = None,
+        **_: Any,
+    ) -> List[Dict[str, Any]]:
+        if row_ids is None:
+            row_ids = [str(uuid4()) for _ in json_rows]
+
+        # Same body as the real client sends
+        body = json.dumps({"rows": [{"insertId": row_id, "json": row} for row, row_id in zip(json_rows, row_ids)]})
+        return self._insert_all(_get_table_id(table), body.encode())
+
+    def _call_api(self, _retry: Any, **kwargs: Any) -> Dict[str, Any]:
+        # Raw requests of BigQueryRepository, only insertAll (the body is posted as encoded, maybe compressed bytes)
+        path = kwargs["path"]
+        match = _INSERT_ALL_PATH.match(path)
+        if kwargs.get("method") != "POST" or match is None:
+            raise NotImplementedError(f"Unsupported request: {kwargs.get('method')} {path}")
+
+        self.content_encodings.append((kwargs.get("headers") or {}).get("Content-Encoding"))
+        body = decompress_body(kwargs["data"], self.content_encodings[-1])
+        errors = self._insert_all(".".join(match.groups()), body)
+        return {"insertErrors": errors} if errors else {}
+
+    def _insert_all(self, table_id: str, body: bytes) -> List[Dict[str, Any]]:
+        self._wait()
+        if len(body) > self.max_request_bytes:
+            # The message is fixed by the service, even with a custom max_request_bytes
+            raise _bad_request(f"Request payload size exceeds the limit: {MAX_REQUEST_BYTES} bytes.")
+        rows = json.loads(body)["rows"]
+        json_rows = [row["json"] for row in rows]
+        row_ids = [row.get("insertId") for row in rows]
+        if len(json_rows) > self.max_request_rows:
+            raise _bad_request(
+                f"too many rows present in the request, limit: {self.max_request_rows} row count: {len(json_rows)}."
+            )
+
+        with self._lock:
+            schema = self._get_table(table_id).schema
+            self.insert_requests += 1
+
+            errors = self._get_row_errors(schema, json_rows)
+            # Invalid rows fail the whole request: the valid ones are "stopped"
+            if any(error["errors"][0]["reason"] == "invalid" for error in errors):
+                return _stop_rows(errors, len(json_rows))
+
+            failed = {error["index"] for error in errors}
+            insert_ids = self._insert_ids[table_id]
+            for index, (row, row_id) in enumerate(zip(json_rows, row_ids)):
+                if index in failed or (row_id is not None and row_id in insert_ids):
+                    continue
+                if row_id is not None:
+                    insert_ids.add(row_id)
+                self.table_rows[table_id].append(row)
+
+            return errors
+
+    def query(self, query: str, **_: Any) -> "FakeQueryJob":
+        # Only SELECT * FROM `project.dataset.table` [LIMIT n]
+        self._wait()
+        match = _QUERY_PATTERN.match(query)
+        if match is None:
+            raise NotImplementedError(f"Unsupported query: {query}")
+
+        table_id, limit = match.group(1), match.group(2)
+        with self._lock:
+            schema = self._get_table(table_id).schema
+            rows = list(self.table_rows[table_id])
+        if limit is not None:
+            rows = rows[: int(limit)]
+
+        field_to_index = {field.name: index for index, field in enumerate(schema)}
+        return FakeQueryJob(
+            [
+                bigquery.Row(tuple(_to_python(row.get(field.name), field) for field in schema), field_to_index)
+                for row in rows
+            ]
+        )
+
+    def _get_row_errors(
+        self, schema: Sequence[bigquery.SchemaField], json_rows: Sequence[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        errors = []
+        field_names = {field.name for field in schema}
+        for index, row in enumerate(json_rows):
+            unknown_fields = sorted(set(row) - field_names)
+            if unknown_fields:
+                message = f"no such field: {unknown_fields[0]}."
+                errors.append({"index": index, "errors": [{"reason": "invalid", "message": message}]})
+            elif self._random.random() < self.backend_error_rate:
+                errors.append({"index": index, "errors": [{"reason": "backendError", "message": "Backend error"}]})
+        return errors
+
+    def _get_table(self, table_id: str) -> bigquery.Table:
+        if table_id not in self.tables:
+            raise NotFound(f"Not found: Table {table_id}")
+        return self.tables[table_id]
+
+    def _wait(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakeQueryJob:
+    def __init__(self, rows: List[bigquery.Row]):
+        self.job_id = str(uuid4())
+        self.errors = None
+        self._rows = rows
+
+    def result(self, page_size: Optional[int] = None, **_: Any) -> "FakeRowIterator":
+        return FakeRowIterator(self._rows, page_size or len(self._rows) or 1)
+
+
+class FakeRowIterator:
+    def __init__(self, rows: List[bigquery.Row], page_size: int):
+        self.total_rows = len(rows)
+        self._rows = rows
+        self._page_size = page_size
+
+    @property
+    def pages(self) -> Iterator[List[bigquery.Row]]:
+        for start in range(0, len(self._rows), self._page_size):
+            yield self._rows[start : start + self._page_size]
+
+    def __iter__(self) -> Iterator[bigquery.Row]:
+        return iter(self._rows)
+
+
+def _get_dataset_id(dataset: Union[bigquery.Dataset, str]) -> str:
+    if isinstance(dataset, str):
+        return dataset
+    return f"{dataset.project}.{dataset.dataset_id}"
+
+
+def _get_table_id(table: Union[bigquery.Table, str]) -> str:
+    if isinstance(table, str):
+        return table
+    return f"{table.project}.{table.dataset_id}.{table.table_id}"
+
+
+def _bad_request(message: str) -> BadRequest:
+    # BigQueryRepository reads the message from the response body
+    response = requests.Response()
+    response.status_code = 400
+    response._content = message.encode()  # pylint: disable=protected-access
+    return BadRequest(message, response=response)
+
+
+def _stop_rows(errors: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    by_index = {error["index"]: error for error in errors if error["errors"][0]["reason"] == "invalid"}
+    stopped = {"reason": "stopped", "message": ""}
+    return [by_index.get(index, {"index": index, "errors": [stopped]}) for index in range(count)]
+
+
+def _to_python(value: Any, field: bigquery.SchemaField) -> Any:
+    # JSON value -> Python type returned by the real client
+    if field.mode == "REPEATED":
+        return [_to_python_scalar(item, field) for item in value or []]
+    if value is None:
+        return None
+    return _to_python_scalar(value, field)
+
+
+def _to_python_scalar(value: Any, field: bigquery.SchemaField) -> Any:
+    if field.field_type in ("INTEGER", "INT64"):
+        return int(value)
+    if field.field_type in ("FLOAT", "FLOAT64"):
+        return float(value)
+    if field.field_type in ("BOOLEAN", "BOOL"):
+        return bool(value)
+    if field.field_type == "DATE":
+        return date.fromisoformat(value)
+    if field.field_type == "TIMESTAMP":
+        timestamp = datetime.fromisoformat(value)
+        if timestamp.tzinfo is None:
+            return timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.astimezone(timezone.utc)
+    if field.field_type in ("RECORD", "STRUCT"):
+        return {inner.name: _to_python(value.get(inner.name), inner) for inner in field.fields}
+    return value
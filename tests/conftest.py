@@ -0,0 +1,62 @@
+import time
+from datetime import date, datetime, timezone
+from typing import Any, List
+
+import pytest
+
+from pydantic_bigquery import BigQueryModelBase, BigQueryRepository
+from pydantic_bigquery.testing import FakeBigQueryClient
+
+TEST_PROJECT_ID = "platform-local"
+TEST_DATASET_ID = "test_package_til_bigquery"
+ROW_TABLE_ID = f"{TEST_PROJECT_ID}.{TEST_DATASET_ID}.row_model"
+
+
+class SmallModel(BigQueryModelBase):
+    __TABLE_NAME__: str = "small_model"
+
+    integer: int
+
+
+class RowModel(BigQueryModelBase):
+    # Rows of the fake repository, deduplicated by key
+    __TABLE_NAME__: str = "row_model"
+    __INSERT_ID_FIELD__ = "key"
+
+    key: str
+    integer: int
+    day: date
+    created_at: datetime
+    tags: List[str] = []
+
+
+def create_models(count: int, padding: int = 0) -> List[BigQueryModelBase]:
+    # padding -> larger rows
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        RowModel(key=f"{i}" + "x" * padding, integer=i, day=date(2024, 1, 1), created_at=created_at, tags=["a"])
+        for i in range(count)
+    ]
+
+
+def create_fake_repository(client: FakeBigQueryClient, **kwargs: Any) -> BigQueryRepository:
+    repository = BigQueryRepository(TEST_PROJECT_ID, TEST_DATASET_ID, client=client, **kwargs)
+    repository.create_dataset()
+    repository.create_table(RowModel)
+    return repository
+
+
+@pytest.fixture(name="fake_client")
+def fixture_fake_client() -> FakeBigQueryClient:
+    return FakeBigQueryClient()
+
+
+@pytest.fixture(name="fake_repository")
+def fixture_fake_repository(fake_client: FakeBigQueryClient) -> BigQueryRepository:
+    return create_fake_repository(fake_client)
+
+
+@pytest.fixture(name="no_sleep")
+def fixture_no_sleep(monkeypatch: Any) -> None:
+    # Backoff between retries
+    monkeypatch.setattr(time, "sleep", lambda _: None)
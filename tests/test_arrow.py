@@ -0,0 +1,88 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from tests.test_model import (
+    ExampleEnum,
+    ExampleModel,
+    ExampleModelNested,
+    ExampleModelNestedInner1,
+    ExampleModelNestedInner2,
+)
+
+pa = pytest.importorskip("pyarrow")
+
+
+def test_to_arrow_schema() -> None:
+    schema = ExampleModel.to_arrow_schema()
+
+    assert schema.field("insert_id").type == pa.string()
+    assert schema.field("inserted_at").type == pa.timestamp("us", tz="UTC")
+    assert not schema.field("my_integer").nullable
+    assert schema.field("my_nullable_integer").nullable
+    assert schema.field("my_date").type == pa.date32()
+    assert schema.field("my_enum").type == pa.string()
+    assert schema.field("my_repeatable_float").type == pa.list_(pa.field("item", pa.float64(), nullable=False))
+    assert schema.names == [field.name for field in ExampleModel.get_bigquery_schema()]
+
+
+def test_to_arrow_schema_nested() -> None:
+    struct1 = ExampleModelNested.to_arrow_schema().field("struct1")
+    inner2 = pa.struct([pa.field("my_integer", pa.int64(), nullable=False)])
+
+    assert struct1.type == pa.struct(
+        [
+            pa.field("struct2", inner2, nullable=False),
+            pa.field("nullable_struct2", inner2, nullable=True),
+            pa.field("repeatable_struct2", pa.list_(pa.field("item", inner2, nullable=False)), nullable=False),
+        ]
+    )
+
+
+def test_to_record_batch() -> None:
+    models = [
+        ExampleModel(
+            my_string=f"hello {i}",
+            my_integer=i,
+            my_float=1.5,
+            my_bool=True,
+            my_date=date(2021, 1, 2),
+            my_datetime=datetime(2021, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            my_enum=ExampleEnum.FOO,
+            my_nullable_integer=None if i else 7,
+            my_repeatable_string=["a", "b"],
+            my_repeatable_integer=[],
+            my_repeatable_float=[1.0],
+            my_repeatable_bool=[False],
+            my_repeatable_date=[date(2021, 1, 2)],
+            my_repeatable_datetime=[datetime(2021, 1, 2, tzinfo=timezone.utc)],
+        )
+        for i in range(3)
+    ]
+
+    batch = ExampleModel.to_record_batch(models)
+    rows = batch.to_pylist()
+
+    assert batch.num_rows == 3
+    assert batch.schema == ExampleModel.to_arrow_schema()
+    assert rows[0]["insert_id"] == str(models[0].insert_id)
+    assert rows[0]["my_enum"] == "FOO"
+    assert [row["my_nullable_integer"] for row in rows] == [7, None, None]
+    assert rows[2]["my_datetime"] == datetime(2021, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert rows[2]["my_repeatable_string"] == ["a", "b"]
+
+
+def test_to_record_batch_nested() -> None:
+    model = ExampleModelNested(
+        struct1=ExampleModelNestedInner1(
+            struct2=ExampleModelNestedInner2(my_integer=1),
+            repeatable_struct2=[ExampleModelNestedInner2(my_integer=2), ExampleModelNestedInner2(my_integer=3)],
+        )
+    )
+
+    (row,) = ExampleModelNested.to_record_batch([model]).to_pylist()
+    assert row["struct1"] == {
+        "struct2": {"my_integer": 1},
+        "nullable_struct2": None,
+        "repeatable_struct2": [{"my_integer": 2}, {"my_integer": 3}],
+    }
@@ -0,0 +1,202 @@
+import asyncio
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from google.auth.credentials import AnonymousCredentials
+
+from pydantic_bigquery import AsyncBigQueryRepository, BigQueryCompression, BigQueryInsertError, BigQueryModelBase
+from tests.conftest import TEST_DATASET_ID, TEST_PROJECT_ID, SmallModel
+from tests.test_model import ExampleModelNested, ExampleModelNestedInner1, ExampleModelNestedInner2
+
+
+class StubBigQuery:
+    def __init__(self, latency: float = 0.0, insert_errors: bool = False, failures: Optional[List[int]] = None):
+        self.latency = latency
+        self.insert_errors = insert_errors
+        self.failures = failures or []  # HTTP statuses of the first insertAll responses
+        self.insert_requests = 0
+        self.datasets: Dict[str, Dict[str, Any]] = {}
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self.inserted: List[Dict[str, Any]] = []
+        self.insert_ids: List[str] = []
+        self.content_encodings: List[Optional[str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/projects/{project}/datasets", self.create_dataset)
+        app.router.add_get("/projects/{project}/datasets/{dataset}", self.get_dataset)
+        app.router.add_post("/projects/{project}/datasets/{dataset}/tables", self.create_table)
+        app.router.add_get("/projects/{project}/datasets/{dataset}/tables/{table}", self.get_table)
+        app.router.add_post("/projects/{project}/datasets/{dataset}/tables/{table}/insertAll", self.insert_all)
+        return app
+
+    async def create_dataset(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        dataset_id = body["datasetReference"]["datasetId"]
+        if dataset_id in self.datasets:
+            return web.json_response({"error": {"message": "Already Exists"}}, status=409)
+        self.datasets[dataset_id] = body
+        return web.json_response(body)
+
+    async def get_dataset(self, request: web.Request) -> web.Response:
+        if request.match_info["dataset"] not in self.datasets:
+            return web.json_response({"error": {"message": "Not found"}}, status=404)
+        return web.json_response(self.datasets[request.match_info["dataset"]])
+
+    async def create_table(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.tables[body["tableReference"]["tableId"]] = body
+        return web.json_response(body)
+
+    async def get_table(self, request: web.Request) -> web.Response:
+        if request.match_info["table"] not in self.tables:
+            return web.json_response({"error": {"message": "Not found"}}, status=404)
+        return web.json_response(self.tables[request.match_info["table"]])
+
+    async def insert_all(self, request: web.Request) -> web.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            self.insert_requests += 1
+            if self.failures:
+                return web.json_response({"error": {"message": "Transient"}}, status=self.failures.pop(0))
+            self.content_encodings.append(request.headers.get("Content-Encoding"))
+            body = await request.json()  # Decompressed by aiohttp
+            if self.insert_errors:
+                return web.json_response({"insertErrors": [{"index": 0, "errors": [{"reason": "invalid"}]}]})
+            self.inserted.extend(row["json"] for row in body["rows"])
+            self.insert_ids.extend(row["insertId"] for row in body["rows"])
+            return web.json_response({})
+        finally:
+            self.in_flight -= 1
+
+
+def run_with_stub(stub: StubBigQuery, test: Any, **kwargs: Any) -> Any:
+    async def run() -> Any:
+        async with TestServer(stub.app()) as server:
+            async with AsyncBigQueryRepository(
+                project_id=TEST_PROJECT_ID,
+                dataset_id=TEST_DATASET_ID,
+                credentials=AnonymousCredentials(),
+                api_base_url=str(server.make_url("")),
+                **kwargs,
+            ) as repository:
+                return await test(repository)
+
+    return asyncio.run(run())
+
+
+def test_create_and_get_dataset() -> None:
+    stub = StubBigQuery()
+
+    async def test(repository: AsyncBigQueryRepository) -> None:
+        assert await repository.get_dataset() is None
+
+        dataset = await repository.create_dataset(description="TestDescription")
+        assert dataset.description == "TestDescription"
+
+        # exists_ok=True
+        await repository.create_dataset(description="TestDescription")
+
+        result = await repository.get_dataset()
+        assert result is not None
+        assert result.dataset_id == TEST_DATASET_ID
+
+    run_with_stub(stub, test)
+
+
+def test_create_and_get_table() -> None:
+    stub = StubBigQuery()
+
+    async def test(repository: AsyncBigQueryRepository) -> None:
+        assert await repository.get_table(ExampleModelNested) is None
+
+        table = await repository.create_table(ExampleModelNested, labels={"name": "value"})
+        assert table.labels == {"name": "value"}
+        assert table.schema == ExampleModelNested.get_bigquery_schema()
+
+        result = await repository.get_table(ExampleModelNested)
+        assert result is not None
+        assert result.table_id == ExampleModelNested.__TABLE_NAME__
+
+    run_with_stub(stub, test)
+
+
+def test_insert() -> None:
+    stub = StubBigQuery()
+    model = ExampleModelNested(
+        struct1=ExampleModelNestedInner1(
+            struct2=ExampleModelNestedInner2(my_integer=1),
+            repeatable_struct2=[ExampleModelNestedInner2(my_integer=2)],
+        )
+    )
+
+    async def test(repository: AsyncBigQueryRepository) -> None:
+        await repository.insert(model)
+
+    run_with_stub(stub, test)
+    assert stub.inserted == [model.bq_dict()]
+    assert stub.insert_ids == [str(model.insert_id)]
+
+
+def test_insert_concurrently() -> None:
+    stub = StubBigQuery(latency=0.05)
+    data: List[BigQueryModelBase] = [SmallModel(integer=i) for i in range(160)]
+
+    async def test(repository: AsyncBigQueryRepository) -> None:
+        repository.MAX_INSERT_BATCH_SIZE = 10
+        await repository.insert(data, max_concurrency=8)
+
+    run_with_stub(stub, test)
+    assert sorted(row["integer"] for row in stub.inserted) == list(range(160))
+    assert stub.max_in_flight == 8
+
+
+@pytest.mark.parametrize("compression", [BigQueryCompression.GZIP, BigQueryCompression.DEFLATE])
+def test_insert_compression(compression: BigQueryCompression) -> None:
+    stub = StubBigQuery()
+    data: List[BigQueryModelBase] = [SmallModel(integer=i) for i in range(1000)]
+
+    async def test(repository: AsyncBigQueryRepository) -> None:
+        await repository.insert(data)
+        await repository.insert(SmallModel(integer=1000))  # Under COMPRESSION_THRESHOLD_BYTES
+
+    run_with_stub(stub, test, compression=compression)
+    assert [row["integer"] for row in stub.inserted] == list(range(1001))
+    assert stub.content_encodings == [compression.value, None]
+
+
+def test_insert_retries_transient_errors() -> None:
+    stub = StubBigQuery(failures=[503, 429])
+
+    async def test(repository: AsyncBigQueryRepository) -> None:
+        await repository.insert(SmallModel(integer=1))
+
+    run_with_stub(stub, test)
+    assert stub.inserted == [{"integer": 1}]
+    assert stub.insert_requests == 3
+
+
+def test_insert_error() -> None:
+    stub = StubBigQuery(insert_errors=True)
+
+    async def test(repository: AsyncBigQueryRepository) -> None:
+        await repository.insert(SmallModel(integer=1))
+
+    with pytest.raises(BigQueryInsertError):
+        run_with_stub(stub, test)
+
+
+def test_import_is_lazy() -> None:
+    code = (
+        "import sys, pydantic_bigquery; print(sorted({'aiohttp', 'fastavro', 'prometheus_client'} & set(sys.modules)))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    assert output.strip() == "[]"
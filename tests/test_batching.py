@@ -0,0 +1,122 @@
+import json
+import math
+import time
+from typing import Any, Callable, Iterator, List
+
+import pytest
+
+from pydantic_bigquery.batching import (
+    create_batches,
+    create_insert_body,
+    encode_insert_row,
+    encoded_row_size,
+    max_insert_rows_bytes,
+    prefetch,
+    prefetch_parallel,
+)
+from pydantic_bigquery.encoding import _dumps_json, _dumps_orjson, _dumps_ujson, dumps, ujson
+from tests.test_model import ExampleModelNested, ExampleModelNestedInner1, ExampleModelNestedInner2
+
+
+def test_create_batches_max_rows() -> None:
+    rows = [dumps({"a": i}) for i in range(25)]
+    batches = list(create_batches(rows, max_rows=10, max_bytes=10_000_000, size=encoded_row_size))
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert [row for batch in batches for row in batch] == rows
+
+
+def test_create_batches_max_bytes() -> None:
+    rows = [dumps({"a": "a" * 1000}) for _ in range(10)]
+    row_size = encoded_row_size(rows[0])
+    batches = list(create_batches(rows, max_rows=10_000, max_bytes=3 * row_size, size=encoded_row_size))
+
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+
+
+def test_create_batches_oversized_row() -> None:
+    rows = [dumps({"a": "a"}), dumps({"a": "a" * 1000}), dumps({"a": "a"})]
+    batches = list(create_batches(rows, max_rows=10_000, max_bytes=500, size=encoded_row_size))
+
+    assert [len(batch) for batch in batches] == [1, 1, 1]
+
+
+def test_encode_insert_row() -> None:
+    model = ExampleModelNested(
+        struct1=ExampleModelNestedInner1(
+            struct2=ExampleModelNestedInner2(my_integer=1),
+            repeatable_struct2=[ExampleModelNestedInner2(my_integer=2)],
+        )
+    )
+
+    assert json.loads(encode_insert_row(model)) == {"insertId": str(model.insert_id), "json": model.bq_dict()}
+
+
+def test_create_insert_body() -> None:
+    rows = [dumps({"insertId": str(i), "json": {"a": "ž" * i}}) for i in range(3)]
+    body = create_insert_body(rows)
+
+    assert json.loads(body) == {"rows": [json.loads(row) for row in rows]}
+    assert len(body) == len(create_insert_body([])) + sum(encoded_row_size(row) for row in rows) - 1
+    assert max_insert_rows_bytes(len(body)) == sum(encoded_row_size(row) for row in rows)
+
+
+BACKENDS = [_dumps_orjson, _dumps_json] + ([_dumps_ujson] if ujson is not None else [])
+
+
+def test_dumps_backends() -> None:
+    value = {"a": [1, 2.5, None, True], "b": {"c": 'ž\n"x"'}}
+
+    assert json.loads(dumps(value)) == json.loads(_dumps_json(value)) == value
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_dumps_backends_equivalent(backend: Callable[[Any], bytes]) -> None:
+    row = {"json": {"a": [math.nan, math.inf, -math.inf, None], "b": 2**64 - 1, "c": -(2**63), "d": (1.5,)}}
+
+    assert json.loads(backend(row)) == {
+        "json": {"a": ["NaN", "Infinity", "-Infinity", None], "b": 2**64 - 1, "c": -(2**63), "d": [1.5]}
+    }
+    for value in (2**64, -(2**63) - 1):
+        with pytest.raises(ValueError, match="64-bit"):
+            backend({"json": {"a": [None, value]}})
+
+
+def test_prefetch() -> None:
+    assert list(prefetch(range(100), size=3)) == list(range(100))
+
+
+def test_prefetch_bounded() -> None:
+    produced: List[int] = []
+
+    def generate() -> Iterator[int]:
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    iterator = prefetch(generate(), size=3)
+    assert next(iterator) == 0
+    time.sleep(0.1)
+
+    # 1 consumed + 3 queued + 1 waiting for space in the queue
+    assert len(produced) == 5
+    iterator.close()
+
+
+def test_prefetch_error() -> None:
+    def generate() -> Iterator[int]:
+        yield 1
+        raise ValueError("Page error")
+
+    iterator = prefetch(generate(), size=3)
+    assert next(iterator) == 1
+    with pytest.raises(ValueError):
+        next(iterator)
+
+
+def test_prefetch_parallel() -> None:
+    result = list(prefetch_parallel([range(0, 50), range(50, 100), range(100, 150)], size=3))
+
+    assert sorted(result) == list(range(150))
+    # Order is kept within each iterable
+    assert [x for x in result if x < 50] == list(range(50))
@@ -0,0 +1,23 @@
+from benchmarks.models import MODELS
+from benchmarks.suite import run_benchmarks
+
+
+def test_models() -> None:
+    for model, factory in MODELS.values():
+        assert factory(1).bq_dict().keys() == {field.name for field in model.get_bigquery_schema()}
+
+
+def test_run_benchmarks() -> None:
+    results = run_benchmarks(rows=20, repeat=1, latency=0.0, models=["flat", "nested"])
+
+    assert [(result.model, result.name) for result in results] == [
+        (model, name) for model in ("flat", "nested") for name in ("schema", "serialize", "batching", "insert")
+    ]
+    assert all(result.items_per_second > 0 for result in results)
+    assert all(result.peak_bytes_per_item > 0 for result in results)
+
+
+def test_run_benchmarks_filter() -> None:
+    results = run_benchmarks(rows=10, repeat=1, latency=0.0, models=["wide"], names=["serialize"])
+
+    assert [(result.model, result.name, result.items) for result in results] == [("wide", "serialize", 10)]
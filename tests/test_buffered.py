@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+from mock import create_autospec
+
+from pydantic_bigquery import BigQueryBufferFullError, BigQueryModelBase, BigQueryRepository, BufferedInserter
+from tests.conftest import SmallModel
+
+
+class OtherModel(BigQueryModelBase):
+    __TABLE_NAME__: str = "other_model"
+
+    integer: int
+
+
+def inserted_batches(repository: BigQueryRepository) -> List[List[Dict[str, Any]]]:
+    # Rows as bq_dict()
+    calls = repository.insert_encoded.call_args_list  # type: ignore[attr-defined]
+    return [[json.loads(row)["json"] for row in call.args[1]] for call in calls]
+
+
+def test_flush_on_max_rows() -> None:
+    repository = create_autospec(BigQueryRepository, instance=True)
+
+    with BufferedInserter(repository, max_rows=5, max_delay_ms=60_000) as inserter:
+        for i in range(10):
+            inserter.insert(SmallModel(integer=i))
+
+    assert [len(batch) for batch in inserted_batches(repository)] == [5, 5]
+
+
+def test_flush_on_max_delay() -> None:
+    repository = create_autospec(BigQueryRepository, instance=True)
+
+    with BufferedInserter(repository, max_delay_ms=50) as inserter:
+        inserter.insert(SmallModel(integer=1))
+        time.sleep(0.5)
+
+        assert inserted_batches(repository) == [[{"integer": 1}]]
+
+
+def test_flush_only_full_max_rows_batches() -> None:
+    repository = create_autospec(BigQueryRepository, instance=True)
+    release = threading.Event()
+    repository.insert_encoded.side_effect = lambda table_name, rows: release.wait()
+
+    with BufferedInserter(repository, max_rows=2, max_delay_ms=500) as inserter:
+        # The flusher is busy with the first batch while the next rows are buffered
+        inserter.insert([SmallModel(integer=0), SmallModel(integer=1), SmallModel(integer=2)])
+        time.sleep(0.3)
+        inserter.insert([SmallModel(integer=3), SmallModel(integer=4)])
+        release.set()
+        time.sleep(0.3)
+
+        # Only the full batch of 2 is sent, the row left (added 0.3 s ago) waits for its own deadline
+        assert inserted_batches(repository) == [[{"integer": 0}, {"integer": 1}], [{"integer": 2}, {"integer": 3}]]
+        time.sleep(0.5)
+
+        assert inserted_batches(repository)[2:] == [[{"integer": 4}]]
+
+
+def test_flush_on_close_per_table() -> None:
+    repository = create_autospec(BigQueryRepository, instance=True)
+
+    with BufferedInserter(repository, max_delay_ms=60_000) as inserter:
+        inserter.insert([SmallModel(integer=1), OtherModel(integer=2), SmallModel(integer=3)])
+        assert not repository.insert_encoded.called
+
+    assert sorted(inserted_batches(repository), key=len) == [[{"integer": 2}], [{"integer": 1}, {"integer": 3}]]
+    assert sorted(call.args[0] for call in repository.insert_encoded.call_args_list) == ["other_model", "small_model"]
+
+
+def test_backpressure_reject() -> None:
+    repository = create_autospec(BigQueryRepository, instance=True)
+    release = threading.Event()
+    repository.insert_encoded.side_effect = lambda table_name, rows: release.wait()
+
+    with BufferedInserter(repository, max_rows=1, max_queue_rows=2, block=False) as inserter:
+        inserter.insert([SmallModel(integer=1), SmallModel(integer=2)])
+
+        with pytest.raises(BigQueryBufferFullError):
+            inserter.insert(SmallModel(integer=3))
+
+        release.set()
+
+
+def test_backpressure_block_timeout() -> None:
+    repository = create_autospec(BigQueryRepository, instance=True)
+    release = threading.Event()
+    repository.insert_encoded.side_effect = lambda table_name, rows: release.wait()
+
+    with BufferedInserter(repository, max_rows=1, max_queue_rows=1, block_timeout=0.1) as inserter:
+        inserter.insert(SmallModel(integer=1))
+
+        with pytest.raises(BigQueryBufferFullError):
+            inserter.insert(SmallModel(integer=2))
+
+        release.set()
+        inserter.insert(SmallModel(integer=3))
+
+
+def test_backpressure_block_close() -> None:
+    repository = create_autospec(BigQueryRepository, instance=True)
+    release = threading.Event()
+    repository.insert_encoded.side_effect = lambda table_name, rows: release.wait()
+    inserter = BufferedInserter(repository, max_rows=1, max_queue_rows=1)
+    inserter.insert(SmallModel(integer=1))
+
+    errors: List[Exception] = []
+
+    def produce() -> None:
+        try:
+            inserter.insert(SmallModel(integer=2))  # Blocked until close()
+        except BigQueryBufferFullError as e:
+            errors.append(e)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    time.sleep(0.1)
+    closer = threading.Thread(target=inserter.close)  # Waits for the flusher, blocked in insert
+    closer.start()
+
+    try:
+        producer.join(timeout=5)
+        assert not producer.is_alive()
+        assert len(errors) == 1
+    finally:
+        release.set()
+        closer.join()
+    assert inserted_batches(repository) == [[{"integer": 1}]]
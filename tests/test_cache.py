@@ -0,0 +1,61 @@
+import pytest
+
+from pydantic_bigquery import BigQueryMetadataCache
+from pydantic_bigquery import cache as cache_module
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def test_ttl(clock: FakeClock) -> None:
+    cache = BigQueryMetadataCache(ttl=10, negative_ttl=1)
+    cache.set("p.d.found", "table")
+    cache.set("p.d.missing", None)
+
+    assert cache.get("p.d.found") == (True, "table")
+    assert cache.get("p.d.missing") == (True, None)
+
+    clock.now += 5
+    assert cache.get("p.d.found") == (True, "table")
+    assert cache.get("p.d.missing") == (False, None)
+
+    clock.now += 5
+    assert cache.get("p.d.found") == (False, None)
+
+
+def test_lru() -> None:
+    cache = BigQueryMetadataCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    # "b" was the least recently used
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+
+
+def test_invalidate() -> None:
+    cache = BigQueryMetadataCache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.invalidate("a")
+    assert cache.get("a") == (False, None)
+    assert cache.get("b") == (True, 2)
+
+    cache.invalidate()
+    assert cache.get("b") == (False, None)
@@ -0,0 +1,206 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest
+from mock import MagicMock
+
+from pydantic_bigquery import (
+    BigQueryInstrumentation,
+    BigQueryOpenTelemetryInstrumentation,
+    BigQueryPrometheusInstrumentation,
+)
+from pydantic_bigquery.instrumentation import INSERT_BATCH
+from pydantic_bigquery.testing import FakeBigQueryClient
+from tests.conftest import ROW_TABLE_ID, create_fake_repository, create_models
+
+
+class RecordingInstrumentation(BigQueryInstrumentation):
+    def __init__(self) -> None:
+        self.spans: List[Tuple[str, Dict[str, Any]]] = []
+        self.counters: Dict[str, float] = {}
+        self.observations: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, attributes: Dict[str, Any]) -> Iterator[None]:
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.spans.append((name, attributes))
+
+    def increment(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        with self._lock:
+            self.observations.setdefault(name, []).append(value)
+
+    def span_names(self) -> List[str]:
+        return [name for name, _ in self.spans]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_insert_spans(max_workers: int) -> None:
+    recording = RecordingInstrumentation()
+    repository = create_fake_repository(FakeBigQueryClient(), instrumentation=recording)
+    repository.MAX_INSERT_BATCH_SIZE = 10
+
+    repository.insert(create_models(25), max_workers=max_workers)
+
+    names = recording.span_names()
+    assert names.count("bigquery.insert") == 1
+    assert names.count("bigquery.insert.serialize") == 3
+    assert names.count("bigquery.insert.batch") == 3
+    assert names.count("bigquery.insert.request") == 3
+    assert names[-1] == "bigquery.insert"
+
+    batch_attributes = sorted(
+        (attributes["batch_index"], attributes["rows"])
+        for name, attributes in recording.spans
+        if name == "bigquery.insert.batch"
+    )
+    assert batch_attributes == [(0, 10), (1, 10), (2, 5)]
+    assert all(attributes["table_id"] == ROW_TABLE_ID for _, attributes in recording.spans)
+
+    assert recording.counters == {"bigquery.insert.rows": 25}
+    assert len(recording.observations["bigquery.insert.request.bytes"]) == 3
+    assert all(size > 0 for size in recording.observations["bigquery.insert.request.bytes"])
+
+
+@pytest.mark.usefixtures("no_sleep")
+def test_insert_retries() -> None:
+    recording = RecordingInstrumentation()
+    repository = create_fake_repository(FakeBigQueryClient(backend_error_rate=0.3, seed=1), instrumentation=recording)
+
+    result = repository.insert(create_models(100))
+
+    assert recording.counters["bigquery.insert.retries"] == result.retries > 0
+    assert recording.counters["bigquery.insert.rows"] == 100
+    assert recording.span_names().count("bigquery.insert.request") == result.retries + 1
+
+
+def test_insert_bisections() -> None:
+    recording = RecordingInstrumentation()
+    repository = create_fake_repository(FakeBigQueryClient(max_request_bytes=50_000), instrumentation=recording)
+
+    repository.insert(create_models(20, padding=5_000))
+
+    # 20 rows of 10 kB (key + insertId) = 200 kB -> 100 kB halves -> 50 kB quarters (over the limit with the envelope)
+    # -> 8 eighths are sent
+    assert recording.counters["bigquery.insert.bisections"] == 7
+    assert recording.counters["bigquery.insert.rows"] == 20
+    assert recording.span_names().count("bigquery.insert.request") == 15
+
+
+def test_insert_rejected_rows(fake_client: FakeBigQueryClient) -> None:
+    recording = RecordingInstrumentation()
+    repository = create_fake_repository(fake_client, instrumentation=recording)
+    repository._dead_letter_callback = lambda table_id, rows: None  # pylint: disable=protected-access
+    schema = fake_client.tables[ROW_TABLE_ID].schema
+    fake_client.tables[ROW_TABLE_ID].schema = [field for field in schema if field.name != "key"]
+
+    repository.insert(create_models(3))
+
+    assert recording.counters == {"bigquery.insert.rows": 0, "bigquery.insert.rejected_rows": 3}
+
+
+def test_noop_instrumentation() -> None:
+    instrumentation = BigQueryInstrumentation()
+
+    with instrumentation.span("bigquery.insert", {"table_id": ROW_TABLE_ID}):
+        instrumentation.increment("bigquery.insert.rows", 1, {"table_id": ROW_TABLE_ID})
+        instrumentation.observe("bigquery.insert.request.bytes", 1, {"table_id": ROW_TABLE_ID})
+
+
+def test_opentelemetry_instrumentation() -> None:
+    tracer, meter = MagicMock(), MagicMock()
+    instrumentation = BigQueryOpenTelemetryInstrumentation(tracer=tracer, meter=meter)
+    repository = create_fake_repository(FakeBigQueryClient(), instrumentation=instrumentation)
+
+    repository.insert(create_models(5))
+
+    span_names = [call.args[0] for call in tracer.start_as_current_span.call_args_list]
+    assert span_names == [
+        "bigquery.insert",
+        "bigquery.insert.serialize",
+        "bigquery.insert.batch",
+        "bigquery.insert.request",
+    ]
+    meter.create_counter.assert_called_once_with("bigquery.insert.rows")
+    meter.create_counter.return_value.add.assert_called_once_with(5, attributes={"table_id": ROW_TABLE_ID})
+    meter.create_histogram.assert_called_once_with("bigquery.insert.request.bytes")
+
+
+def test_prometheus_instrumentation() -> None:
+    prometheus_client = pytest.importorskip("prometheus_client")
+    registry = prometheus_client.CollectorRegistry()
+    repository = create_fake_repository(
+        FakeBigQueryClient(), instrumentation=BigQueryPrometheusInstrumentation(registry=registry)
+    )
+
+    repository.insert(create_models(5))
+    repository.insert(create_models(5))
+
+    labels = {"table_id": ROW_TABLE_ID}
+    assert registry.get_sample_value("bigquery_insert_rows_total", labels) == 10
+    assert registry.get_sample_value("bigquery_insert_seconds_count", labels) == 2
+    assert registry.get_sample_value("bigquery_insert_request_seconds_count", labels) == 2
+    assert registry.get_sample_value("bigquery_insert_request_bytes_count", labels) == 2
+
+
+def test_prometheus_bytes_buckets() -> None:
+    prometheus_client = pytest.importorskip("prometheus_client")
+    registry = prometheus_client.CollectorRegistry()
+    instrumentation = BigQueryPrometheusInstrumentation(registry=registry)
+    labels = {"table_id": ROW_TABLE_ID}
+
+    for size in [500, 3000, 3000, 2_000_000, 20_000_000]:
+        instrumentation.observe("bigquery.insert.request.bytes", size, labels)
+
+    def bucket(le: str) -> Any:
+        return registry.get_sample_value("bigquery_insert_request_bytes_bucket", {**labels, "le": le})
+
+    assert bucket("1024.0") == 1
+    assert bucket("2048.0") == 1
+    assert bucket("4096.0") == 3
+    assert bucket("2.097152e+06") == 4
+    assert bucket("1.6777216e+07") == 4
+    assert bucket("+Inf") == 5
+
+
+def test_prometheus_default_registry() -> None:
+    prometheus_client = pytest.importorskip("prometheus_client")
+    labels = {"table_id": ROW_TABLE_ID}
+    before = prometheus_client.REGISTRY.get_sample_value("bigquery_insert_rows_total", labels) or 0
+
+    # Each adapter would register the same metrics again (DuplicateTimeseries)
+    for _ in range(2):
+        repository = create_fake_repository(FakeBigQueryClient(), instrumentation=BigQueryPrometheusInstrumentation())
+        assert repository.insert(create_models(5)).rows == 5
+
+    assert prometheus_client.REGISTRY.get_sample_value("bigquery_insert_rows_total", labels) == before + 10
+
+
+class FailingInstrumentation(BigQueryInstrumentation):
+    @contextmanager
+    def span(self, name: str, attributes: Dict[str, Any]) -> Iterator[None]:
+        if name == INSERT_BATCH:
+            raise RuntimeError("Span start")
+        yield
+        raise RuntimeError("Span end")
+
+    def increment(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        raise RuntimeError("Increment")
+
+    def observe(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        raise RuntimeError("Observe")
+
+
+def test_instrumentation_errors_are_ignored(fake_client: FakeBigQueryClient) -> None:
+    repository = create_fake_repository(fake_client, instrumentation=FailingInstrumentation())
+
+    assert repository.insert(create_models(5)).rows == 5
+    assert len(fake_client.table_rows[ROW_TABLE_ID]) == 5
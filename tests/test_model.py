@@ -1,12 +1,16 @@
+import json
 from datetime import date, datetime, timezone
 from enum import Enum
 from typing import List, Optional
 from uuid import UUID, uuid4
 
-from google.cloud.bigquery import SchemaField
-from pydantic import BaseModel, Field
+import pytest
+from google.cloud.bigquery import Row, SchemaField
+from pydantic import BaseModel, Field, ValidationError
 
-from pydantic_bigquery import BigQueryModel
+from pydantic_bigquery import BigQueryModel, BigQueryModelBase
+from pydantic_bigquery.batching import create_insert_row
+from pydantic_bigquery.model import get_schema_fingerprint
 
 
 class ExampleEnum(Enum):
@@ -159,3 +163,168 @@ def test_get_schema_nested() -> None:
     ]
 
     assert result == expected
+
+
+def test_bq_dict() -> None:
+    model = ExampleModel(
+        my_string="hello",
+        my_integer=1,
+        my_float=1.23,
+        my_bool=True,
+        my_date=date.today(),
+        my_datetime=datetime.now(timezone.utc),
+        my_enum=ExampleEnum.FOO,
+        my_nullable_date=date.today(),
+        my_repeatable_string=["hello", "world"],
+        my_repeatable_integer=[1, 2],
+        my_repeatable_float=[1.23, 4.56],
+        my_repeatable_bool=[False, True],
+        my_repeatable_date=[date.today()],
+        my_repeatable_datetime=[datetime.now(timezone.utc)],
+    )
+
+    assert model.bq_dict() == json.loads(model.json())
+
+
+def test_bq_dict_nested() -> None:
+    model = ExampleModelNested(
+        struct1=ExampleModelNestedInner1(
+            struct2=ExampleModelNestedInner2(my_integer=1),
+            repeatable_struct2=[ExampleModelNestedInner2(my_integer=2), ExampleModelNestedInner2(my_integer=3)],
+        )
+    )
+
+    assert model.bq_dict() == json.loads(model.json())
+
+
+def test_bq_dict_custom_json_encoders() -> None:
+    class ModelWithEncoders(BigQueryModel):
+        my_datetime: datetime
+
+        class Config:
+            json_encoders = {datetime: lambda v: v.strftime("%Y-%m-%d %H:%M:%S")}
+
+    model = ModelWithEncoders(my_datetime=datetime(2021, 1, 2, 3, 4, 5))
+    assert model.bq_dict()["my_datetime"] == "2021-01-02 03:04:05"
+
+
+def test_bq_insert_id() -> None:
+    class ModelWithoutInsertId(BigQueryModelBase):
+        my_integer: int
+
+    class ModelWithCustomInsertId(BigQueryModelBase):
+        __INSERT_ID_FIELD__: Optional[str] = "my_integer"
+
+        my_integer: int
+
+    model = ExampleModelNested(
+        struct1=ExampleModelNestedInner1(struct2=ExampleModelNestedInner2(my_integer=1), repeatable_struct2=[])
+    )
+    assert model.bq_insert_id() == str(model.insert_id)
+    assert ModelWithoutInsertId(my_integer=1).bq_insert_id() is None
+    assert ModelWithCustomInsertId(my_integer=1).bq_insert_id() == "1"
+
+
+def test_bq_insert_id_none() -> None:
+    class ModelWithOptionalInsertId(BigQueryModelBase):
+        __INSERT_ID_FIELD__: Optional[str] = "key"
+
+        key: Optional[str]
+
+    assert ModelWithOptionalInsertId(key=None).bq_insert_id() is None
+    assert ModelWithOptionalInsertId(key="a").bq_insert_id() == "a"
+
+    # A random insertId per row, not a shared "None"
+    rows = [create_insert_row(ModelWithOptionalInsertId(key=None)) for _ in range(2)]
+    assert rows[0]["insertId"] != rows[1]["insertId"]
+    assert "None" not in (rows[0]["insertId"], rows[1]["insertId"])
+
+
+def test_get_schema_cached() -> None:
+    assert ExampleModel.get_bigquery_schema() == ExampleModel.get_bigquery_schema()
+    assert ExampleModel.get_bigquery_schema()[0] is ExampleModel.get_bigquery_schema()[0]
+
+    # Callers get their own list
+    schema = ExampleModel.get_bigquery_schema()
+    schema.pop()
+    assert len(ExampleModel.get_bigquery_schema()) == len(schema) + 1
+
+
+def test_get_schema_fingerprint() -> None:
+    class ModelA(BigQueryModelBase):
+        my_integer: int
+
+    class ModelB(BigQueryModelBase):
+        my_integer: Optional[int]
+
+    class ModelC(BigQueryModelBase):
+        my_integer: int
+
+    assert ModelA.get_bigquery_schema_fingerprint() != ModelB.get_bigquery_schema_fingerprint()
+    assert ModelA.get_bigquery_schema_fingerprint() == ModelC.get_bigquery_schema_fingerprint()
+
+    # API representation (e.g. from get_table) has the same fingerprint
+    api_schema = [SchemaField.from_api_repr(field.to_api_repr()) for field in ExampleModelNested.get_bigquery_schema()]
+    assert get_schema_fingerprint(api_schema) == ExampleModelNested.get_bigquery_schema_fingerprint()
+
+
+def test_from_bq_row() -> None:
+    model = ExampleModel(
+        my_string="hello",
+        my_integer=1,
+        my_float=1.23,
+        my_bool=True,
+        my_date=date.today(),
+        my_datetime=datetime.now(timezone.utc),
+        my_enum=ExampleEnum.FOO,
+        my_nullable_date=date.today(),
+        my_repeatable_string=["hello", "world"],
+        my_repeatable_integer=[1, 2],
+        my_repeatable_float=[1.23, 4.56],
+        my_repeatable_bool=[False, True],
+        my_repeatable_date=[date.today()],
+        my_repeatable_datetime=[datetime.now(timezone.utc)],
+    )
+    # Python types as returned by the BigQuery client
+    values = {**model.dict(), "insert_id": str(model.insert_id), "my_enum": "FOO"}
+    row = Row(tuple(values.values()), {name: index for index, name in enumerate(values)})
+
+    result = ExampleModel.from_bq_row(row)
+
+    assert result == model
+    assert isinstance(result.insert_id, UUID)
+    assert result.my_enum is ExampleEnum.FOO
+    assert ExampleModel.from_bq_row(row, strict=True) == model
+
+
+def test_from_bq_row_nested() -> None:
+    model = ExampleModelNested(
+        struct1=ExampleModelNestedInner1(
+            struct2=ExampleModelNestedInner2(my_integer=1),
+            repeatable_struct2=[ExampleModelNestedInner2(my_integer=2), ExampleModelNestedInner2(my_integer=3)],
+        )
+    )
+
+    result = ExampleModelNested.from_bq_rows([{**model.dict(), "insert_id": str(model.insert_id)}])
+
+    assert result == [model]
+    assert isinstance(result[0].struct1.repeatable_struct2[0], ExampleModelNestedInner2)
+
+
+def test_from_bq_row_missing_column() -> None:
+    result = ExampleModelNested.from_bq_row({"struct1": {"struct2": {"my_integer": 1}, "repeatable_struct2": []}})
+
+    # Default factory is used for columns not selected
+    assert isinstance(result.insert_id, UUID)
+    assert result.__fields_set__ == {"struct1"}
+
+
+def test_from_bq_row_strict() -> None:
+    class SmallModel(BigQueryModelBase):
+        my_integer: int
+
+    # Trusted: no validation
+    assert SmallModel.from_bq_row({"my_integer": "not a number"}).my_integer == "not a number"
+
+    with pytest.raises(ValidationError):
+        SmallModel.from_bq_row({"my_integer": "not a number"}, strict=True)
@@ -0,0 +1,50 @@
+import os
+from typing import List
+
+import pytest
+
+from pydantic_bigquery.parallel import chunked, map_chunks
+
+
+def chunk_sum(items: List[int]) -> int:
+    return sum(items)
+
+
+def chunk_pid(_items: List[int]) -> int:
+    return os.getpid()
+
+
+def fail(items: List[int]) -> int:
+    raise ValueError(f"Cannot process {items}")
+
+
+def test_chunked() -> None:
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert not list(chunked([], 3))
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_map_chunks_sequence(processes: int) -> None:
+    items = list(range(1000))
+
+    assert list(map_chunks(chunk_sum, items, 7, processes)) == [sum(chunk) for chunk in chunked(items, 7)]
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_map_chunks_iterator(processes: int) -> None:
+    items = (i for i in range(1000))
+
+    assert list(map_chunks(chunk_sum, items, 7, processes)) == [sum(chunk) for chunk in chunked(range(1000), 7)]
+
+
+def test_map_chunks_processes() -> None:
+    pids = set(map_chunks(chunk_pid, list(range(100)), 1, 2))
+
+    assert os.getpid() not in pids
+    assert len(pids) <= 2
+    assert set(map_chunks(chunk_pid, list(range(100)), 1, 0)) == {os.getpid()}
+
+
+def test_map_chunks_error() -> None:
+    with pytest.raises(ValueError, match="Cannot process"):
+        list(map_chunks(fail, list(range(10)), 5, 2))
@@ -1,14 +1,34 @@
+import io
+import json
 from datetime import date, datetime, timedelta, timezone
-from typing import List, Optional
+from typing import IO, Any, Iterator, List, Optional, Type
 from uuid import UUID
 
 import pytest
+import requests
 from faker import Faker
-from google.api_core.exceptions import BadRequest
+from google.api_core.exceptions import BadRequest, NotFound
+from google.auth.credentials import AnonymousCredentials
 from google.cloud import bigquery
-from mock import create_autospec
-
-from pydantic_bigquery import BigQueryFetchError, BigQueryLocation, BigQueryModel, BigQueryModelBase, BigQueryRepository
+from mock import MagicMock, create_autospec
+
+from pydantic_bigquery import (
+    BigQueryCompression,
+    BigQueryFetchError,
+    BigQueryInsertError,
+    BigQueryInsertResult,
+    BigQueryLocation,
+    BigQueryMetadataCache,
+    BigQueryModel,
+    BigQueryModelBase,
+    BigQueryRepository,
+    BigQuerySchemaMismatchError,
+    BigQuerySourceFormat,
+    parallel,
+)
+from pydantic_bigquery.batching import create_insert_body, encode_insert_row
+from pydantic_bigquery.encoding import decompress_body
+from tests.conftest import TEST_DATASET_ID, TEST_PROJECT_ID, SmallModel
 from tests.test_model import (
     ExampleEnum,
     ExampleModel,
@@ -17,9 +37,6 @@ from tests.test_model import (
     ExampleModelNestedInner2,
 )
 
-TEST_PROJECT_ID = "platform-local"
-TEST_DATASET_ID = "test_package_til_bigquery"
-
 
 class ExampleBigQueryRepository(BigQueryRepository):
     def get_example(self, insert_id: UUID) -> Optional[ExampleModel]:
@@ -90,6 +107,34 @@ def fixture_bq_repository() -> BigQueryRepository:
     return BigQueryRepository(project_id=TEST_PROJECT_ID, dataset_id=TEST_DATASET_ID)
 
 
+@pytest.fixture(name="mock_client")
+def fixture_mock_client() -> bigquery.Client:
+    client = create_autospec(bigquery.Client, instance=True)
+    client.insert_rows_json.return_value = []
+    call_api = client._call_api  # pylint: disable=protected-access
+    call_api.side_effect = lambda retry, **kwargs: call_insert_rows_json(client, **kwargs)
+    return client
+
+
+def call_insert_rows_json(client: bigquery.Client, **kwargs: Any) -> Any:
+    # The repository posts encoded insertAll bodies, checked as insert_rows_json calls (rows as dicts)
+    assert kwargs["method"] == "POST" and kwargs["path"].endswith("/insertAll")
+    _, _, project_id, _, dataset_id, _, table_id, _ = kwargs["path"].split("/")
+    rows = json.loads(decompress_body(kwargs["data"], kwargs["headers"].get("Content-Encoding")))["rows"]
+    errors = client.insert_rows_json(
+        f"{project_id}.{dataset_id}.{table_id}",
+        [row["json"] for row in rows],
+        row_ids=[row["insertId"] for row in rows],
+        timeout=kwargs["timeout"],
+    )
+    return {"insertErrors": errors or []}
+
+
+@pytest.fixture(name="mock_bq_repository")
+def fixture_mock_bq_repository(mock_client: bigquery.Client) -> BigQueryRepository:
+    return BigQueryRepository(project_id=TEST_PROJECT_ID, dataset_id=TEST_DATASET_ID, client=mock_client)
+
+
 @pytest.fixture(scope="session", name="example_bq_repository")
 def fixture_example_bq_repository() -> ExampleBigQueryRepository:
     return ExampleBigQueryRepository(project_id=TEST_PROJECT_ID, dataset_id=TEST_DATASET_ID)
@@ -250,3 +295,507 @@ def test_insert_over_max_size(bq_repository: BigQueryRepository):
         TinyBigQueryModel(integer=i) for i in range(bq_repository.MAX_INSERT_BATCH_SIZE + 1)
     ]
     bq_repository.insert(data)
+
+
+def test_insert_batches_by_bytes(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    class WideModel(BigQueryModelBase):
+        __TABLE_NAME__: str = "wide_model"
+
+        a: str
+
+    mock_bq_repository.MAX_INSERT_BATCH_BYTES = 10_000
+    data: List[BigQueryModelBase] = [WideModel(a="a" * 1000) for _ in range(25)]
+    mock_bq_repository.insert(data)
+
+    batches = [call.args[1] for call in mock_client.insert_rows_json.call_args_list]
+    assert [len(batch) for batch in batches] == [9, 9, 7]
+    assert sum(batches, []) == [x.bq_dict() for x in data]
+
+
+def test_insert_encoded(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    rows = [encode_insert_row(SmallModel(integer=i)) for i in range(3)]
+
+    result = mock_bq_repository.insert_encoded("small_model", rows)
+
+    assert result.rows == 3
+    (call,) = mock_client._call_api.call_args_list  # pylint: disable=protected-access
+    assert call.kwargs["data"] == create_insert_body(rows)
+
+
+def test_insert_client_contract() -> None:
+    # Real Client, only its HTTP session is stubbed: insertAll is posted through the private Client._call_api
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(  # pylint: disable=protected-access
+        {"insertErrors": [{"index": 1, "errors": [{"reason": "invalid", "message": "no such field"}]}]}
+    ).encode()
+    http = MagicMock()
+    http.request.return_value = response
+    client = bigquery.Client(TEST_PROJECT_ID, credentials=AnonymousCredentials(), _http=http)
+    dead_letters: List[Any] = []
+    repository = BigQueryRepository(
+        TEST_PROJECT_ID,
+        TEST_DATASET_ID,
+        client=client,
+        dead_letter_callback=lambda table_id, rows: dead_letters.extend(rows),
+        compression=BigQueryCompression.GZIP,
+    )
+    repository.COMPRESSION_THRESHOLD_BYTES = 0
+    data: List[BigQueryModelBase] = [SmallModel(integer=i) for i in range(3)]
+
+    repository.insert(data)
+
+    (call,) = http.request.call_args_list
+    assert call.kwargs["method"] == "POST"
+    assert call.kwargs["url"].startswith(
+        f"https://bigquery.googleapis.com/bigquery/v2/projects/{TEST_PROJECT_ID}"
+        f"/datasets/{TEST_DATASET_ID}/tables/small_model/insertAll"
+    )
+    assert call.kwargs["headers"]["Content-Type"] == "application/json"
+    assert call.kwargs["headers"]["Content-Encoding"] == "gzip"
+    rows = json.loads(decompress_body(call.kwargs["data"], "gzip"))["rows"]
+    assert [row["json"] for row in rows] == [x.bq_dict() for x in data]
+    assert dead_letters == [(data[1].bq_dict(), [{"reason": "invalid", "message": "no such field"}])]
+
+
+@pytest.mark.parametrize("compression", [BigQueryCompression.GZIP, BigQueryCompression.DEFLATE])
+def test_insert_compression(mock_client: bigquery.Client, compression: BigQueryCompression) -> None:
+    repository = BigQueryRepository(TEST_PROJECT_ID, TEST_DATASET_ID, client=mock_client, compression=compression)
+    data: List[BigQueryModelBase] = [
+        ExampleModelNested(
+            struct1=ExampleModelNestedInner1(struct2=ExampleModelNestedInner2(my_integer=i), repeatable_struct2=[])
+        )
+        for i in range(1000)
+    ]
+    repository.insert(data)
+    repository.insert(data[0])  # Under COMPRESSION_THRESHOLD_BYTES
+
+    large, small = mock_client._call_api.call_args_list  # pylint: disable=protected-access
+    assert large.kwargs["headers"] == {"Content-Encoding": compression.value}
+    assert len(large.kwargs["data"]) < len(create_insert_body([encode_insert_row(x) for x in data])) / 5
+    assert small.kwargs["headers"] == {}
+    rows = [row for call in mock_client.insert_rows_json.call_args_list for row in call.args[1]]
+    assert rows == [x.bq_dict() for x in data + data[:1]]
+
+
+def test_insert_batches_exact_bytes(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    class WideModel(BigQueryModelBase):
+        __TABLE_NAME__: str = "wide_model"
+
+        a: str
+
+    mock_bq_repository.MAX_INSERT_BATCH_BYTES = 10_000
+    data: List[BigQueryModelBase] = [WideModel(a="a" * (900 + i)) for i in range(50)]
+    mock_bq_repository.insert(data)
+
+    calls = mock_client._call_api.call_args_list  # pylint: disable=protected-access
+    bodies = [call.kwargs["data"] for call in calls]
+    assert all(isinstance(body, bytes) and len(body) <= 10_000 for body in bodies)
+    assert all(call.kwargs["content_type"] == "application/json" for call in calls)
+    # Full batches: the next row would not fit
+    first_rows = [len(json.loads(body)["rows"]) for body in bodies]
+    next_row = json.dumps({"insertId": "x" * 36, "json": data[first_rows[0]].bq_dict()}, separators=(",", ":"))
+    assert len(bodies[0]) + len(next_row) + 1 > 10_000
+    assert sum(first_rows) == 50
+
+
+def test_insert_concurrently(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    mock_bq_repository.MAX_INSERT_BATCH_SIZE = 10
+    data: List[BigQueryModelBase] = [SmallModel(integer=i) for i in range(95)]
+    mock_bq_repository.insert(data, max_workers=4)
+
+    batches = [call.args[1] for call in mock_client.insert_rows_json.call_args_list]
+    assert len(batches) == 10
+    assert sorted(row["integer"] for batch in batches for row in batch) == list(range(95))
+
+
+def test_insert_concurrently_collects_errors(
+    mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client
+) -> None:
+    mock_bq_repository.MAX_INSERT_BATCH_SIZE = 10
+    mock_client.insert_rows_json.side_effect = lambda table_id, rows, **kwargs: (
+        [{"index": 0, "errors": [{"reason": "invalid"}]}] if rows[0]["integer"] == 20 else []
+    )
+    data: List[BigQueryModelBase] = [SmallModel(integer=i) for i in range(95)]
+
+    with pytest.raises(BigQueryInsertError) as exc_info:
+        mock_bq_repository.insert(data, max_workers=4)
+
+    # Other batches are still sent
+    assert mock_client.insert_rows_json.call_count == 10
+
+    result = exc_info.value.result
+    assert result is not None
+    assert [batch.index for batch in result.failed_batches] == [2]
+    assert len(result.batches) == 10
+
+
+def test_insert_stream(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    produced: List[int] = []
+    produced_at_send: List[int] = []
+    mock_client.insert_rows_json.side_effect = lambda table_id, rows, **kwargs: produced_at_send.append(len(produced))
+
+    def generate() -> Iterator[BigQueryModelBase]:
+        for i in range(25):
+            produced.append(i)
+            yield SmallModel(integer=i)
+
+    mock_bq_repository.MAX_INSERT_BATCH_SIZE = 10
+    mock_bq_repository.insert(generate())
+
+    # Rows are pulled batch by batch, never materialized all at once
+    assert produced_at_send == [11, 21, 25]
+    batches = [call.args[1] for call in mock_client.insert_rows_json.call_args_list]
+    assert [row["integer"] for batch in batches for row in batch] == list(range(25))
+
+
+def test_insert_stream_empty(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    mock_bq_repository.insert(iter([]))
+    assert not mock_client.insert_rows_json.called
+
+
+def test_insert_retries_only_failed_batch(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    responses = [[], [{"index": 0, "errors": [{"reason": "backendError"}]}], [], []]
+    mock_client.insert_rows_json.side_effect = lambda table_id, rows, **kwargs: responses.pop(0)
+
+    mock_bq_repository.MAX_INSERT_BATCH_SIZE = 10
+    result = mock_bq_repository.insert(SmallModel(integer=i) for i in range(30))
+
+    batches = [call.args[1][0]["integer"] for call in mock_client.insert_rows_json.call_args_list]
+    assert batches == [0, 10, 10, 20]
+
+    assert result.succeeded
+    assert result.rows == 30
+    assert [(batch.index, batch.retries) for batch in result.batches] == [(0, 0), (1, 1), (2, 0)]
+
+
+def test_insert_resends_only_failed_rows(mock_client: bigquery.Client) -> None:
+    rejected = []
+    bq_repository = BigQueryRepository(
+        project_id=TEST_PROJECT_ID,
+        dataset_id=TEST_DATASET_ID,
+        client=mock_client,
+        dead_letter_callback=lambda table_id, rows: rejected.extend(rows),
+    )
+    responses = [
+        [
+            {"index": 0, "errors": [{"reason": "stopped"}]},
+            {"index": 1, "errors": [{"reason": "invalid", "message": "no such field"}]},
+            {"index": 3, "errors": [{"reason": "stopped"}]},
+        ],
+        [],
+    ]
+    mock_client.insert_rows_json.side_effect = lambda table_id, rows, **kwargs: responses.pop(0)
+
+    bq_repository.insert([SmallModel(integer=i) for i in range(4)])
+
+    sent = [[row["integer"] for row in call.args[1]] for call in mock_client.insert_rows_json.call_args_list]
+    assert sent == [[0, 1, 2, 3], [0, 3]]
+    assert rejected == [({"integer": 1}, [{"reason": "invalid", "message": "no such field"}])]
+
+
+def test_insert_rejected_rows_without_dead_letter(
+    mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client
+) -> None:
+    responses = [[{"index": 0, "errors": [{"reason": "invalid"}]}, {"index": 1, "errors": [{"reason": "stopped"}]}], []]
+    mock_client.insert_rows_json.side_effect = lambda table_id, rows, **kwargs: responses.pop(0)
+
+    with pytest.raises(BigQueryInsertError):
+        mock_bq_repository.insert([SmallModel(integer=0), SmallModel(integer=1)])
+
+    # Valid rows are still sent before raising
+    assert mock_client.insert_rows_json.call_args_list[1].args[1] == [{"integer": 1}]
+
+
+def test_insert_row_ids(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    class TinyBigQueryModel(BigQueryModel):
+        __TABLE_NAME__: str = "tiny_model"
+
+        integer: int
+
+    data = [TinyBigQueryModel(integer=i) for i in range(3)]
+    mock_bq_repository.insert(data)
+
+    assert mock_client.insert_rows_json.call_args.kwargs["row_ids"] == [str(x.insert_id) for x in data]
+
+
+def test_insert_row_ids_stable_on_resend(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    responses = [[{"index": 0, "errors": [{"reason": "invalid"}]}, {"index": 1, "errors": [{"reason": "stopped"}]}], []]
+    mock_client.insert_rows_json.side_effect = lambda table_id, rows, **kwargs: responses.pop(0)
+
+    with pytest.raises(BigQueryInsertError):
+        mock_bq_repository.insert([SmallModel(integer=0), SmallModel(integer=1)])
+
+    first_call, second_call = mock_client.insert_rows_json.call_args_list
+    assert second_call.kwargs["row_ids"] == first_call.kwargs["row_ids"][1:]
+
+
+def capture_load_files(mock_client: bigquery.Client) -> List[bytes]:
+    files: List[bytes] = []
+
+    def load_table_from_file(file_obj: IO[bytes], *_: Any, **kwargs: Any) -> Any:
+        assert kwargs["rewind"]
+        file_obj.seek(0)
+        files.append(file_obj.read())
+        return mock_client.load_table_from_file.return_value
+
+    mock_client.load_table_from_file.side_effect = load_table_from_file
+    return files
+
+
+def test_load_ndjson(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    files = capture_load_files(mock_client)
+    data: List[BigQueryModelBase] = [SmallModel(integer=i) for i in range(3)]
+
+    load_job = mock_bq_repository.load(iter(data))
+
+    assert load_job is mock_client.load_table_from_file.return_value
+    assert [json.loads(line) for line in files[0].splitlines()] == [x.bq_dict() for x in data]
+
+    job_config = mock_client.load_table_from_file.call_args.kwargs["job_config"]
+    assert job_config.source_format == "NEWLINE_DELIMITED_JSON"
+    assert job_config.schema == SmallModel.get_bigquery_schema()
+    assert mock_client.load_table_from_file.call_args.args[1] == f"{TEST_PROJECT_ID}.{TEST_DATASET_ID}.small_model"
+    assert load_job.result.called
+
+
+def test_load_parquet(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    files = capture_load_files(mock_client)
+    data: List[BigQueryModelBase] = [SmallModel(integer=i) for i in range(3)]
+
+    mock_bq_repository.load(data, source_format=BigQuerySourceFormat.PARQUET)
+
+    assert pq.read_table(io.BytesIO(files[0])).to_pylist() == [x.bq_dict() for x in data]
+    job_config = mock_client.load_table_from_file.call_args.kwargs["job_config"]
+    assert job_config.to_api_repr()["load"]["parquetOptions"] == {"enableListInference": True}
+
+
+def test_load_avro(
+    mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client, example_model_nested: ExampleModelNested
+) -> None:
+    fastavro = pytest.importorskip("fastavro")
+    files = capture_load_files(mock_client)
+
+    mock_bq_repository.load(example_model_nested, source_format=BigQuerySourceFormat.AVRO)
+
+    (record,) = fastavro.reader(io.BytesIO(files[0]))
+    assert record["insert_id"] == str(example_model_nested.insert_id)
+    assert record["inserted_at"] == example_model_nested.inserted_at
+    assert record["struct1"] == example_model_nested.bq_dict()["struct1"]
+
+
+@pytest.mark.parametrize(
+    "source_format",
+    [BigQuerySourceFormat.NEWLINE_DELIMITED_JSON, BigQuerySourceFormat.PARQUET, BigQuerySourceFormat.AVRO],
+)
+def test_load_processes(
+    mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client, source_format: BigQuerySourceFormat
+) -> None:
+    files = capture_load_files(mock_client)
+    data: List[BigQueryModelBase] = [SmallModel(integer=i) for i in range(2500)]
+
+    mock_bq_repository.load(data, source_format=source_format)
+    mock_bq_repository.load(iter(data), source_format=source_format, processes=2)
+    mock_bq_repository.load(data, source_format=source_format, processes=2)
+
+    if source_format == BigQuerySourceFormat.NEWLINE_DELIMITED_JSON:
+        assert files[0] == files[1] == files[2]
+    if source_format == BigQuerySourceFormat.PARQUET:
+        pq = pytest.importorskip("pyarrow.parquet")
+        tables = [pq.read_table(io.BytesIO(file)) for file in files]
+        assert tables[0].to_pylist() == tables[1].to_pylist() == tables[2].to_pylist()
+        assert pq.ParquetFile(io.BytesIO(files[2])).metadata.num_row_groups == 1
+    if source_format == BigQuerySourceFormat.AVRO:
+        fastavro = pytest.importorskip("fastavro")
+        records = [list(fastavro.reader(io.BytesIO(file))) for file in files]
+        assert records[0] == records[1] == records[2]
+
+
+def test_load_empty(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    assert mock_bq_repository.load([]) is None
+    assert not mock_client.load_table_from_file.called
+
+
+def test_load_job_error(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    load_job = mock_client.load_table_from_file.return_value
+    load_job.result.side_effect = BadRequest("Error while reading data")  # type: ignore[no-untyped-call]
+    load_job.errors = [{"reason": "invalid"}]
+
+    with pytest.raises(BigQueryInsertError):
+        mock_bq_repository.load(SmallModel(integer=1))
+
+
+def test_insert_processes(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    mock_client.insert_rows_json.return_value = []
+    mock_bq_repository.MAX_INSERT_BATCH_SIZE = 1000
+    data: List[BigQueryModelBase] = [SmallModel(integer=i) for i in range(2500)]
+
+    result = mock_bq_repository.insert(data, processes=2)
+
+    assert result.rows == 2500
+    assert [len(call.args[1]) for call in mock_client.insert_rows_json.call_args_list] == [1000, 1000, 500]
+    sent = [row for call in mock_client.insert_rows_json.call_args_list for row in call.args[1]]
+    assert sent == [x.bq_dict() for x in data]
+
+
+def test_processes_share_sequences(
+    mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client, monkeypatch: Any
+) -> None:
+    if parallel._get_fork_context() is None:  # pylint: disable=protected-access
+        pytest.skip("Needs the fork start method")
+
+    def fail(*_: Any) -> Any:
+        raise AssertionError("Chunks were pickled to the workers")
+
+    # Used only by the pickled path (and processes=0)
+    monkeypatch.setattr(parallel, "chunked", fail)
+    files = capture_load_files(mock_client)
+    data: List[BigQueryModelBase] = [SmallModel(integer=i) for i in range(2500)]
+
+    assert mock_bq_repository.insert(data, processes=2).rows == 2500
+    mock_bq_repository.load(data, processes=2)
+
+    sent = [row for call in mock_client.insert_rows_json.call_args_list for row in call.args[1]]
+    assert sent == [json.loads(line) for line in files[0].splitlines()] == [x.bq_dict() for x in data]
+
+
+def test_write_below_threshold_streams(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    mock_bq_repository.LOAD_THRESHOLD_ROWS = 10
+    result = mock_bq_repository.write(SmallModel(integer=i) for i in range(9))
+
+    assert isinstance(result, BigQueryInsertResult)
+    assert result.rows == 9
+    assert not mock_client.load_table_from_file.called
+
+
+def test_write_above_threshold_loads(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    files = capture_load_files(mock_client)
+    mock_bq_repository.LOAD_THRESHOLD_BYTES = 100
+    mock_bq_repository.write(SmallModel(integer=i) for i in range(25))
+
+    assert not mock_client.insert_rows_json.called
+    assert [json.loads(line)["integer"] for line in files[0].splitlines()] == list(range(25))
+
+
+def test_query(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    field_to_index = {"integer": 0}
+    pages = [[bigquery.Row((i,), field_to_index) for i in range(start, start + 10)] for start in (0, 10, 20)]
+    mock_client.query.return_value.result.return_value.pages = iter(pages)
+
+    params = [bigquery.ScalarQueryParameter("min", "INT64", 0)]
+    result = mock_bq_repository.query(SmallModel, "SELECT integer FROM small_model WHERE integer >= @min", params)
+
+    assert [model.integer for model in result] == list(range(30))
+    assert mock_client.query.call_args.kwargs["job_config"].query_parameters == params
+    assert mock_client.query.return_value.result.call_args.kwargs["page_size"] == 10_000
+
+
+def test_query_error(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    mock_client.query.return_value.result.side_effect = BadRequest("Syntax error")  # type: ignore[no-untyped-call]
+
+    with pytest.raises(BigQueryFetchError):
+        mock_bq_repository.query(SmallModel, "SELECT")
+
+
+@pytest.mark.parametrize("prefetch_pages", [0, 2])
+def test_query_page_error(
+    mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client, prefetch_pages: int
+) -> None:
+    def pages() -> Iterator[List[bigquery.Row]]:
+        yield [bigquery.Row((1,), {"integer": 0})]
+        raise NotFound("Table was deleted")  # type: ignore[no-untyped-call]
+
+    mock_client.query.return_value.result.return_value.pages = pages()
+    result = mock_bq_repository.query(SmallModel, "SELECT integer FROM small_model", prefetch_pages=prefetch_pages)
+
+    assert next(result) == SmallModel(integer=1)
+    with pytest.raises(BigQueryFetchError) as e:
+        next(result)
+    assert isinstance(e.value.__cause__, NotFound)
+
+
+def test_metadata_cache(mock_client: bigquery.Client) -> None:
+    bq_repository = BigQueryRepository(
+        project_id=TEST_PROJECT_ID,
+        dataset_id=TEST_DATASET_ID,
+        client=mock_client,
+        metadata_cache=BigQueryMetadataCache(ttl=60),
+    )
+    mock_client.get_table.side_effect = NotFound("Not found")  # type: ignore[no-untyped-call]
+
+    # NotFound is cached as well
+    assert bq_repository.get_table(SmallModel) is None
+    assert bq_repository.get_table(SmallModel) is None
+    assert mock_client.get_table.call_count == 1
+
+    # create_table invalidates the entry
+    bq_repository.create_table(SmallModel)
+    mock_client.get_table.side_effect = None
+    assert bq_repository.get_table(SmallModel) is mock_client.get_table.return_value
+    assert bq_repository.get_table(SmallModel) is mock_client.get_table.return_value
+    assert mock_client.get_table.call_count == 2
+
+    assert bq_repository.get_dataset() is bq_repository.get_dataset()
+    assert mock_client.get_dataset.call_count == 1
+
+
+def test_ensure_table(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    mock_client.get_table.side_effect = NotFound("Not found")  # type: ignore[no-untyped-call]
+
+    mock_bq_repository.ensure_table(SmallModel)
+    mock_bq_repository.ensure_table(SmallModel)
+
+    assert mock_client.get_table.call_count == 1
+    assert mock_client.create_table.call_count == 1
+
+
+def test_ensure_table_existing(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    mock_client.get_table.return_value = bigquery.Table("p.d.small_model", SmallModel.get_bigquery_schema())
+
+    mock_bq_repository.ensure_table(SmallModel)
+    mock_bq_repository.ensure_table(SmallModel)
+
+    assert mock_client.get_table.call_count == 1
+    assert not mock_client.create_table.called
+
+
+def test_ensure_table_schema_mismatch(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    schema = [bigquery.SchemaField("integer", "STRING", "REQUIRED")]
+    mock_client.get_table.return_value = bigquery.Table("p.d.small_model", schema)
+
+    with pytest.raises(BigQuerySchemaMismatchError):
+        mock_bq_repository.ensure_table(SmallModel)
+
+    # Not remembered, checked again next time
+    with pytest.raises(BigQuerySchemaMismatchError):
+        mock_bq_repository.ensure_table(SmallModel)
+
+
+def test_ensure_dataset(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    mock_client.get_dataset.side_effect = NotFound("Not found")  # type: ignore[no-untyped-call]
+
+    mock_bq_repository.ensure_dataset()
+    mock_bq_repository.ensure_dataset()
+
+    assert mock_client.get_dataset.call_count == 1
+    assert mock_client.create_dataset.call_count == 1
+
+
+def test_create_tables(mock_bq_repository: BigQueryRepository, mock_client: bigquery.Client) -> None:
+    class BrokenModel(BigQueryModelBase):
+        __TABLE_NAME__: str = "broken_model"
+
+        value: bytes
+
+    models: List[Type[BigQueryModelBase]] = [
+        type(f"Model{i}", (SmallModel,), {"__TABLE_NAME__": f"model_{i}"}) for i in range(20)
+    ]
+
+    result = mock_bq_repository.create_tables([*models, BrokenModel], max_workers=4)
+
+    assert mock_client.create_table.call_count == 20
+    assert [table.table_id for table in result.tables] == [f"model_{i}" for i in range(20)] + ["broken_model"]
+    assert not result.succeeded
+    assert [table.table_id for table in result.failed_tables] == ["broken_model"]
+    assert "Unknown type" in (result.failed_tables[0].error or "")
@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+from typing import Any, List
+
+import pytest
+from google.cloud import bigquery
+from mock import create_autospec
+
+from pydantic_bigquery import BigQueryModelBase, BigQueryRepository
+from tests.conftest import TEST_DATASET_ID, TEST_PROJECT_ID
+from tests.test_model import ExampleModelNested, ExampleModelNestedInner1, ExampleModelNestedInner2
+
+pa = pytest.importorskip("pyarrow")
+bigquery_storage_v1 = pytest.importorskip("google.cloud.bigquery_storage_v1")
+types = bigquery_storage_v1.types
+
+
+class TimestampModel(BigQueryModelBase):
+    __TABLE_NAME__: str = "timestamp_model"
+
+    integer: int
+    created_at: datetime
+
+
+def create_session(schema: Any, stream_count: int) -> Any:
+    return types.ReadSession(
+        arrow_schema=types.ArrowSchema(serialized_schema=schema.serialize().to_pybytes()),
+        streams=[types.ReadStream(name=f"stream-{i}") for i in range(stream_count)],
+    )
+
+
+def create_response(batch: Any) -> Any:
+    return types.ReadRowsResponse(
+        arrow_record_batch=types.ArrowRecordBatch(serialized_record_batch=batch.serialize().to_pybytes()),
+        row_count=batch.num_rows,
+    )
+
+
+@pytest.fixture(name="read_client")
+def fixture_read_client() -> Any:
+    return create_autospec(bigquery_storage_v1.BigQueryReadClient, instance=True)
+
+
+@pytest.fixture(name="repository")
+def fixture_repository(read_client: Any) -> BigQueryRepository:
+    return BigQueryRepository(
+        project_id=TEST_PROJECT_ID,
+        dataset_id=TEST_DATASET_ID,
+        client=create_autospec(bigquery.Client, instance=True),
+        read_client=read_client,
+    )
+
+
+def test_read_table(repository: BigQueryRepository, read_client: Any) -> None:
+    schema = TimestampModel.to_arrow_schema()
+    created_at = datetime(2021, 1, 2, tzinfo=timezone.utc)
+    streams = {
+        f"stream-{i}": [
+            create_response(
+                TimestampModel.to_record_batch([TimestampModel(integer=i * 100 + j, created_at=created_at)])
+            )
+            for j in range(3)
+        ]
+        for i in range(4)
+    }
+    read_client.create_read_session.return_value = create_session(schema, 4)
+    read_client.read_rows.side_effect = lambda name: iter(streams[name])
+
+    result: List[TimestampModel] = list(repository.read_table(TimestampModel, max_streams=4))
+
+    assert sorted(model.integer for model in result) == [i * 100 + j for i in range(4) for j in range(3)]
+    assert all(model.created_at == created_at for model in result)
+
+    kwargs = read_client.create_read_session.call_args.kwargs
+    assert kwargs["parent"] == f"projects/{TEST_PROJECT_ID}"
+    assert kwargs["max_stream_count"] == 4
+    assert kwargs["read_session"].table == (
+        f"projects/{TEST_PROJECT_ID}/datasets/{TEST_DATASET_ID}/tables/timestamp_model"
+    )
+    # Columns derived from the model
+    assert list(kwargs["read_session"].read_options.selected_fields) == ["integer", "created_at"]
+
+
+def test_read_table_nested(repository: BigQueryRepository, read_client: Any) -> None:
+    model = ExampleModelNested(
+        struct1=ExampleModelNestedInner1(
+            struct2=ExampleModelNestedInner2(my_integer=1),
+            repeatable_struct2=[ExampleModelNestedInner2(my_integer=2)],
+        )
+    )
+    read_client.create_read_session.return_value = create_session(ExampleModelNested.to_arrow_schema(), 1)
+    read_client.read_rows.return_value = iter([create_response(ExampleModelNested.to_record_batch([model]))])
+
+    assert list(repository.read_table(ExampleModelNested, row_restriction="TRUE")) == [model]
+    assert read_client.create_read_session.call_args.kwargs["read_session"].read_options.row_restriction == "TRUE"
+
+
+def test_read_table_empty(repository: BigQueryRepository, read_client: Any) -> None:
+    read_client.create_read_session.return_value = types.ReadSession()
+
+    assert not list(repository.read_table_arrow(TimestampModel))
+    assert not read_client.read_rows.called
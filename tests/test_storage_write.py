@@ -0,0 +1,233 @@
+import threading
+from concurrent import futures
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+import grpc
+import pytest
+from google.cloud import bigquery
+from google.protobuf import descriptor_pb2, descriptor_pool, json_format, message_factory
+from google.rpc import code_pb2, status_pb2
+from mock import create_autospec
+
+from pydantic_bigquery import BigQueryInsertError, BigQueryRepository, BigQueryWriteMode, storage_write
+from tests.conftest import TEST_DATASET_ID, TEST_PROJECT_ID, SmallModel
+from tests.test_model import (
+    ExampleEnum,
+    ExampleModel,
+    ExampleModelNested,
+    ExampleModelNestedInner1,
+    ExampleModelNestedInner2,
+)
+
+bigquery_storage_v1 = pytest.importorskip("google.cloud.bigquery_storage_v1")
+types = bigquery_storage_v1.types
+
+TABLE_PATH = f"projects/{TEST_PROJECT_ID}/datasets/{TEST_DATASET_ID}/tables/small_model"
+
+
+def decode_rows(descriptor: descriptor_pb2.DescriptorProto, serialized_rows: List[bytes]) -> List[Dict[str, Any]]:
+    # Independent of the library: the descriptor must be self-contained
+    file_descriptor = descriptor_pb2.FileDescriptorProto(name="test.proto", syntax="proto2")
+    file_descriptor.message_type.add().CopyFrom(descriptor)
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_descriptor)
+    message_class = message_factory.MessageFactory(pool).GetPrototype(pool.FindMessageTypeByName(descriptor.name))
+    return [
+        json_format.MessageToDict(message_class.FromString(row), preserving_proto_field_name=True)
+        for row in serialized_rows
+    ]
+
+
+class StubBigQueryWrite:
+    def __init__(self, fail_at_request: Optional[int] = None, error_code: Optional[int] = None):
+        self.fail_at_request = fail_at_request  # Connection is dropped after this request is written
+        self.error_code = error_code
+        self.rows: List[Dict[str, Any]] = []
+        self.stream_names: List[str] = []
+        self.offsets: List[Optional[int]] = []
+        self.finalized: List[str] = []
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def handler(self) -> grpc.GenericRpcHandler:
+        return grpc.method_handlers_generic_handler(
+            "google.cloud.bigquery.storage.v1.BigQueryWrite",
+            {
+                "CreateWriteStream": grpc.unary_unary_rpc_method_handler(
+                    self.create_write_stream,
+                    request_deserializer=types.CreateWriteStreamRequest.deserialize,
+                    response_serializer=types.WriteStream.serialize,
+                ),
+                "AppendRows": grpc.stream_stream_rpc_method_handler(
+                    self.append_rows,
+                    request_deserializer=types.AppendRowsRequest.deserialize,
+                    response_serializer=types.AppendRowsResponse.serialize,
+                ),
+                "FinalizeWriteStream": grpc.unary_unary_rpc_method_handler(
+                    self.finalize_write_stream,
+                    request_deserializer=types.FinalizeWriteStreamRequest.deserialize,
+                    response_serializer=types.FinalizeWriteStreamResponse.serialize,
+                ),
+            },
+        )
+
+    def create_write_stream(self, request: Any, _context: grpc.ServicerContext) -> Any:
+        return types.WriteStream(name=f"{request.parent}/streams/committed", type_=request.write_stream.type_)
+
+    def finalize_write_stream(self, request: Any, _context: grpc.ServicerContext) -> Any:
+        self.finalized.append(request.name)
+        return types.FinalizeWriteStreamResponse(row_count=len(self.rows))
+
+    def append_rows(self, requests: Iterator[Any], context: grpc.ServicerContext) -> Iterator[Any]:
+        descriptor = None
+        for request in requests:
+            # Schema only in the first request of a connection
+            if descriptor is None:
+                descriptor = request.proto_rows.writer_schema.proto_descriptor
+                self.stream_names.append(request.write_stream)
+
+            with self.lock:
+                self.requests += 1
+                offset = request.offset if "offset" in request else None
+                self.offsets.append(offset)
+
+                if self.error_code is not None:
+                    yield self.error(self.error_code)
+                    continue
+                if offset is not None and offset < len(self.rows):
+                    yield self.error(code_pb2.ALREADY_EXISTS)
+                    continue
+
+                self.rows.extend(decode_rows(descriptor, list(request.proto_rows.rows.serialized_rows)))
+
+                if self.requests == self.fail_at_request:
+                    context.abort(grpc.StatusCode.UNAVAILABLE, "Connection reset")
+
+            yield types.AppendRowsResponse(append_result=types.AppendRowsResponse.AppendResult(offset=offset))
+
+    @staticmethod
+    def error(code: int) -> Any:
+        return types.AppendRowsResponse(error=status_pb2.Status(code=code, message="Stub error"))
+
+
+@pytest.fixture(name="stub")
+def fixture_stub() -> StubBigQueryWrite:
+    return StubBigQueryWrite()
+
+
+@pytest.fixture(name="repository")
+def fixture_repository(stub: StubBigQueryWrite, monkeypatch: pytest.MonkeyPatch) -> Iterator[BigQueryRepository]:
+    monkeypatch.setattr(storage_write, "MAX_APPEND_ROWS", 10)
+    monkeypatch.setattr(storage_write, "APPEND_RETRY_DELAY", 0)
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    server.add_generic_rpc_handlers((stub.handler(),))
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+
+    channel = grpc.insecure_channel(f"localhost:{port}")
+    transport = bigquery_storage_v1.services.big_query_write.transports.BigQueryWriteGrpcTransport(channel=channel)
+    yield BigQueryRepository(
+        project_id=TEST_PROJECT_ID,
+        dataset_id=TEST_DATASET_ID,
+        client=create_autospec(bigquery.Client, instance=True),
+        write_client=bigquery_storage_v1.BigQueryWriteClient(transport=transport),
+    )
+
+    channel.close()
+    server.stop(None)
+
+
+def test_proto_rows() -> None:
+    model = ExampleModel(
+        my_string="hello",
+        my_integer=1,
+        my_float=1.5,
+        my_bool=True,
+        my_date=date(2021, 1, 2),
+        my_datetime=datetime(2021, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc),
+        my_enum=ExampleEnum.FOO,
+        my_repeatable_string=["a", "b"],
+        my_repeatable_integer=[1, 2],
+        my_repeatable_float=[],
+        my_repeatable_bool=[True],
+        my_repeatable_date=[date(1970, 1, 2)],
+        my_repeatable_datetime=[datetime(1970, 1, 1, 0, 0, 1)],
+    )
+
+    (row,) = decode_rows(
+        ExampleModel.to_proto_descriptor(), list(storage_write.encode_proto_rows(ExampleModel, [model]))
+    )
+
+    assert row["insert_id"] == str(model.insert_id)
+    assert row["my_integer"] == "1"  # int64 is a string in proto JSON
+    assert row["my_float"] == 1.5
+    assert row["my_date"] == (date(2021, 1, 2) - date(1970, 1, 1)).days
+    assert row["my_datetime"] == str(int(model.my_datetime.timestamp()) * 1_000_000 + 6)
+    assert row["my_enum"] == "FOO"
+    assert "my_nullable_string" not in row
+    assert row["my_repeatable_date"] == [1]
+    assert row["my_repeatable_datetime"] == ["1000000"]  # Naive = UTC
+
+
+def test_proto_rows_nested() -> None:
+    model = ExampleModelNested(
+        struct1=ExampleModelNestedInner1(
+            struct2=ExampleModelNestedInner2(my_integer=1),
+            repeatable_struct2=[ExampleModelNestedInner2(my_integer=2), ExampleModelNestedInner2(my_integer=3)],
+        )
+    )
+
+    (row,) = decode_rows(
+        ExampleModelNested.to_proto_descriptor(),
+        list(storage_write.encode_proto_rows(ExampleModelNested, [model])),
+    )
+
+    assert row["struct1"] == {
+        "struct2": {"my_integer": "1"},
+        "repeatable_struct2": [{"my_integer": "2"}, {"my_integer": "3"}],
+    }
+
+
+def test_storage_write_committed(repository: BigQueryRepository, stub: StubBigQueryWrite) -> None:
+    result = repository.storage_write(SmallModel(integer=i) for i in range(25))
+
+    assert [row["integer"] for row in stub.rows] == [str(i) for i in range(25)]
+    assert stub.offsets == [0, 10, 20]
+    assert stub.stream_names == [f"{TABLE_PATH}/streams/committed"]
+    assert stub.finalized == [f"{TABLE_PATH}/streams/committed"]
+    assert result.succeeded
+    assert result.rows == 25
+
+
+def test_storage_write_default_stream(repository: BigQueryRepository, stub: StubBigQueryWrite) -> None:
+    repository.storage_write([SmallModel(integer=i) for i in range(15)], mode=BigQueryWriteMode.DEFAULT)
+
+    assert len(stub.rows) == 15
+    assert stub.offsets == [None, None]
+    assert stub.stream_names == [f"{TABLE_PATH}/streams/_default"]
+    assert not stub.finalized
+
+
+def test_storage_write_reconnect_exactly_once(repository: BigQueryRepository, stub: StubBigQueryWrite) -> None:
+    # Second request is written, but the connection drops before its response
+    stub.fail_at_request = 2
+
+    result = repository.storage_write(SmallModel(integer=i) for i in range(45))
+
+    assert [row["integer"] for row in stub.rows] == [str(i) for i in range(45)]
+    assert len(stub.stream_names) == 2
+    assert result.succeeded
+    assert result.retries >= 1
+
+
+def test_storage_write_error(repository: BigQueryRepository, stub: StubBigQueryWrite) -> None:
+    stub.error_code = code_pb2.INVALID_ARGUMENT
+
+    with pytest.raises(BigQueryInsertError) as exc_info:
+        repository.storage_write([SmallModel(integer=1)])
+
+    assert exc_info.value.result is not None
+    assert not exc_info.value.result.succeeded
+    assert not stub.finalized
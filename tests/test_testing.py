@@ -0,0 +1,167 @@
+import threading
+import time
+from typing import Any
+
+import pytest
+from google.api_core.exceptions import BadRequest, Conflict, NotFound
+
+from pydantic_bigquery import BigQueryCompression, BigQueryRepository
+from pydantic_bigquery.testing import FakeBigQueryClient
+from tests.conftest import (
+    ROW_TABLE_ID,
+    TEST_DATASET_ID,
+    TEST_PROJECT_ID,
+    RowModel,
+    create_fake_repository,
+    create_models,
+)
+from tests.test_model import ExampleModelNested, ExampleModelNestedInner1, ExampleModelNestedInner2
+
+
+def test_metadata() -> None:
+    client = FakeBigQueryClient()
+    repository = BigQueryRepository(TEST_PROJECT_ID, TEST_DATASET_ID, client=client)
+
+    assert repository.get_dataset() is None
+    with pytest.raises(NotFound):
+        repository.create_table(RowModel)
+
+    repository.create_dataset()
+    assert repository.get_table(RowModel) is None
+    repository.create_table(RowModel)
+
+    table = repository.get_table(RowModel)
+    assert table is not None
+    assert table.schema == RowModel.get_bigquery_schema()
+
+    with pytest.raises(Conflict):
+        repository.create_table(RowModel, exists_ok=False)
+
+
+def test_insert_many_rows(fake_client: FakeBigQueryClient) -> None:
+    repository = create_fake_repository(fake_client)
+
+    result = repository.insert(create_models(25_000), max_workers=4)
+
+    assert result.rows == 25_000
+    assert len(result.batches) == 3
+    assert len(fake_client.table_rows[ROW_TABLE_ID]) == 25_000
+
+
+def test_insert_over_limits() -> None:
+    client = FakeBigQueryClient(max_request_rows=10)
+    create_fake_repository(client)
+
+    with pytest.raises(BadRequest, match="too many rows"):
+        client.insert_rows_json(ROW_TABLE_ID, [{"integer": i} for i in range(11)])
+
+    with pytest.raises(BadRequest) as e:
+        client.insert_rows_json(ROW_TABLE_ID, [{"key": "x" * 11 * 1024 * 1024}])
+    assert "Request payload size exceeds the limit: 10485760 bytes." in e.value.response.text
+
+
+def test_insert_too_large_bisect() -> None:
+    client = FakeBigQueryClient(max_request_bytes=200_000)
+    repository = create_fake_repository(client)
+
+    result = repository.insert(create_models(100, padding=10_000), max_workers=1)
+
+    assert result.rows == 100
+    assert client.insert_requests > 1
+    assert len(client.table_rows[ROW_TABLE_ID]) == 100
+
+
+def test_insert_compressed(fake_client: FakeBigQueryClient) -> None:
+    repository = create_fake_repository(fake_client, compression=BigQueryCompression.GZIP)
+
+    repository.insert(create_models(1_000))
+
+    assert fake_client.content_encodings == ["gzip"]
+    assert len(fake_client.table_rows[ROW_TABLE_ID]) == 1_000
+
+
+@pytest.mark.usefixtures("no_sleep")
+def test_insert_backend_errors() -> None:
+    client = FakeBigQueryClient(backend_error_rate=0.3, seed=1)
+    repository = create_fake_repository(client)
+
+    result = repository.insert(create_models(1_000), max_workers=1)
+
+    assert result.retries > 0
+    rows = client.table_rows[ROW_TABLE_ID]
+    assert sorted(row["integer"] for row in rows) == list(range(1_000))
+
+
+def test_insert_deduplicates_insert_ids(fake_client: FakeBigQueryClient) -> None:
+    repository = create_fake_repository(fake_client)
+
+    repository.insert(create_models(10))
+    repository.insert(create_models(10))
+
+    assert len(fake_client.table_rows[ROW_TABLE_ID]) == 10
+
+
+def test_insert_invalid_rows(fake_client: FakeBigQueryClient) -> None:
+    create_fake_repository(fake_client)
+
+    errors = fake_client.insert_rows_json(ROW_TABLE_ID, [{"integer": 1}, {"unknown": 2}, {"integer": 3}])
+
+    assert [error["errors"][0]["reason"] for error in errors] == ["stopped", "invalid", "stopped"]
+    assert fake_client.table_rows[ROW_TABLE_ID] == []
+
+
+def test_query(fake_client: FakeBigQueryClient) -> None:
+    repository = create_fake_repository(fake_client)
+    repository.create_table(ExampleModelNested)
+    models = create_models(25)
+    nested = ExampleModelNested(
+        struct1=ExampleModelNestedInner1(
+            struct2=ExampleModelNestedInner2(my_integer=1),
+            repeatable_struct2=[ExampleModelNestedInner2(my_integer=2)],
+        )
+    )
+    repository.insert(models)
+    repository.insert(nested)
+
+    sql = f"SELECT * FROM `{ROW_TABLE_ID}`"
+    assert list(repository.query(RowModel, sql, page_size=10)) == models
+    assert list(repository.query(RowModel, f"{sql} LIMIT 5")) == models[:5]
+
+    sql = f"SELECT * FROM `{TEST_PROJECT_ID}.{TEST_DATASET_ID}.{ExampleModelNested.__TABLE_NAME__}`"
+    assert list(repository.query(ExampleModelNested, sql, strict=True)) == [nested]
+
+    with pytest.raises(NotFound):
+        repository.query(RowModel, f"SELECT * FROM `{TEST_PROJECT_ID}.{TEST_DATASET_ID}.missing`")
+
+
+def test_query_unsupported(fake_repository: BigQueryRepository) -> None:
+    with pytest.raises(NotImplementedError):
+        fake_repository.query(RowModel, "SELECT COUNT(*) FROM row_model")
+
+
+def test_latency_concurrency() -> None:
+    client = FakeBigQueryClient(latency=0.05)
+    repository = create_fake_repository(client)
+    repository.MAX_INSERT_BATCH_SIZE = 10
+
+    in_flight, max_in_flight = [0], [0]
+    lock = threading.Lock()
+    call_api = client._call_api  # pylint: disable=protected-access
+
+    def tracked(*args: Any, **kwargs: Any) -> Any:
+        with lock:
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+        try:
+            return call_api(*args, **kwargs)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    client._call_api = tracked  # type: ignore[method-assign]  # pylint: disable=protected-access
+
+    start = time.monotonic()
+    repository.insert(create_models(80), max_workers=8)
+
+    assert max_in_flight[0] == 8
+    assert time.monotonic() - start < 8 * 0.05